@@ -0,0 +1,200 @@
+from collections import OrderedDict
+import logging
+import math
+import threading
+import time
+
+from flask import g, jsonify, request
+
+from app.monitoring.metrics import ADMISSION_IN_FLIGHT, ADMISSION_QUEUED, ADMISSION_REJECTIONS
+
+logger = logging.getLogger(__name__)
+
+# Long-lived responses that would otherwise hold a concurrency slot for hours
+UNLIMITED_ENDPOINTS = {'api.stream'}
+
+
+class TokenBucket:
+    """`burst` tokens, refilled at `rate` per second; each request takes one"""
+
+    __slots__ = ('rate', 'burst', 'tokens', 'updated')
+
+    def __init__(self, rate, burst, now=None):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic() if now is None else now
+
+    def take(self, now):
+        """0 if a token was taken, else seconds until one is available"""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class RateLimiter:
+    """A token bucket per (client, endpoint), with per-endpoint overrides.
+
+    Only the `max_buckets` most recently seen keys are kept; a client whose
+    bucket was dropped starts again with a full one.
+    """
+
+    def __init__(self, per_minute=0, burst=20, overrides=None, max_buckets=10000):
+        self.max_buckets = max_buckets
+        self.per_minute = per_minute
+        self.burst = burst
+        self.overrides = {}
+        self.configure(overrides=overrides)
+        self._lock = threading.Lock()
+        self._buckets = OrderedDict()
+
+    def configure(self, per_minute=None, burst=None, overrides=None):
+        if per_minute is not None:
+            self.per_minute = per_minute
+        if burst is not None:
+            self.burst = burst
+        if overrides is not None:
+            # endpoint -> [per_minute, burst]
+            self.overrides = {endpoint: tuple(limit) for endpoint, limit in overrides.items()}
+
+    def limit_for(self, endpoint):
+        return self.overrides.get(endpoint, (self.per_minute, self.burst))
+
+    def check(self, client, endpoint):
+        """0 if the request may proceed, else seconds the client should wait"""
+        per_minute, burst = self.limit_for(endpoint)
+        if per_minute <= 0:
+            return 0.0
+        key = (client, endpoint)
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = TokenBucket(per_minute / 60.0, max(1, burst), now)
+                if len(self._buckets) > self.max_buckets:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+            return bucket.take(now)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._buckets)
+
+
+class ConcurrencyLimiter:
+    """At most `limit` requests at once; up to `queue_size` more wait for a slot
+    (at most `queue_timeout` seconds), and anything beyond that is turned away"""
+
+    def __init__(self, limit=0, queue_size=0, queue_timeout=0.5):
+        self.limit = limit
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.waiting = 0
+        self._condition = threading.Condition()
+
+    def configure(self, limit=None, queue_size=None, queue_timeout=None):
+        with self._condition:
+            if limit is not None:
+                self.limit = limit
+            if queue_size is not None:
+                self.queue_size = queue_size
+            if queue_timeout is not None:
+                self.queue_timeout = queue_timeout
+
+    def acquire(self):
+        """True once a slot is held; False if the queue is full or the wait timed out"""
+        with self._condition:
+            if self.limit <= 0:
+                return True
+            if self.active >= self.limit:
+                if self.waiting >= self.queue_size:
+                    return False
+                self.waiting += 1
+                ADMISSION_QUEUED.set(self.waiting)
+                deadline = time.monotonic() + self.queue_timeout
+                try:
+                    while self.active >= self.limit:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0 or not self._condition.wait(remaining):
+                            if self.active >= self.limit:
+                                return False
+                finally:
+                    self.waiting -= 1
+                    ADMISSION_QUEUED.set(self.waiting)
+            self.active += 1
+            ADMISSION_IN_FLIGHT.set(self.active)
+            return True
+
+    def release(self):
+        with self._condition:
+            self.active = max(0, self.active - 1)
+            ADMISSION_IN_FLIGHT.set(self.active)
+            self._condition.notify()
+
+    def info(self):
+        with self._condition:
+            return {'limit': self.limit, 'active': self.active, 'waiting': self.waiting,
+                    'queue_size': self.queue_size}
+
+
+rate_limiter = RateLimiter()
+concurrency_limiter = ConcurrencyLimiter()
+
+
+def client_id():
+    """The client's address. Behind a proxy this is only the real client once
+    ProxyFix (PROXY_FIX_X_FOR) has taken it from X-Forwarded-For; the header
+    itself is never trusted, since any client can send one."""
+    return request.remote_addr or 'unknown'
+
+
+def _reject(status, error, retry_after):
+    response = jsonify({"error": error, "retry_after": retry_after})
+    response.status_code = status
+    response.headers['Retry-After'] = str(retry_after)
+    return response
+
+
+def init_admission(app, blueprint='api'):
+    """Rate-limit and admit requests to `blueprint`: a token bucket per client and
+    endpoint (429 when empty), then a shared concurrency limit with a short
+    queue (503 when full)"""
+    rate_limiter.configure(per_minute=app.config.get('API_RATE_LIMIT', 0),
+                           burst=app.config.get('API_RATE_BURST', 20),
+                           overrides=app.config.get('API_RATE_LIMITS') or {})
+    concurrency_limiter.configure(limit=app.config.get('API_MAX_CONCURRENCY', 0),
+                                  queue_size=app.config.get('API_QUEUE_SIZE', 0),
+                                  queue_timeout=app.config.get('API_QUEUE_TIMEOUT', 0.5))
+    rate_limited = rate_limiter.per_minute > 0 or any(
+        per_minute > 0 for per_minute, _ in rate_limiter.overrides.values())
+    if rate_limited and not app.config.get('PROXY_FIX_X_FOR'):
+        logger.warning("API rate limits are on but PROXY_FIX_X_FOR is not set; behind a proxy "
+                       "every client shares the proxy's address and its rate limit buckets")
+
+    @app.before_request
+    def _admit():
+        if request.blueprint != blueprint or request.endpoint is None:
+            return None
+        endpoint = request.endpoint
+        wait = rate_limiter.check(client_id(), endpoint)
+        if wait:
+            ADMISSION_REJECTIONS.inc(1, 'rate_limited', endpoint)
+            return _reject(429, "Too many requests", max(1, math.ceil(wait)))
+        if endpoint in UNLIMITED_ENDPOINTS:
+            return None
+        if not concurrency_limiter.acquire():
+            ADMISSION_REJECTIONS.inc(1, 'overloaded', endpoint)
+            logger.warning("Shedding %s: %d requests in flight", endpoint, concurrency_limiter.active)
+            return _reject(503, "Server busy", 1)
+        g._admission_slot = True
+        return None
+
+    @app.teardown_request
+    def _release(error=None):
+        if g.pop('_admission_slot', False):
+            concurrency_limiter.release()
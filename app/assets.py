@@ -0,0 +1,183 @@
+import gzip
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import shutil
+import sys
+
+from flask import current_app, request, send_from_directory
+
+logger = logging.getLogger(__name__)
+
+DIST_DIR = 'dist'
+MANIFEST_NAME = 'manifest.json'
+MANIFEST_VERSION = 1
+# Worth compressing; images are already compressed
+COMPRESSIBLE = {'.css', '.js', '.svg', '.json', '.html', '.txt', '.map'}
+IMMUTABLE = 'public, max-age=31536000, immutable'
+# (suffix, Content-Encoding), most preferred first
+ENCODINGS = (('.br', 'br'), ('.gz', 'gzip'))
+
+
+def _brotli():
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+
+def _fingerprinted(name, digest):
+    stem, ext = os.path.splitext(name)
+    return f"{stem}.{digest[:10]}{ext}"
+
+
+def _sources(static_folder):
+    for root, dirs, files in os.walk(static_folder):
+        # Skip the build output and sources that are only inputs to the build (css/src)
+        dirs[:] = sorted(d for d in dirs if os.path.join(root, d) != os.path.join(static_folder, DIST_DIR)
+                         and d != 'src')
+        for name in sorted(files):
+            if not name.startswith('.'):
+                path = os.path.join(root, name)
+                yield os.path.relpath(path, static_folder).replace(os.sep, '/'), path
+
+
+def build(static_folder, min_saving=0.05):
+    """Copy every static file into dist/ under a content-hashed name, with .gz (and,
+    if the brotli package is installed, .br) variants of text files, and write
+    dist/manifest.json; returns the manifest"""
+    brotli = _brotli()
+    dist = os.path.join(static_folder, DIST_DIR)
+    staging = dist + '.tmp'
+    shutil.rmtree(staging, ignore_errors=True)
+    assets = {}
+
+    for name, path in _sources(static_folder):
+        with open(path, 'rb') as f:
+            content = f.read()
+        target = _fingerprinted(name, hashlib.sha256(content).hexdigest())
+        out = os.path.join(staging, target)
+        os.makedirs(os.path.dirname(out), exist_ok=True)
+        with open(out, 'wb') as f:
+            f.write(content)
+
+        encodings = []
+        if os.path.splitext(name)[1].lower() in COMPRESSIBLE and content:
+            variants = [('.gz', 'gzip', gzip.compress(content, 9, mtime=0))]
+            if brotli is not None:
+                variants.insert(0, ('.br', 'br', brotli.compress(content, quality=11)))
+            for suffix, encoding, compressed in variants:
+                # Only keep variants that actually save bytes
+                if len(compressed) <= len(content) * (1 - min_saving):
+                    with open(out + suffix, 'wb') as f:
+                        f.write(compressed)
+                    encodings.append(encoding)
+
+        stat = os.stat(path)
+        assets[name] = {'path': f"{DIST_DIR}/{target}", 'size': stat.st_size,
+                        'mtime': stat.st_mtime, 'encodings': encodings}
+
+    manifest = {'version': MANIFEST_VERSION, 'assets': assets}
+    with open(os.path.join(staging, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    shutil.rmtree(dist, ignore_errors=True)
+    os.replace(staging, dist)
+    if brotli is None:
+        logger.info("brotli is not installed; built gzip variants only")
+    return manifest
+
+
+def load_manifest(static_folder):
+    """{source name: asset entry} for sources unchanged since the build"""
+    try:
+        with open(os.path.join(static_folder, DIST_DIR, MANIFEST_NAME)) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if manifest.get('version') != MANIFEST_VERSION:
+        return {}
+    current = {}
+    for name, entry in manifest.get('assets', {}).items():
+        try:
+            stat = os.stat(os.path.join(static_folder, name))
+        except OSError:
+            continue
+        if stat.st_size == entry['size'] and stat.st_mtime == entry['mtime']:
+            current[name] = entry
+    return current
+
+
+def is_stale(static_folder):
+    """True if any static file is missing from the manifest or changed since the build"""
+    current = load_manifest(static_folder)
+    return any(name not in current for name, _ in _sources(static_folder))
+
+
+class AssetManifest:
+    """Source name -> fingerprinted dist/ path, for url_for('static', ...).
+
+    Only entries whose source file is unchanged since the build are used, so
+    an edited file is served as itself until the next build.
+    """
+
+    def __init__(self):
+        self.assets = {}
+        self.encodings = {}         # dist path -> encodings available
+
+    def load(self, static_folder):
+        entries = load_manifest(static_folder)
+        self.assets = {name: entry['path'] for name, entry in entries.items()}
+        self.encodings = {entry['path']: entry['encodings'] for entry in entries.values()}
+        return len(self.assets)
+
+
+asset_manifest = AssetManifest()
+
+
+def serve_fingerprinted(filename):
+    """A dist/ file in the best encoding the client accepts, cached for a year"""
+    path = f"{DIST_DIR}/{filename}"
+    available = asset_manifest.encodings.get(path, ())
+    suffix, encoding = '', None
+    for candidate_suffix, candidate in ENCODINGS:
+        if candidate in available and request.accept_encodings[candidate] > 0:
+            suffix, encoding = candidate_suffix, candidate
+            break
+    directory = os.path.join(current_app.static_folder, DIST_DIR)
+    response = send_from_directory(directory, filename + suffix, mimetype=mimetypes.guess_type(filename)[0],
+                                   max_age=365 * 24 * 3600)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    if available:
+        response.vary.add('Accept-Encoding')
+    response.headers['Cache-Control'] = IMMUTABLE
+    return response
+
+
+def init_assets(app):
+    """Serve fingerprinted assets from the manifest (ASSET_FINGERPRINTS); off in debug mode
+    so edited files show up without a rebuild"""
+    if not app.config.get('ASSET_FINGERPRINTS', True):
+        return
+    count = asset_manifest.load(app.static_folder)
+    if count:
+        logger.info("Serving %d fingerprinted static assets", count)
+    app.add_url_rule(f"{app.static_url_path}/{DIST_DIR}/<path:filename>",
+                     endpoint='fingerprinted_static', view_func=serve_fingerprinted)
+
+    @app.url_defaults
+    def _fingerprint(endpoint, values):
+        if endpoint == 'static' and not app.debug:
+            filename = values.get('filename')
+            if filename in asset_manifest.assets:
+                values['filename'] = asset_manifest.assets[filename]
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    folder = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(__file__), 'static')
+    built = build(folder)
+    print(f"Built {len(built['assets'])} assets into {os.path.join(folder, DIST_DIR)}")
@@ -1,4 +1,6 @@
 import os
+import json
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -7,3 +9,173 @@ class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'you-will-never-guess'
     FIREBASE_CREDENTIALS = os.environ.get('FIREBASE_CREDENTIALS_PATH')
     FIREBASE_DATABASE_URL = os.environ.get('FIREBASE_DATABASE_URL')
+    # Initialize Firebase in a background thread so the app serves (defaults) immediately
+    FIREBASE_INIT_ASYNC = os.environ.get('FIREBASE_INIT_ASYNC', '1') == '1'
+    # Firebase reads are abandoned after FIREBASE_READ_TIMEOUT seconds (or the longest matching
+    # path prefix in FIREBASE_PATH_TIMEOUTS, a JSON object); after FIREBASE_BREAKER_THRESHOLD
+    # consecutive failures reads are short-circuited to the snapshot for FIREBASE_BREAKER_RESET
+    # seconds, then a single probe read decides whether to resume
+    FIREBASE_READ_TIMEOUT = float(os.environ.get('FIREBASE_READ_TIMEOUT', 2.0))
+    FIREBASE_PATH_TIMEOUTS = json.loads(os.environ.get('FIREBASE_PATH_TIMEOUTS') or json.dumps({
+        '/energy_dashboard/battery': 1.0,
+        '/energy_dashboard/grid': 1.0,
+        '/energy_dashboard/visitors': 1.0,
+        '/energy_dashboard/notifications_meta': 1.0,
+    }))
+    FIREBASE_READ_WORKERS = int(os.environ.get('FIREBASE_READ_WORKERS', 8))
+    FIREBASE_BREAKER_THRESHOLD = int(os.environ.get('FIREBASE_BREAKER_THRESHOLD', 5))
+    FIREBASE_BREAKER_RESET = float(os.environ.get('FIREBASE_BREAKER_RESET', 30))
+    # Changed paths are broadcast to the other instances over INVALIDATION_BUS (local://,
+    # file:///path/bus.jsonl or unix:///path/socket-dir), so each can answer reads from
+    # its cache for READ_CACHE_TTL seconds (0 disables) and evict exactly what changed
+    INVALIDATION_BUS = os.environ.get('INVALIDATION_BUS', '')
+    READ_CACHE_TTL = float(os.environ.get('READ_CACHE_TTL', 0))
+    # Without listeners, building totals and the room index are built from one-off reads and
+    # rebuilt when a write or INVALIDATION_BUS reports a change there, or after DERIVED_MAX_AGE
+    # seconds (0: only on a reported change)
+    DERIVED_MAX_AGE = float(os.environ.get('DERIVED_MAX_AGE', 30))
+    # Daily Firebase download budget per process (bytes and/or reads; 0 disables). Once
+    # FIREBASE_BUDGET_SOFT_LIMIT of it is used, the heaviest paths are cached for
+    # FIREBASE_BUDGET_TTL seconds, doubling for each further 10% used; see /debug/usage
+    FIREBASE_DAILY_BYTE_BUDGET = int(os.environ.get('FIREBASE_DAILY_BYTE_BUDGET', 0))
+    FIREBASE_DAILY_READ_BUDGET = int(os.environ.get('FIREBASE_DAILY_READ_BUDGET', 0))
+    FIREBASE_BUDGET_SOFT_LIMIT = float(os.environ.get('FIREBASE_BUDGET_SOFT_LIMIT', 0.8))
+    FIREBASE_BUDGET_TTL = float(os.environ.get('FIREBASE_BUDGET_TTL', 60))
+    # Last-known-good copy of everything read, saved every SNAPSHOT_INTERVAL seconds and
+    # served (with X-Data-Age) while Firebase is starting or unreachable; '' disables the file
+    SNAPSHOT_PATH = os.environ.get('SNAPSHOT_PATH', os.path.join(tempfile.gettempdir(), 'energy_dashboard.snapshot'))
+    SNAPSHOT_INTERVAL = float(os.environ.get('SNAPSHOT_INTERVAL', 30))
+    # Keep floors/people mirrored in memory via Firebase listen() streams
+    FIREBASE_LISTENERS = os.environ.get('FIREBASE_LISTENERS', '1') == '1'
+    # With SHARED_SNAPSHOT_PATH set (gunicorn.conf.py sets it when SHARED_SNAPSHOT=1), one
+    # refresher process ('writer') runs the listeners and publishes the mirrors there; workers
+    # ('reader') map it instead of listening. With 'elect', workers elect that process among
+    # themselves via a lock file. Only worth it with several workers.
+    SHARED_SNAPSHOT_PATH = os.environ.get('SHARED_SNAPSHOT_PATH', '')
+    SHARED_SNAPSHOT_ROLE = os.environ.get('SHARED_SNAPSHOT_ROLE', 'reader')
+    SHARED_SNAPSHOT_SIZE = int(os.environ.get('SHARED_SNAPSHOT_SIZE', 64 * 1024 * 1024))
+    SHARED_SNAPSHOT_MAX_AGE = float(os.environ.get('SHARED_SNAPSHOT_MAX_AGE', 30))
+
+    # Number of proxies in front of the app whose X-Forwarded-For entries are trusted for the
+    # client address (rate limits key on it); set 1 behind one proxy such as Railway's
+    PROXY_FIX_X_FOR = int(os.environ.get('PROXY_FIX_X_FOR', 0))
+    # Admission control for /api: each client may make API_RATE_LIMIT requests per minute to
+    # each endpoint, in bursts of up to API_RATE_BURST (API_RATE_LIMITS, a JSON object of
+    # endpoint -> [per_minute, burst], overrides that; 0 disables), else 429. At most
+    # API_MAX_CONCURRENCY requests run at once and API_QUEUE_SIZE more wait up to
+    # API_QUEUE_TIMEOUT seconds for a slot, else 503. Rate limits default to off unless
+    # PROXY_FIX_X_FOR is set: behind an unconfigured proxy every client shares its address.
+    API_RATE_LIMIT = float(os.environ.get('API_RATE_LIMIT', 120 if PROXY_FIX_X_FOR else 0))
+    API_RATE_BURST = int(os.environ.get('API_RATE_BURST', 30))
+    API_RATE_LIMITS = json.loads(os.environ.get('API_RATE_LIMITS') or json.dumps({
+        'api.toggle_appliance': [60, 10],
+        'api.set_floor_appliances': [30, 5],
+        'api.stream': [6, 3],
+    } if PROXY_FIX_X_FOR else {}))
+    API_MAX_CONCURRENCY = int(os.environ.get('API_MAX_CONCURRENCY', 32))
+    API_QUEUE_SIZE = int(os.environ.get('API_QUEUE_SIZE', 32))
+    API_QUEUE_TIMEOUT = float(os.environ.get('API_QUEUE_TIMEOUT', 0.5))
+
+    # /api responses recommend when to poll again (X-Poll-Interval): half the observed time
+    # between changes, at least POLL_DEFAULT_INTERVAL until a change has been seen, within
+    # POLL_MIN_INTERVAL..POLL_MAX_INTERVAL seconds, stretched under load
+    POLL_DEFAULT_INTERVAL = float(os.environ.get('POLL_DEFAULT_INTERVAL', 30))
+    POLL_MIN_INTERVAL = float(os.environ.get('POLL_MIN_INTERVAL', 30))
+    POLL_MAX_INTERVAL = float(os.environ.get('POLL_MAX_INTERVAL', 300))
+
+    # Link and serve the fingerprinted copies built by `python -m app.assets` (gunicorn.conf.py
+    # rebuilds them on start when static files changed); ignored in debug mode
+    ASSET_FINGERPRINTS = os.environ.get('ASSET_FINGERPRINTS', '1') == '1'
+
+    # /img/<width>/<name> serves WebP copies of static/images at these widths (needs Pillow),
+    # cached in IMAGE_CACHE_DIR and evicted least recently used beyond IMAGE_CACHE_MAX_BYTES
+    IMAGE_CACHE_DIR = os.environ.get('IMAGE_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'energy_dashboard_images'))
+    IMAGE_CACHE_MAX_BYTES = int(os.environ.get('IMAGE_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+    IMAGE_WIDTHS = [int(width) for width in os.environ.get('IMAGE_WIDTHS', '320,480,640,960').split(',')]
+    IMAGE_QUALITY = int(os.environ.get('IMAGE_QUALITY', 80))
+
+    # Threads serving Flask views when running under an ASGI server (asgi.py)
+    ASGI_THREADS = int(os.environ.get('ASGI_THREADS', 32))
+
+    # Logging: JSON lines (or 'text') to stdout via a background writer. Each call
+    # site may emit LOG_RATE_LIMIT records per LOG_RATE_INTERVAL seconds and
+    # messages longer than LOG_MAX_LENGTH characters are truncated.
+    LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+    LOG_FORMAT = os.environ.get('LOG_FORMAT', 'json')
+    LOG_RATE_LIMIT = int(os.environ.get('LOG_RATE_LIMIT', 20))
+    LOG_RATE_INTERVAL = float(os.environ.get('LOG_RATE_INTERVAL', 10))
+    LOG_MAX_LENGTH = int(os.environ.get('LOG_MAX_LENGTH', 2000))
+    LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE', 10000))
+
+    # Expose Prometheus-style metrics at /metrics
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') == '1'
+    # Bytes delivered by listen() streams are measured on every Nth event per path and estimated
+    # from that in between; 1 measures every event exactly. Reads are always measured exactly.
+    FIREBASE_BYTES_SAMPLE_EVERY = int(os.environ.get('FIREBASE_BYTES_SAMPLE_EVERY', 16))
+    # Record each request's Firebase reads (Server-Timing header, /debug/trace/<request_id>)
+    TRACING_ENABLED = os.environ.get('TRACING_ENABLED', '1') == '1'
+    TRACE_HISTORY = int(os.environ.get('TRACE_HISTORY', 200))
+    # Required for /debug/* endpoints; without it they are only served in debug mode
+    DEBUG_TOKEN = os.environ.get('DEBUG_TOKEN')
+    # Stack-sample this share of requests (0-1) into /debug/profiles; X-Profile: <DEBUG_TOKEN> forces it
+    PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))
+    PROFILE_INTERVAL = float(os.environ.get('PROFILE_INTERVAL', 0.005))
+    PROFILE_HISTORY = int(os.environ.get('PROFILE_HISTORY', 50))
+    # /debug/memory samples retained sizes this often (seconds) once first visited
+    MEMORY_SAMPLE_INTERVAL = float(os.environ.get('MEMORY_SAMPLE_INTERVAL', 60))
+
+    # Appliance commands are coalesced and written together every flush interval
+    APPLIANCE_FLUSH_INTERVAL = float(os.environ.get('APPLIANCE_FLUSH_INTERVAL', 0.25))
+    APPLIANCE_DEBOUNCE = float(os.environ.get('APPLIANCE_DEBOUNCE', 0.15))
+
+    # Notification rules: a JSON file of rule dicts (read by init_firebase), or the defaults below.
+    # Each rule targets an entity (battery, grid, floor, room) and fires when
+    # all of its 'when' conditions hold; 'becomes' matches a field transition.
+    NOTIFICATION_RULES_PATH = os.environ.get('NOTIFICATION_RULES_PATH')
+    NOTIFICATION_RULES = [
+        {
+            "id": "battery-low",
+            "entity": "battery",
+            "when": [{"field": "percentage", "op": "<", "value": 20}],
+            "priority": "high",
+            "title": "Battery Alert",
+            "message": "Battery level is low ({percentage}%)",
+            "action": "View Battery Status",
+            "action_url": "/battery/info",
+            "cooldown": 1800
+        },
+        {
+            "id": "grid-load-high",
+            "entity": "grid",
+            "when": [{"field": "load", "op": ">", "value": 90}],
+            "priority": "medium",
+            "title": "Grid Load",
+            "message": "Grid load is high ({load}%)",
+            "action": "View Grid",
+            "action_url": "/battery/grid",
+            "cooldown": 1800
+        },
+        {
+            "id": "floor-critical",
+            "entity": "floor",
+            "when": [{"field": "status", "op": "becomes", "value": "critical"}],
+            "priority": "critical",
+            "title": "Energy Consumption",
+            "message": "{name} is now in critical state",
+            "action": "View Floor Details",
+            "action_url": "/floor/{entity_id}",
+            "cooldown": 600
+        },
+        {
+            "id": "room-occupied-no-consumption",
+            "entity": "room",
+            "when": [
+                {"field": "occupied", "op": "==", "value": True},
+                {"field": "consumption", "op": "<=", "value": 0}
+            ],
+            "priority": "low",
+            "title": "Sensor Check",
+            "message": "{name} is occupied but reports no consumption",
+            "cooldown": 3600
+        }
+    ]
@@ -1,11 +1,158 @@
-import firebase_admin
-from firebase_admin import credentials, db, initialize_app
-import traceback
+import json
+import logging
 import os
+import threading
+import time
+
+from app.monitoring.startup import startup_timer
+
+logger = logging.getLogger(__name__)
 
 firebase_app = None
+snapshot_writer = None
+
+
+class FirebaseStatus:
+    """Where (background) Firebase initialization has got to.
+
+    state is 'pending', 'initializing', then 'ready', 'mock' (no credentials,
+    serving defaults) or 'failed'. Requests served before it settles fall
+    back to default data like mock mode does.
+    """
+
+    SETTLED = ('ready', 'mock', 'failed')
+
+    def __init__(self):
+        self.state = 'pending'
+        self.error = None
+        self.duration_ms = None
+        self.settled = threading.Event()
+        self._started = None
+
+    def start(self):
+        self.state = 'initializing'
+        self._started = time.perf_counter()
+
+    def finish(self, state, error=None):
+        self.state = state
+        self.error = error
+        if self._started is not None:
+            self.duration_ms = round((time.perf_counter() - self._started) * 1000, 1)
+        self.settled.set()
+        startup_timer.mark(f"firebase_{state}")
+
+    def to_dict(self):
+        return {'state': self.state, 'error': self.error, 'init_ms': self.duration_ms}
+
+
+firebase_status = FirebaseStatus()
+
 
 def init_firebase(app):
+    """Initialize Firebase, in a background thread when FIREBASE_INIT_ASYNC is set"""
+    from app.firebase.appliance_commands import appliance_commands
+    appliance_commands.configure(flush_interval=app.config.get('APPLIANCE_FLUSH_INTERVAL'),
+                                 debounce=app.config.get('APPLIANCE_DEBOUNCE'))
+
+    # A rules file replaces the default rules; a broken one is reported and the defaults kept
+    rules_path = app.config.get('NOTIFICATION_RULES_PATH')
+    if rules_path:
+        from app.firebase.notification_rules import read_rules
+        try:
+            app.config['NOTIFICATION_RULES'] = read_rules(rules_path)
+        except (OSError, ValueError) as e:
+            logger.error("Ignoring notification rules in %s: %s", rules_path, e)
+
+    from app.firebase.resilience import read_guard
+    read_guard.configure(timeout=app.config.get('FIREBASE_READ_TIMEOUT'),
+                         path_timeouts=app.config.get('FIREBASE_PATH_TIMEOUTS'),
+                         max_workers=app.config.get('FIREBASE_READ_WORKERS'),
+                         failure_threshold=app.config.get('FIREBASE_BREAKER_THRESHOLD'),
+                         reset_timeout=app.config.get('FIREBASE_BREAKER_RESET'))
+
+    # Serve the last-known-good snapshot until Firebase is up (and if it never comes up)
+    from app.firebase.listeners import mirrors
+    from app.firebase.snapshot import snapshot_cache, add_staleness_headers
+    snapshot_cache.configure(file=app.config.get('SNAPSHOT_PATH'),
+                             interval=app.config.get('SNAPSHOT_INTERVAL'),
+                             ttl=app.config.get('READ_CACHE_TTL'))
+    snapshot_cache.load()
+    for mirror in mirrors.values():
+        snapshot_cache.track(mirror)
+    snapshot_cache.start()
+
+    # Cache the heaviest paths for longer as the daily read budget runs out
+    from app.monitoring.usage import usage_ledger
+    usage_ledger.configure(byte_budget=app.config.get('FIREBASE_DAILY_BYTE_BUDGET'),
+                           read_budget=app.config.get('FIREBASE_DAILY_READ_BUDGET'),
+                           soft_limit=app.config.get('FIREBASE_BUDGET_SOFT_LIMIT'),
+                           budget_ttl=app.config.get('FIREBASE_BUDGET_TTL'))
+    usage_ledger.add_pressure_handler(snapshot_cache.set_ttl_overrides)
+    app.after_request(add_staleness_headers)
+
+    # Evict cached reads when this or another instance sees a path change
+    from app.firebase.invalidation import invalidator, create_bus
+    invalidator.add_handler(snapshot_cache.invalidate)
+    from app.firebase.aggregates import floors_loaded, people_loaded
+    from app.firebase.room_index import room_index_loaded
+    for loaded in (floors_loaded, people_loaded, room_index_loaded):
+        loaded.max_age = app.config.get('DERIVED_MAX_AGE', loaded.max_age)
+    if app.config.get('INVALIDATION_BUS'):
+        invalidator.configure(create_bus(app.config['INVALIDATION_BUS']))
+    startup_timer.mark('snapshot_loaded')
+
+    if _shared_snapshot_reader(app):
+        # The refresher (or elected leader) holds the listeners; follow the mirrors it publishes
+        from app.firebase.shared_snapshot import shared_reader
+        shared_reader.attach(app.config['SHARED_SNAPSHOT_PATH'], mirrors.values(),
+                             max_age=app.config.get('SHARED_SNAPSHOT_MAX_AGE'))
+
+    firebase_status.start()
+    if app.config.get('FIREBASE_INIT_ASYNC', True):
+        threading.Thread(target=_init_firebase, args=(app,), name='firebase-init', daemon=True).start()
+    else:
+        _init_firebase(app)
+
+
+def _shared_snapshot_reader(app):
+    return bool(app.config.get('SHARED_SNAPSHOT_PATH')) and \
+        app.config.get('SHARED_SNAPSHOT_ROLE') in ('reader', 'elect')
+
+
+def _start_listening(app):
+    """Hold the Firebase listen() streams in this process; safe to call again"""
+    global snapshot_writer
+    from app.firebase.listeners import mirrors, start_listeners
+    from app.firebase.notification_rules import notification_engine
+    from app.firebase.firebase_client import FirebaseClient
+    from app.firebase.invalidation import invalidator
+
+    # Rules are evaluated as listener events arrive
+    notification_engine.load_rules(app.config.get('NOTIFICATION_RULES'))
+    notification_engine.add_sink(FirebaseClient.add_notification)
+    start_listeners()
+
+    # This instance sees the changes, so it tells the others
+    for mirror in mirrors.values():
+        mirror.subscribe(invalidator.on_mirror_change)
+
+    if app.config.get('SHARED_SNAPSHOT_PATH') and snapshot_writer is None:
+        # Publish the mirrors for the other workers on this host
+        from app.firebase.shared_snapshot import SharedSnapshotWriter
+        snapshot_writer = SharedSnapshotWriter(app.config['SHARED_SNAPSHOT_PATH'],
+                                               app.config.get('SHARED_SNAPSHOT_SIZE'))
+        for mirror in mirrors.values():
+            snapshot_writer.track(mirror)
+        snapshot_writer.start()
+
+
+def _become_leader(app):
+    from app.firebase.shared_snapshot import shared_reader
+    shared_reader.detach()
+    _start_listening(app)
+
+
+def _init_firebase(app):
     global firebase_app
 
     # try:          # for local dev, uncomment this part 
@@ -35,34 +182,51 @@ def init_firebase(app):
 
     try:            # for production, uncomment this part
         cred_path = app.config.get('FIREBASE_CREDENTIALS_PATH') or os.environ.get('FIREBASE_CREDENTIALS_PATH')
+        # Railway/production pass the service account JSON itself; use it without writing it to disk
+        cred_json = os.environ.get('FIREBASE_CREDENTIALS_JSON')
         db_url = app.config.get('FIREBASE_DATABASE_URL') or os.environ.get('FIREBASE_DATABASE_URL')
         
-        print(f"Credentials path: {cred_path}")
-        print(f"Database URL: {db_url}")
+        logger.info("Credentials: %s", 'FIREBASE_CREDENTIALS_JSON' if cred_json else cred_path)
+        logger.info("Database URL: %s", db_url)
 
-        if not cred_path or not os.path.exists(cred_path):
-            print(f"Warning: Firebase credentials file not found at {cred_path}")
-            print("Using mock data for development")
+        if not cred_json and (not cred_path or not os.path.exists(cred_path)):
+            logger.warning("Firebase credentials file not found at %s; using mock data for development", cred_path)
+            firebase_status.finish('mock')
             return
 
         if not db_url:
-            print("Warning: Firebase database URL not set")
-            print("Using mock data for development")
+            logger.warning("Firebase database URL not set; using mock data for development")
+            firebase_status.finish('mock')
             return
 
+        # Deferred so cold start doesn't pay for google-auth/requests imports
+        import firebase_admin
+        from firebase_admin import credentials
+
         # Avoid double-initialization
         if not firebase_admin._apps:
-            cred = credentials.Certificate(cred_path)
+            cred = credentials.Certificate(json.loads(cred_json) if cred_json else cred_path)
             # firebase_app = firebase_admin.initialize_app(cred, {  # for local dev, uncomment this
             
             firebase_app = firebase_admin.initialize_app(cred, {   # for production, uncomment this
                 'databaseURL': db_url
             })
-            print("Firebase initialized successfully")
+            logger.info("Firebase initialized successfully")
         else:
-            print("Firebase already initialized.")
+            logger.info("Firebase already initialized.")
+
+        if app.config.get('FIREBASE_LISTENERS', True):
+            if not app.config.get('SHARED_SNAPSHOT_PATH') or app.config.get('SHARED_SNAPSHOT_ROLE') == 'writer':
+                _start_listening(app)
+            elif app.config.get('SHARED_SNAPSHOT_ROLE') == 'elect':
+                # Whichever worker holds the lock listens and publishes; the rest follow
+                from app.firebase.leader import listener_election
+                listener_election.start(app.config['SHARED_SNAPSHOT_PATH'] + '.lock',
+                                        lambda: _become_leader(app))
+
+        firebase_status.finish('ready')
+        startup_timer.log()
 
     except Exception as e:
-        print(f"Error initializing Firebase: {e}")
-        traceback.print_exc()
-        print("Using mock data for development")
+        logger.exception("Error initializing Firebase: %s; using mock data for development", e)
+        firebase_status.finish('failed', str(e))
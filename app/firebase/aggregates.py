@@ -0,0 +1,258 @@
+import threading
+from app.firebase.invalidation import LoadedState, invalidator
+from app.firebase.listeners import mirrors
+
+FLOOR_STATUSES = ('optimal', 'sub-optimal', 'critical')
+
+
+def _number(value):
+    """Coerce a consumption reading to a float, treating junk as 0"""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _floor_status(floor):
+    return str(floor.get('status', 'optimal')).lower()
+
+
+def _room_occupants(room):
+    """Number of people in a room, from either 'occupancy' or 'occupied'"""
+    if 'occupancy' in room:
+        return int(_number(room.get('occupancy')))
+    return 1 if room.get('occupied') else 0
+
+
+class BuildingAggregates:
+    """Building-wide totals maintained incrementally as floors, rooms and people change.
+
+    Every update subtracts the previous contribution of the changed entity and
+    adds the new one, so reading the totals never iterates the building.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self._floors = {}           # floor_id -> (status, consumption)
+        self._rooms = {}            # (floor_id, room_id) -> (consumption, occupants)
+        self._floor_rooms = {}      # floor_id -> {'consumption', 'occupants', 'occupied_rooms', 'rooms'}
+        self._people = {}           # person_id -> current location
+        self.status_counts = dict.fromkeys(FLOOR_STATUSES, 0)
+        self.total_consumption = 0.0
+        self.room_consumption = 0.0
+        self.room_occupants = 0
+        self.occupied_rooms = 0
+        self.location_counts = {}
+        self.people_total = 0
+
+    # Floors and rooms
+
+    def set_floor(self, floor_id, floor):
+        """Replace one floor (summary and rooms); None removes it"""
+        with self._lock:
+            self._set_floor_summary(floor_id, floor)
+            rooms = floor.get('rooms') if isinstance(floor, dict) else None
+            self._set_floor_rooms(floor_id, rooms)
+
+    def set_floor_summary(self, floor_id, floor):
+        """Update a floor's status/consumption without touching its rooms"""
+        with self._lock:
+            self._set_floor_summary(floor_id, floor)
+
+    def set_floor_rooms(self, floor_id, rooms):
+        """Replace every room on one floor"""
+        with self._lock:
+            self._set_floor_rooms(floor_id, rooms)
+
+    def set_room(self, floor_id, room_id, room):
+        """Replace one room; None removes it"""
+        with self._lock:
+            self._set_room(floor_id, room_id, room)
+
+    def load_floors(self, floors):
+        """Rebuild floor and room totals from a full floors tree or list"""
+        if isinstance(floors, list):
+            floors = {str(floor.get('id', i)): floor for i, floor in enumerate(floors)
+                      if isinstance(floor, dict)}
+        with self._lock:
+            for floor_id in list(self._floors):
+                self._set_floor_summary(floor_id, None)
+            for floor_id in list(self._floor_rooms):
+                self._set_floor_rooms(floor_id, None)
+            for floor_id, floor in (floors or {}).items():
+                self._set_floor_summary(floor_id, floor)
+                if isinstance(floor, dict):
+                    self._set_floor_rooms(floor_id, floor.get('rooms'))
+
+    def load_floor_summaries(self, floors):
+        """Replace every floor's status and consumption from get_floors() summaries,
+        keeping the rooms already loaded"""
+        with self._lock:
+            floor_ids = set()
+            for floor in floors or []:
+                if isinstance(floor, dict) and floor.get('id') is not None:
+                    floor_ids.add(str(floor['id']))
+                    self._set_floor_summary(str(floor['id']), floor)
+            for floor_id in list(self._floors):
+                if floor_id not in floor_ids:
+                    self._set_floor_summary(floor_id, None)
+
+    def _set_floor_summary(self, floor_id, floor):
+        old = self._floors.pop(floor_id, None)
+        if old:
+            status, consumption = old
+            if status in self.status_counts:
+                self.status_counts[status] -= 1
+            self.total_consumption -= consumption
+
+        if isinstance(floor, dict):
+            status = _floor_status(floor)
+            consumption = _number(floor.get('consumption', 0))
+            self._floors[floor_id] = (status, consumption)
+            if status in self.status_counts:
+                self.status_counts[status] += 1
+            self.total_consumption += consumption
+
+    def _set_floor_rooms(self, floor_id, rooms):
+        totals = self._floor_rooms.get(floor_id)
+        if totals:
+            for room_id in list(totals['rooms']):
+                self._set_room(floor_id, room_id, None)
+        if isinstance(rooms, dict):
+            for room_id, room in rooms.items():
+                self._set_room(floor_id, room_id, room)
+
+    def _set_room(self, floor_id, room_id, room):
+        totals = self._floor_rooms.setdefault(floor_id, {
+            'consumption': 0.0, 'occupants': 0, 'occupied_rooms': 0, 'rooms': set()
+        })
+
+        old = self._rooms.pop((floor_id, room_id), None)
+        if old:
+            consumption, occupants = old
+            totals['consumption'] -= consumption
+            totals['occupants'] -= occupants
+            totals['occupied_rooms'] -= 1 if occupants else 0
+            totals['rooms'].discard(room_id)
+            self.room_consumption -= consumption
+            self.room_occupants -= occupants
+            self.occupied_rooms -= 1 if occupants else 0
+
+        if isinstance(room, dict):
+            consumption = _number(room.get('consumption', 0))
+            occupants = _room_occupants(room)
+            self._rooms[(floor_id, room_id)] = (consumption, occupants)
+            totals['consumption'] += consumption
+            totals['occupants'] += occupants
+            totals['occupied_rooms'] += 1 if occupants else 0
+            totals['rooms'].add(room_id)
+            self.room_consumption += consumption
+            self.room_occupants += occupants
+            self.occupied_rooms += 1 if occupants else 0
+
+        if not totals['rooms']:
+            del self._floor_rooms[floor_id]
+
+    # People
+
+    def set_person(self, person_id, person):
+        """Move one person to their current location; None removes them"""
+        with self._lock:
+            self._set_person(person_id, person)
+
+    def load_people(self, people):
+        """Rebuild location counts from the full /people tree"""
+        with self._lock:
+            for person_id in list(self._people):
+                self._set_person(person_id, None)
+            for person_id, person in (people or {}).items():
+                self._set_person(person_id, person)
+
+    def load_locations(self, location_dict):
+        """Rebuild location counts from get_people_by_location() output"""
+        people = {}
+        for location, names in location_dict.items():
+            for i, name in enumerate(names):
+                people[f"{location}/{i}"] = {'locations': {'current': location}, 'name': name}
+        self.load_people(people)
+
+    def _set_person(self, person_id, person):
+        old_location = self._people.pop(person_id, None)
+        if old_location:
+            self.location_counts[old_location] -= 1
+            if not self.location_counts[old_location]:
+                del self.location_counts[old_location]
+            self.people_total -= 1
+
+        location = None
+        if isinstance(person, dict):
+            locations = person.get('locations')
+            if isinstance(locations, dict):
+                location = locations.get('current')
+        if location:
+            self._people[person_id] = location
+            self.location_counts[location] = self.location_counts.get(location, 0) + 1
+            self.people_total += 1
+
+    # Reads
+
+    def snapshot(self):
+        """Current totals as a plain dict, ready for templates or jsonify"""
+        with self._lock:
+            return {
+                'floor_status_counts': dict(self.status_counts),
+                'floor_count': len(self._floors),
+                'total_consumption': round(self.total_consumption, 3),
+                'floor_consumption': {
+                    floor_id: consumption for floor_id, (_, consumption) in self._floors.items()
+                },
+                'floor_room_consumption': {
+                    floor_id: round(totals['consumption'], 3)
+                    for floor_id, totals in self._floor_rooms.items()
+                },
+                'room_consumption': round(self.room_consumption, 3),
+                'room_occupants': self.room_occupants,
+                'occupied_rooms': self.occupied_rooms,
+                'room_count': len(self._rooms),
+                'occupancy': {
+                    'rooms': dict(self.location_counts),
+                    'total': self.people_total
+                }
+            }
+
+    # Mirror subscribers
+
+    def on_floors_change(self, mirror, parts, old, new):
+        if not parts:
+            self.load_floors(new)
+            return
+
+        floor_id = parts[0]
+        if len(parts) == 1:
+            self.set_floor(floor_id, new)
+        elif parts[1] != 'rooms':
+            self.set_floor_summary(floor_id, mirror.get(parts[:1]))
+        elif len(parts) == 2:
+            self.set_floor_rooms(floor_id, new)
+        else:
+            self.set_room(floor_id, parts[2], mirror.get(parts[:3]))
+
+    def on_people_change(self, mirror, parts, old, new):
+        if not parts:
+            self.load_people(new)
+        else:
+            self.set_person(parts[0], mirror.get(parts[:1]))
+
+
+building_aggregates = BuildingAggregates()
+mirrors['floors'].subscribe(building_aggregates.on_floors_change)
+mirrors['people'].subscribe(building_aggregates.on_people_change)
+
+# Without listeners the totals are loaded from one-off reads instead (see get_building_totals)
+floors_loaded = LoadedState(mirrors['floors'].path)
+people_loaded = LoadedState(mirrors['people'].path)
+invalidator.add_handler(floors_loaded.invalidate)
+invalidator.add_handler(people_loaded.invalidate)
@@ -0,0 +1,155 @@
+from app.firebase.lazy import db
+from collections import OrderedDict
+import threading
+import time
+import logging
+import uuid
+from app.firebase.listeners import mirrors
+from app.firebase.invalidation import invalidator
+
+logger = logging.getLogger(__name__)
+
+
+class ApplianceCommandBatcher:
+    """Coalesces appliance commands into one multi-location update() per flush.
+
+    Commands for the same appliance path replace each other while pending, so
+    rapid toggles only write the final state. A path is held back until it has
+    been quiet for `debounce` seconds (but never longer than `max_delay`), and
+    everything that is ready is written together every `flush_interval`.
+    Callers get a command id back immediately and can poll status() for the ack.
+    Acks are kept in this process only, so under several workers a command's
+    status is only known to the worker that queued it.
+    """
+
+    def __init__(self, base_path, flush_interval=0.25, debounce=0.15, max_delay=2.0, history=1000):
+        self.base_path = base_path.rstrip('/')
+        self.flush_interval = flush_interval
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self._history = history
+        self._cond = threading.Condition()
+        self._pending = {}                  # path -> {'state', 'commands', 'first', 'last'}
+        self._acks = OrderedDict()          # command_id -> ack dict
+        self._worker = None
+
+    def configure(self, flush_interval=None, debounce=None, max_delay=None):
+        """Adjust timings, e.g. from app config"""
+        with self._cond:
+            if flush_interval is not None:
+                self.flush_interval = flush_interval
+            if debounce is not None:
+                self.debounce = debounce
+            if max_delay is not None:
+                self.max_delay = max_delay
+
+    def submit(self, path, state):
+        """Queue one state change; returns its ack dict"""
+        return self.submit_many([(path, state)])[0]
+
+    def submit_many(self, commands):
+        """Queue several (path, state) changes at once; returns their ack dicts"""
+        acks = []
+        now = time.monotonic()
+        with self._cond:
+            for path, state in commands:
+                command_id = uuid.uuid4().hex
+                ack = {'id': command_id, 'path': path, 'state': state, 'status': 'queued'}
+                self._remember(ack)
+
+                pending = self._pending.get(path)
+                if pending:
+                    # Latest command wins; earlier ones resolve with it
+                    pending['state'] = state
+                    pending['last'] = now
+                    pending['commands'].append(command_id)
+                else:
+                    self._pending[path] = {'state': state, 'commands': [command_id], 'first': now, 'last': now}
+                acks.append(dict(ack))
+
+            self._ensure_worker()
+            self._cond.notify()
+        return acks
+
+    def status(self, command_id):
+        """Return the current ack for a command, or None if unknown/expired"""
+        with self._cond:
+            ack = self._acks.get(command_id)
+            return dict(ack) if ack else None
+
+    def flush(self, force=False):
+        """Write every ready command in a single update(); returns the number of paths written"""
+        now = time.monotonic()
+        with self._cond:
+            ready = {}
+            for path, pending in list(self._pending.items()):
+                quiet = now - pending['last'] >= self.debounce
+                overdue = now - pending['first'] >= self.max_delay
+                if force or quiet or overdue:
+                    ready[path] = self._pending.pop(path)
+            if not ready:
+                return 0
+
+        results = {}                        # path -> (status, error)
+        updates = {}
+        for path, pending in ready.items():
+            try:
+                updates[self._relative(path)] = pending['state']
+            except ValueError as e:
+                logger.error("Dropping appliance command: %s", e)
+                results[path] = ('failed', str(e))
+        if updates:
+            try:
+                db.reference(self.base_path).update(updates)
+                outcome = ('applied', None)
+            except Exception as e:
+                logger.exception("Error writing %s appliance commands: %s", len(updates), e)
+                outcome = ('failed', str(e))
+            for path in ready:
+                results.setdefault(path, outcome)
+            if outcome[0] == 'applied':
+                invalidator.changed([path for path, (status, _) in results.items() if status == 'applied'])
+
+        with self._cond:
+            for path, pending in ready.items():
+                status, error = results[path]
+                final_id = pending['commands'][-1]
+                for command_id in pending['commands']:
+                    ack = self._acks.get(command_id)
+                    if not ack:
+                        continue
+                    ack['status'] = status if command_id == final_id or status == 'failed' else 'coalesced'
+                    ack['applied_state'] = pending['state']
+                    if error:
+                        ack['error'] = error
+        return len(updates)
+
+    def _relative(self, path):
+        path = path.rstrip('/')
+        if path.startswith(self.base_path + '/'):
+            return path[len(self.base_path) + 1:]
+        raise ValueError(f"{path} is outside {self.base_path}")
+
+    def _remember(self, ack):
+        self._acks[ack['id']] = ack
+        while len(self._acks) > self._history:
+            self._acks.popitem(last=False)
+
+    def _ensure_worker(self):
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._run, name='appliance-commands', daemon=True)
+            self._worker.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                logger.exception("Error flushing appliance commands: %s", e)
+
+
+appliance_commands = ApplianceCommandBatcher(mirrors['floors'].path)
@@ -0,0 +1,132 @@
+import asyncio
+import json
+import logging
+import queue
+import threading
+
+from app.firebase.listeners import mirrors
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """One client's bounded queue of change events; if the client falls behind,
+    its backlog is replaced by a single 'resync' event"""
+
+    def __init__(self, feed, maxsize):
+        self.feed = feed
+        self.maxsize = maxsize
+        self._queue = queue.Queue(maxsize)
+
+    def put(self, event):
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self._overflow()
+
+    def _overflow(self):
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                break
+        self._queue.put_nowait({'event': 'resync'})
+
+    def get(self, timeout=None):
+        """Next event, or None after `timeout` seconds without one"""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.feed.unsubscribe(self)
+
+
+class AsyncSubscription(Subscription):
+    """Subscription consumed from an event loop; puts are handed to the loop"""
+
+    def __init__(self, feed, maxsize, loop):
+        super().__init__(feed, maxsize)
+        self.loop = loop
+        self._queue = asyncio.Queue(maxsize)
+
+    def put(self, event):
+        self.loop.call_soon_threadsafe(self._put, event)
+
+    def _put(self, event):
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self._overflow()
+
+    def _overflow(self):
+        while not self._queue.empty():
+            self._queue.get_nowait()
+        self._queue.put_nowait({'event': 'resync'})
+
+    async def get(self, timeout=None):
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class ChangeFeed:
+    """Fans mirror changes out to push clients (server-sent events).
+
+    Events carry the mirror name, the changed path and the mirror version,
+    not the data; clients refetch the endpoint that shows it.
+    """
+
+    def __init__(self, maxsize=100):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._subscriptions = []
+
+    def subscribe(self):
+        return self._add(Subscription(self, self.maxsize))
+
+    def subscribe_async(self, loop):
+        return self._add(AsyncSubscription(self, self.maxsize, loop))
+
+    def _add(self, subscription):
+        with self._lock:
+            self._subscriptions.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            if subscription in self._subscriptions:
+                self._subscriptions.remove(subscription)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._subscriptions)
+
+    def on_mirror_change(self, mirror, parts, old, new):
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        if not subscriptions:
+            return
+        event = {'event': mirror.name, 'path': '/'.join(parts), 'version': mirror.version}
+        for subscription in subscriptions:
+            try:
+                subscription.put(event)
+            except RuntimeError:
+                # Its event loop has closed
+                self.unsubscribe(subscription)
+
+
+def format_event(event):
+    """One server-sent event frame"""
+    name = event.get('event', 'message')
+    data = json.dumps({key: value for key, value in event.items() if key != 'event'})
+    return f"event: {name}\ndata: {data}\n\n"
+
+
+change_feed = ChangeFeed()
+mirrors['battery'].subscribe(change_feed.on_mirror_change)
+mirrors['grid'].subscribe(change_feed.on_mirror_change)
+mirrors['floors'].subscribe(change_feed.on_mirror_change)
+mirrors['people'].subscribe(change_feed.on_mirror_change)
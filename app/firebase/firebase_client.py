@@ -1,15 +1,38 @@
-from firebase_admin import db
-import traceback
+from app.firebase.lazy import db
+import logging
+from app.firebase import firebase_status
+from app.firebase.listeners import mirrors
+from app.firebase.aggregates import building_aggregates, floors_loaded, people_loaded
+from app.firebase.room_index import room_index, room_index_loaded
+from app.firebase.appliance_commands import appliance_commands
+from app.firebase.invalidation import invalidator
+from app.firebase.snapshot import snapshot_cache
+from app.firebase.resilience import read_guard
+from app.monitoring.metrics import record_cache
+
+logger = logging.getLogger(__name__)
+
+# Shown when Firebase has no room data at all
+DEFAULT_ROOMS = [
+    {"id": "room1", "name": "Living Room", "consumption": 2125, "status": "optimal"},
+    {"id": "room2", "name": "Kitchen", "consumption": 3000, "status": "sub-optimal"},
+    {"id": "room3", "name": "Office", "consumption": 2000, "status": "critical"}
+]
 
 class FirebaseClient:
+    @staticmethod
+    def _read(path):
+        """Read one node, falling back to the last-known-good snapshot when the read
+        fails, times out or is short-circuited; while Firebase is still initializing
+        the snapshot is served directly"""
+        return snapshot_cache.fetch(path, lambda: read_guard.get(db.reference(path)),
+                                    prefer_cached=firebase_status.state in ('pending', 'initializing'))
+
     @staticmethod
     def get_battery_info():
         """Get battery information from Realtime Database"""
         try:
-            # Get reference to the database
-            ref = db.reference('/energy_dashboard')
-            battery_ref = ref.child('battery')
-            data = battery_ref.get()
+            data = FirebaseClient._read('/energy_dashboard/battery')
             
             # If we have data, make sure it has the right field names
             if data:
@@ -38,8 +61,7 @@ class FirebaseClient:
                     "status": "charging"
                 }
         except Exception as e:
-            print(f"Error getting battery info: {e}")
-            traceback.print_exc()
+            logger.exception("Error getting battery info: %s", e)
             return {
                 "percentage": 75,
                 "current_power": 3.2,
@@ -53,8 +75,7 @@ class FirebaseClient:
     def get_people_by_location():
         """Aggregate number of people in each location and list who they are."""
         try:
-            ref = db.reference('/people')
-            people_data = ref.get()
+            people_data = FirebaseClient._read('/people')
             location_dict = {}
             if people_data:
                 for user, user_data in people_data.items():
@@ -70,140 +91,207 @@ class FirebaseClient:
             # Prepare the result: {location: [user1, user2, ...]}
             return location_dict
         except Exception as e:
-            print(f"Error aggregating people by location: {e}")
-            traceback.print_exc()
+            logger.exception("Error aggregating people by location: %s", e)
             return {}  # fallback empty dict
 
     @staticmethod
     def get_visitors():
         """Get visitors information"""
         try:
-            # Get reference to the database
-            ref = db.reference('/energy_dashboard')
-            visitors_ref = ref.child('visitors')
-            return visitors_ref.get() or {"count": 100, "trend": "up"}
+            return FirebaseClient._read('/energy_dashboard/visitors') or {"count": 100, "trend": "up"}
         except Exception as e:
-            print(f"Error getting visitors info: {e}")
-            traceback.print_exc()
+            logger.exception("Error getting visitors info: %s", e)
             return {"count": 100, "trend": "up", "error": str(e)}
 
+    # Where notifications live; the first path that has data wins
+    NOTIFICATION_PATHS = [
+        '/energy_dashboard/notifications',
+        '/notifications',
+        '/alerts'
+    ]
+    UNREAD_COUNT_PATH = '/energy_dashboard/notifications_meta/unread_count'
+    _notifications_path = None
+
+    @staticmethod
+    def _resolve_notifications_path():
+        """Find (once) which path holds notifications, reading one item per path"""
+        if FirebaseClient._notifications_path:
+            return FirebaseClient._notifications_path
+
+        for path in FirebaseClient.NOTIFICATION_PATHS:
+            try:
+                if read_guard.get(db.reference(path).order_by_key().limit_to_last(1), path):
+                    logger.info("Found notifications at path: %s", path)
+                    FirebaseClient._notifications_path = path
+                    return path
+            except Exception as path_error:
+                logger.warning("Error checking path %s: %s", path, path_error)
+
+        # Nothing anywhere yet: new notifications go to the first path
+        return FirebaseClient.NOTIFICATION_PATHS[0]
+
+    @staticmethod
+    def _process_notification(key, notification):
+        """Ensure a notification has the fields templates and the API expect"""
+        return {
+            'id': str(key),
+            'title': str(notification.get('title', 'Notification')),
+            'message': str(notification.get('message', 'No details provided')),
+            'timestamp': str(notification.get('timestamp', '')),
+            'action': str(notification.get('action', '')),
+            'action_url': str(notification.get('action_url', '#')),
+            'priority': str(notification.get('priority', 'info')).lower(),
+            'read': bool(notification.get('read', False))
+        }
+
     @staticmethod
-    def get_notifications():
-        """Get notifications from Realtime Database"""
+    def get_notifications(limit=20, before=None):
+        """Get one page of notifications, newest first.
+
+        Returns (notifications, next_before); pass next_before back as
+        `before` to fetch the next (older) page. It is None on the last page.
+        """
         try:
-            # Get reference to the notifications in the database
-            # Print the database structure to help debug
-            root_ref = db.reference('/')
-            print("\nFirebase Database Structure:")
-            print(root_ref.get())
-            
-            # Try different paths to find notifications
-            possible_paths = [
-                '/energy_dashboard/notifications',
-                '/notifications',
-                '/alerts'
-            ]
-            
-            notifications_data = None
-            used_path = None
-            
-            for path in possible_paths:
-                try:
-                    ref = db.reference(path)
-                    data = ref.get()
-                    if data:
-                        notifications_data = data
-                        used_path = path
-                        print(f"\nFound notifications at path: {path}")
-                        break
-                except Exception as path_error:
-                    print(f"Error checking path {path}: {str(path_error)}")
-            
-            if notifications_data is None:
-                print("\nWARNING: No notifications found in Firebase at any of the checked paths!")
-                print("Please check your Firebase database structure and ensure notifications exist.")
-                return []
-                
-            print(f"\nRaw notifications data from {used_path}:")
-            print(notifications_data)
-            
-            # Process notifications
+            path = FirebaseClient._resolve_notifications_path()
+
+            # Ask for one spare item to learn whether an older page exists,
+            # plus the cursor itself since end_at() is inclusive
+            query = db.reference(path).order_by_key()
+            if before:
+                query = query.end_at(str(before))
+            count = limit + (2 if before else 1)
+            query = query.limit_to_last(count)
+            notifications_data = snapshot_cache.fetch(
+                path, lambda: read_guard.get(query, path),
+                prefer_cached=firebase_status.state in ('pending', 'initializing'),
+                query=f"last={count}" + (f"&end={before}" if before else '')) or {}
+
+            # Firebase arrays come back as lists
+            if isinstance(notifications_data, list):
+                notifications_data = {str(i): item for i, item in enumerate(notifications_data)
+                                      if item is not None}
+
+            keys = [key for key in notifications_data if key != before]
+            has_more = len(keys) > limit
+            keys = keys[-limit:]
+
             processed_notifications = []
-            
-            # Handle different data structures: dict or list
-            if isinstance(notifications_data, dict):
-                for key, notification in notifications_data.items():
-                    if not isinstance(notification, dict):
-                        print(f"Warning: Notification {key} is not a dictionary: {notification}")
-                        continue
-                        
-                    # Ensure each notification has the required fields
-                    processed_notification = {
-                        'id': str(key),
-                        'title': str(notification.get('title', 'Notification')),
-                        'message': str(notification.get('message', 'No details provided')),
-                        'timestamp': str(notification.get('timestamp', '')),
-                        'action': str(notification.get('action', '')),
-                        'action_url': str(notification.get('action_url', '#')),
-                        'priority': str(notification.get('priority', 'info')).lower()
-                    }
-                    processed_notifications.append(processed_notification)
-            
-            elif isinstance(notifications_data, list):
-                # If it's already a list, process each notification
-                for i, notification in enumerate(notifications_data):
-                    if not isinstance(notification, dict):
-                        print(f"Warning: Notification at index {i} is not a dictionary: {notification}")
-                        continue
-                        
-                    processed_notification = {
-                        'id': str(i),
-                        'title': str(notification.get('title', 'Notification')),
-                        'message': str(notification.get('message', 'No details provided')),
-                        'timestamp': str(notification.get('timestamp', '')),
-                        'action': str(notification.get('action', '')),
-                        'action_url': str(notification.get('action_url', '#')),
-                        'priority': str(notification.get('priority', 'info')).lower()
-                    }
-                    processed_notifications.append(processed_notification)
-            else:
-                print(f"Warning: Notifications data is neither a dict nor a list: {type(notifications_data)}")
-            
-            # Print debug information
-            print(f"\nFetched {len(processed_notifications)} notifications from Firebase")
-            print("Processed Notifications:")
-            for notification in processed_notifications:
-                print(f"  - {notification['title']}: {notification['message']}")
-            
-            return processed_notifications
-        
+            for key in reversed(keys):
+                notification = notifications_data[key]
+                if not isinstance(notification, dict):
+                    logger.warning("Notification %s is not a dictionary: %s", key, notification)
+                    continue
+                processed_notifications.append(FirebaseClient._process_notification(key, notification))
+
+            next_before = keys[0] if has_more and keys else None
+            return processed_notifications, next_before
+
         except Exception as e:
-            print(f"Error fetching notifications: {str(e)}")
-            traceback.print_exc()
-            # Return empty list instead of default data
-            return []
+            logger.exception("Error fetching notifications: %s", e)
+            # Return an empty page instead of default data
+            return [], None
+
+    @staticmethod
+    def _change_unread_count(delta):
+        """Adjust the stored unread counter atomically, never below zero"""
+        def update(current):
+            if current is None:
+                # Not initialized yet; get_unread_count() will recount
+                return None
+            return max(0, int(current) + delta)
+
+        try:
+            db.reference(FirebaseClient.UNREAD_COUNT_PATH).transaction(update)
+            invalidator.changed([FirebaseClient.UNREAD_COUNT_PATH])
+        except Exception as e:
+            logger.exception("Error updating unread count: %s", e)
+
+    @staticmethod
+    def get_unread_count():
+        """Get the number of unread notifications from the maintained counter"""
+        try:
+            count = FirebaseClient._read(FirebaseClient.UNREAD_COUNT_PATH)
+            if count is None:
+                count = FirebaseClient.recount_unread()
+            return int(count)
+        except Exception as e:
+            logger.exception("Error getting unread count: %s", e)
+            return 0
+
+    @staticmethod
+    def recount_unread():
+        """Rebuild the unread counter with a one-off scan of all notifications"""
+        path = FirebaseClient._resolve_notifications_path()
+        notifications_data = read_guard.get(db.reference(path)) or {}
+        if isinstance(notifications_data, list):
+            notifications_data = dict(enumerate(notifications_data))
+        count = sum(1 for notification in notifications_data.values()
+                    if isinstance(notification, dict) and not notification.get('read', False))
+        db.reference(FirebaseClient.UNREAD_COUNT_PATH).set(count)
+        invalidator.changed([FirebaseClient.UNREAD_COUNT_PATH])
+        logger.info("Recounted %s unread notifications", count)
+        return count
+
+    @staticmethod
+    def mark_notification_read(notification_id, read=True):
+        """Set a notification's read state, keeping the unread counter in step"""
+        try:
+            path = FirebaseClient._resolve_notifications_path()
+            notification_ref = db.reference(path).child(str(notification_id))
+            if not read_guard.get(notification_ref, shallow=True):
+                return False
+
+            # Flip the flag in a transaction so concurrent clicks count once
+            previous = {}
+            def update(current):
+                previous['read'] = bool(current)
+                return bool(read)
+            notification_ref.child('read').transaction(update)
+
+            if previous.get('read') != bool(read):
+                invalidator.changed([f"{path}/{notification_id}"])
+                FirebaseClient._change_unread_count(-1 if read else 1)
+            return True
+        except Exception as e:
+            logger.exception("Error marking notification %s: %s", notification_id, e)
+            return False
+
+    @staticmethod
+    def add_notification(notification):
+        """Append a notification to the Realtime Database"""
+        try:
+            path = FirebaseClient._resolve_notifications_path()
+            notification = dict(notification, read=False)
+            key = db.reference(path).push(notification).key
+            invalidator.changed([f"{path}/{key}"])
+            FirebaseClient._change_unread_count(1)
+            return key
+        except Exception as e:
+            logger.exception("Error adding notification: %s", e)
+            return None
     
     @staticmethod
     def get_grid_info():
         """Get grid information"""
         try:
-            # Get reference to the database
-            ref = db.reference('/energy_dashboard')
-            grid_ref = ref.child('grid')
-            return grid_ref.get() or {"status": "connected", "load": 80}
+            return FirebaseClient._read('/energy_dashboard/grid') or {"status": "connected", "load": 80}
         except Exception as e:
-            print(f"Error getting grid info: {e}")
-            traceback.print_exc()
+            logger.exception("Error getting grid info: %s", e)
             return {"status": "connected", "load": 80, "error": str(e)}
     
     @staticmethod
     def get_floors():
         """Get floors data from Realtime Database"""
         try:
-            # Print the database structure to help debug
-            root_ref = db.reference('/')
-            print("\nFirebase Database Structure:")
-            print(root_ref.get())
+            # Serve straight from the live mirror once the listener has synced
+            floors_mirror = mirrors['floors']
+            record_cache('floors_mirror', floors_mirror.ready)
+            if floors_mirror.ready:
+                return FirebaseClient._process_floors(floors_mirror.get() or {})
+
+            # Dump the database structure to help debug; this reads the whole root
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Firebase database structure: %s", read_guard.get(db.reference('/')))
             
             # Try different paths to find floors data
             possible_paths = [
@@ -217,19 +305,18 @@ class FirebaseClient:
             
             for path in possible_paths:
                 try:
-                    ref = db.reference(path)
-                    data = ref.get()
+                    data = FirebaseClient._read(path)
                     if data:
                         floors_data = data
                         used_path = path
-                        print(f"\nFound floors data at path: {path}")
+                        logger.debug("Found floors data at path: %s", path)
                         break
                 except Exception as path_error:
-                    print(f"Error checking path {path}: {str(path_error)}")
+                    logger.warning("Error checking path %s: %s", path, path_error)
             
             if floors_data is None:
-                print("\nWARNING: No floors data found in Firebase at any of the checked paths!")
-                print("Falling back to default floor data")
+                logger.warning("No floors data found in Firebase at any of the checked paths; "
+                               "falling back to default floor data")
                 # Return default data if nothing found in Firebase
                 return [
                     {"id": "floor1", "name": "First Floor", "consumption": 12, "status": "optimal"},
@@ -237,57 +324,16 @@ class FirebaseClient:
                     {"id": "floor3", "name": "Third Floor", "consumption": 2.2, "status": "critical"}
                 ]
                 
-            print(f"\nRaw floors data from {used_path}:")
-            print(floors_data)
+            logger.debug("Raw floors data from %s: %s", used_path, floors_data)
             
-            # Process floors data
-            processed_floors = []
+            processed_floors = FirebaseClient._process_floors(floors_data)
             
-            # Handle different data structures: dict or list
-            if isinstance(floors_data, dict):
-                for key, floor in floors_data.items():
-                    if not isinstance(floor, dict):
-                        print(f"Warning: Floor {key} is not a dictionary: {floor}")
-                        continue
-                        
-                    # Ensure each floor has the required fields
-                    processed_floor = {
-                        'id': str(key),
-                        'name': str(floor.get('name', f'Floor {key}')),
-                        'consumption': floor.get('consumption', 0),
-                        'status': str(floor.get('status', 'optimal')).lower()
-                    }
-                    processed_floors.append(processed_floor)
-            
-            elif isinstance(floors_data, list):
-                # If it's already a list, process each floor
-                for i, floor in enumerate(floors_data):
-                    if not isinstance(floor, dict):
-                        print(f"Warning: Floor at index {i} is not a dictionary: {floor}")
-                        continue
-                        
-                    # Make sure it has an ID
-                    if 'id' not in floor:
-                        floor['id'] = f"floor{i+1}"
-                        
-                    processed_floor = {
-                        'id': str(floor.get('id')),
-                        'name': str(floor.get('name', f'Floor {i+1}')),
-                        'consumption': floor.get('consumption', 0),
-                        'status': str(floor.get('status', 'optimal')).lower()
-                    }
-                    processed_floors.append(processed_floor)
-            
-            # Print debug information
-            print(f"\nProcessed {len(processed_floors)} floors from Firebase")
-            for floor in processed_floors:
-                print(f"  - {floor['name']} (ID: {floor['id']}): {floor['status']}, {floor['consumption']} kWh")
+            logger.debug("Processed %d floors from Firebase: %s", len(processed_floors), processed_floors)
             
             return processed_floors
         
         except Exception as e:
-            print(f"Error fetching floors: {str(e)}")
-            traceback.print_exc()
+            logger.exception("Error fetching floors: %s", e)
             # Return default data in case of error
             return [
                 {"id": "floor1", "name": "First Floor", "consumption": 12, "status": "optimal"},
@@ -295,6 +341,72 @@ class FirebaseClient:
                 {"id": "floor3", "name": "Third Floor", "consumption": 2.2, "status": "critical"}
             ]
             
+    @staticmethod
+    def _process_floors(floors_data):
+        """Normalize a raw floors node (dict or list) into a list of floor summaries"""
+        processed_floors = []
+        
+        # Handle different data structures: dict or list
+        if isinstance(floors_data, dict):
+            for key, floor in floors_data.items():
+                if not isinstance(floor, dict):
+                    logger.warning("Floor %s is not a dictionary: %s", key, floor)
+                    continue
+                    
+                # Ensure each floor has the required fields
+                processed_floor = {
+                    'id': str(key),
+                    'name': str(floor.get('name', f'Floor {key}')),
+                    'consumption': floor.get('consumption', 0),
+                    'status': str(floor.get('status', 'optimal')).lower()
+                }
+                processed_floors.append(processed_floor)
+        
+        elif isinstance(floors_data, list):
+            # If it's already a list, process each floor
+            for i, floor in enumerate(floors_data):
+                if not isinstance(floor, dict):
+                    logger.warning("Floor at index %s is not a dictionary: %s", i, floor)
+                    continue
+                    
+                processed_floor = {
+                    'id': str(floor.get('id', f"floor{i+1}")),
+                    'name': str(floor.get('name', f'Floor {i+1}')),
+                    'consumption': floor.get('consumption', 0),
+                    'status': str(floor.get('status', 'optimal')).lower()
+                }
+                processed_floors.append(processed_floor)
+        
+        return processed_floors
+
+    @staticmethod
+    def get_building_totals(floors=None, locations=None):
+        """Get building-wide status counts, consumption and occupancy totals.
+
+        Pass get_floors() / get_people_by_location() results the caller already
+        has: the floor summaries are applied as they are, so the totals match the
+        page they are shown on, and the people aren't read again.
+        """
+        try:
+            # Listeners keep the aggregates current; without them, load them from a
+            # one-off read and again only once that is invalidated. Room totals need
+            # the raw tree; get_floors() summaries drop the rooms.
+            current = True
+            if not mirrors['floors'].ready:
+                floors_mirror = mirrors['floors']
+                current &= floors_loaded.ensure(lambda: building_aggregates.load_floors(
+                    FirebaseClient._read(floors_mirror.path) or {}))
+                if floors is not None:
+                    building_aggregates.load_floor_summaries(floors)
+            if not mirrors['people'].ready:
+                current &= people_loaded.ensure(lambda: building_aggregates.load_locations(
+                    locations if locations is not None else FirebaseClient.get_people_by_location()))
+            record_cache('building_aggregates', current)
+            return building_aggregates.snapshot()
+        except Exception as e:
+            logger.exception("Error getting building totals: %s", e)
+            return building_aggregates.snapshot()
+
     @staticmethod
     def get_floor(floor_id):
         """Get specific floor data from Realtime Database"""
@@ -321,14 +433,13 @@ class FirebaseClient:
                         
                         for path in possible_paths:
                             try:
-                                ref = db.reference(path)
-                                data = ref.get()
+                                data = FirebaseClient._read(path)
                                 if data:
                                     rooms_data = data
-                                    print(f"\nFound rooms data at path: {path}")
+                                    logger.debug("Found rooms data at path: %s", path)
                                     break
                             except Exception as path_error:
-                                print(f"Error checking path {path}: {str(path_error)}")
+                                logger.warning("Error checking path %s: %s", path, path_error)
                         
                         if rooms_data:
                             # Process rooms data
@@ -340,7 +451,7 @@ class FirebaseClient:
                             elif isinstance(rooms_data, list):
                                 floor['rooms'] = rooms_data
                     except Exception as rooms_error:
-                        print(f"Error fetching rooms: {str(rooms_error)}")
+                        logger.exception("Error fetching rooms: %s", rooms_error)
                     
                     # If no rooms were found, add some default rooms
                     if not floor['rooms']:
@@ -372,8 +483,7 @@ class FirebaseClient:
             }
             
         except Exception as e:
-            print(f"Error fetching floor {floor_id}: {str(e)}")
-            traceback.print_exc()
+            logger.exception("Error fetching floor %s: %s", floor_id, e)
             
             # Return default data in case of error
             status = "optimal"
@@ -393,3 +503,100 @@ class FirebaseClient:
                     {"id": "room3", "name": "Kitchen", "consumption": 40}
                 ]
             }
+
+    @staticmethod
+    def _room_detail(entry):
+        """Build the room payload and appliance breakdown for one index entry"""
+        record = entry['record']
+        room = {key: value for key, value in record.items() if key != 'appliances'}
+        room['id'] = entry['room_id']
+        room['floor_id'] = entry['floor_id']
+        room['name'] = str(record.get('name', entry['room_id']))
+        room['status'] = str(record.get('status', 'optimal')).lower()
+        
+        raw_appliances = record.get('appliances') or {}
+        if isinstance(raw_appliances, list):
+            raw_appliances = dict(enumerate(raw_appliances))
+        
+        appliances = []
+        for key, appliance in raw_appliances.items():
+            if not isinstance(appliance, dict):
+                continue
+            try:
+                consumption = float(appliance.get('consumption', 0) or 0)
+            except (TypeError, ValueError):
+                consumption = 0.0
+            appliances.append({
+                'id': str(appliance.get('id', key)),
+                'name': str(appliance.get('name', key)),
+                'state': str(appliance.get('state', 'off')).lower(),
+                'consumption': consumption
+            })
+        
+        # Share of the room's appliance consumption, for the breakdown chart
+        total = sum(appliance['consumption'] for appliance in appliances)
+        for appliance in appliances:
+            appliance['share'] = round(100 * appliance['consumption'] / total, 1) if total else 0
+        
+        return {'room': room, 'appliances': appliances}
+
+    @staticmethod
+    def get_room(room_id, floor_id=None):
+        """Get one room plus its appliance breakdown, or None if it doesn't exist"""
+        try:
+            # The listener keeps the index current; without it, index a one-off read
+            FirebaseClient._ensure_room_index()
+            
+            entry = room_index.lookup(room_id, floor_id)
+            if entry:
+                return FirebaseClient._room_detail(entry)
+            if len(room_index):
+                return None
+        except Exception as e:
+            logger.exception("Error fetching room %s: %s", room_id, e)
+        
+        # No room data available at all: fall back to the default rooms
+        room = next((r for r in DEFAULT_ROOMS if r["id"] == room_id), None)
+        if not room:
+            return None
+        return {'room': dict(room, floor_id=floor_id), 'appliances': []}
+
+    @staticmethod
+    def _ensure_room_index():
+        """Make sure the room index reflects the database; without a listener it is built
+        from one read and rebuilt only once that is invalidated"""
+        floors_mirror = mirrors['floors']
+        if floors_mirror.ready:
+            record_cache('room_index', True)
+            return
+        record_cache('room_index', room_index_loaded.ensure(
+            lambda: room_index.rebuild(FirebaseClient._read(floors_mirror.path) or {})))
+
+    @staticmethod
+    def set_appliance_state(appliance_id, state, room_id=None, floor_id=None):
+        """Queue an appliance state change; returns the command ack or None if unknown"""
+        try:
+            FirebaseClient._ensure_room_index()
+            path = room_index.lookup_appliance(appliance_id, room_id, floor_id)
+            if not path:
+                return None
+            return appliance_commands.submit(f"{path}/state", state)
+        except Exception as e:
+            logger.exception("Error queueing command for appliance %s: %s", appliance_id, e)
+            return None
+
+    @staticmethod
+    def set_floor_appliances(floor_id, state, name=None):
+        """Queue the same state for every appliance on a floor (optionally only those
+        whose name contains `name`); all of them go out in one database write"""
+        try:
+            FirebaseClient._ensure_room_index()
+            commands = []
+            for path, appliance in room_index.floor_appliances(floor_id):
+                if name and name.lower() not in str(appliance.get('name', '')).lower():
+                    continue
+                commands.append((f"{path}/state", state))
+            return appliance_commands.submit_many(commands)
+        except Exception as e:
+            logger.exception("Error queueing commands for floor %s: %s", floor_id, e)
+            return []
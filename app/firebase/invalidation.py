@@ -0,0 +1,351 @@
+from urllib.parse import urlparse
+import atexit
+import glob
+import itertools
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+
+from app.monitoring.metrics import INVALIDATIONS
+
+logger = logging.getLogger(__name__)
+
+
+class InvalidationBus:
+    """Carries {'origin', 'version', 'paths'} messages between app instances.
+
+    Subclasses implement send() and deliver what they receive to
+    self._receive(message); publish() goes to every instance on the bus,
+    the sender included (receivers skip their own messages).
+    """
+
+    def __init__(self):
+        self._callbacks = []
+
+    def subscribe(self, callback):
+        self._callbacks.append(callback)
+
+    def publish(self, message):
+        self.send(message)
+        INVALIDATIONS.inc(1, 'sent')
+
+    def send(self, message):
+        raise NotImplementedError
+
+    def start(self):
+        pass
+
+    def close(self):
+        pass
+
+    def _receive(self, message):
+        for callback in self._callbacks:
+            try:
+                callback(message)
+            except Exception as e:
+                logger.exception("Error handling invalidation message: %s", e)
+
+
+class LocalBus(InvalidationBus):
+    """Instances in one process sharing a named channel; for tests and single-instance runs"""
+
+    _channels = {}
+    _channels_lock = threading.Lock()
+
+    def __init__(self, channel='default'):
+        super().__init__()
+        with self._channels_lock:
+            self._channels.setdefault(channel, []).append(self)
+        self.channel = channel
+
+    def send(self, message):
+        with self._channels_lock:
+            members = list(self._channels.get(self.channel, []))
+        for member in members:
+            member._receive(message)
+
+    def close(self):
+        with self._channels_lock:
+            members = self._channels.get(self.channel, [])
+            if self in members:
+                members.remove(self)
+
+
+class FileBus(InvalidationBus):
+    """Appends messages as JSON lines to a shared file and tails it; for local testing.
+
+    Each message is a single O_APPEND write, so lines from different
+    processes don't interleave. The file is never trimmed.
+    """
+
+    def __init__(self, path, poll_interval=0.2):
+        super().__init__()
+        self.path = path
+        self.poll_interval = poll_interval
+        self._thread = None
+
+    def send(self, message):
+        line = (json.dumps(message, separators=(',', ':')) + '\n').encode()
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line)
+        finally:
+            os.close(fd)
+
+    def start(self):
+        if self._thread is None:
+            # Only messages written from now on are of interest
+            position = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+            self._thread = threading.Thread(target=self._run, args=(position,),
+                                            name='invalidation-file-bus', daemon=True)
+            self._thread.start()
+
+    def _run(self, position):
+        partial = b''
+        while True:
+            time.sleep(self.poll_interval)
+            try:
+                if not os.path.exists(self.path):
+                    continue
+                if os.path.getsize(self.path) < position:
+                    position, partial = 0, b''      # replaced or truncated
+                with open(self.path, 'rb') as f:
+                    f.seek(position)
+                    chunk = f.read()
+                    position = f.tell()
+            except OSError as e:
+                logger.warning("Error reading invalidation file %s: %s", self.path, e)
+                continue
+            lines = (partial + chunk).split(b'\n')
+            partial = lines.pop()
+            for line in lines:
+                if line.strip():
+                    try:
+                        self._receive(json.loads(line))
+                    except ValueError:
+                        logger.warning("Skipping malformed invalidation message in %s", self.path)
+
+
+class UnixSocketBus(InvalidationBus):
+    """One datagram socket per instance in a shared directory; publish() sends to
+    every other socket there and removes the ones nobody is listening on"""
+
+    MAX_DATAGRAM = 60000
+
+    def __init__(self, directory):
+        super().__init__()
+        self.directory = directory
+        self.address = os.path.join(directory, f"{uuid.uuid4().hex}.sock")
+        self._socket = None
+        self._sender = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._thread = None
+
+    def send(self, message):
+        payload = json.dumps(message, separators=(',', ':')).encode()
+        if len(payload) > self.MAX_DATAGRAM:
+            # Too many paths for one datagram: evict everything instead
+            payload = json.dumps(dict(message, paths=['/']), separators=(',', ':')).encode()
+        for address in glob.glob(os.path.join(self.directory, '*.sock')):
+            if address == self.address:
+                continue
+            try:
+                self._sender.sendto(payload, address)
+            except (ConnectionRefusedError, FileNotFoundError):
+                try:
+                    os.unlink(address)
+                except OSError:
+                    pass
+            except OSError as e:
+                logger.warning("Error sending invalidation to %s: %s", address, e)
+        if self._socket is not None:
+            self._receive(message)
+
+    def start(self):
+        if self._thread is not None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._socket.bind(self.address)
+        atexit.register(self.close)
+        self._thread = threading.Thread(target=self._run, name='invalidation-socket-bus', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                payload = self._socket.recv(self.MAX_DATAGRAM + 4096)
+                self._receive(json.loads(payload))
+            except OSError:
+                return      # closed
+            except ValueError:
+                logger.warning("Skipping malformed invalidation datagram")
+
+    def close(self):
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+            try:
+                os.unlink(self.address)
+            except OSError:
+                pass
+
+
+BUS_TYPES = {
+    'local': lambda url: LocalBus(url.netloc or 'default'),
+    'file': lambda url: FileBus(url.path),
+    'unix': lambda url: UnixSocketBus(url.path),
+}
+
+
+def create_bus(url):
+    """Bus for a URL like local://, file:///tmp/bus.jsonl or unix:///tmp/dashboard-bus;
+    register other transports in BUS_TYPES"""
+    parsed = urlparse(url)
+    if parsed.scheme not in BUS_TYPES:
+        raise ValueError(f"Unknown invalidation bus {url!r}; expected one of {', '.join(BUS_TYPES)}")
+    return BUS_TYPES[parsed.scheme](parsed)
+
+
+class Invalidator:
+    """Evicts changed database paths from this instance's caches and broadcasts
+    them, so other instances evict the same keys.
+
+    Paths changed in a burst (listener events, a batch of writes) are collected
+    and sent as one message; each message carries a per-origin version so
+    duplicates and reordered deliveries are ignored.
+    """
+
+    def __init__(self, batch_interval=0.1):
+        self.origin = uuid.uuid4().hex
+        self.batch_interval = batch_interval
+        self.bus = None
+        self._handlers = []
+        self._versions = itertools.count(1)
+        self._seen = {}                     # origin -> highest version received
+        self._lock = threading.Lock()
+        self._pending = set()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def configure(self, bus):
+        if self.bus is not None:
+            self.bus.close()
+        self.bus = bus
+        if bus is not None:
+            bus.subscribe(self._on_message)
+            bus.start()
+
+    def add_handler(self, handler):
+        """handler(paths) is called for local and remote changes"""
+        if handler not in self._handlers:
+            self._handlers.append(handler)
+
+    def changed(self, paths):
+        """Evict `paths` here now and queue them for the other instances"""
+        paths = [path for path in paths if path]
+        if not paths:
+            return
+        self._evict(paths)
+        if self.bus is None:
+            return
+        with self._lock:
+            self._pending.update(paths)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='invalidator', daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    def on_mirror_change(self, mirror, parts, old, new):
+        """Mirror subscriber: the instance holding the listener reports what changed"""
+        self.changed(['/'.join((mirror.path.rstrip('/'),) + tuple(parts))])
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            time.sleep(self.batch_interval)
+            with self._lock:
+                self._wake.clear()
+                paths, self._pending = sorted(self._pending), set()
+            if paths:
+                try:
+                    self.bus.publish({'origin': self.origin, 'version': next(self._versions),
+                                      'ts': time.time(), 'paths': paths})
+                except Exception as e:
+                    logger.exception("Error publishing %d invalidated paths: %s", len(paths), e)
+
+    def _on_message(self, message):
+        origin, version = message.get('origin'), message.get('version', 0)
+        if origin == self.origin:
+            return
+        with self._lock:
+            if version <= self._seen.get(origin, 0):
+                return
+            self._seen[origin] = version
+        INVALIDATIONS.inc(1, 'received')
+        self._evict(message.get('paths') or [])
+
+    def _evict(self, paths):
+        for handler in self._handlers:
+            try:
+                handler(paths)
+            except Exception as e:
+                logger.exception("Error evicting %d paths: %s", len(paths), e)
+
+
+invalidator = Invalidator()
+
+
+def _parts(path):
+    return tuple(part for part in (path or '').split('/') if part)
+
+
+class LoadedState:
+    """Whether something built from a one-off read under `path` (the building totals,
+    the room index) is still current.
+
+    It isn't until ensure() has loaded it, nor once the invalidator reports a
+    change at, above or below `path`, nor `max_age` seconds after loading
+    (0: only on change), which bounds how long a change nobody reported
+    goes unseen.
+    """
+
+    def __init__(self, path, max_age=30.0):
+        self.path = path
+        self.max_age = max_age
+        self.loads = 0
+        self._parts = _parts(path)
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._loaded = None             # (generation, monotonic time) of the last load
+
+    def current(self):
+        with self._lock:
+            if self._loaded is None or self._loaded[0] != self._generation:
+                return False
+            return not self.max_age or time.monotonic() - self._loaded[1] < self.max_age
+
+    def ensure(self, load):
+        """Call load() unless the data is current; True if it already was"""
+        with self._lock:
+            generation = self._generation
+        if self.current():
+            return True
+        load()
+        with self._lock:
+            # A change reported while loading leaves it stale
+            self._loaded = (generation, time.monotonic())
+            self.loads += 1
+        return False
+
+    def invalidate(self, paths):
+        """Invalidator handler"""
+        for path in paths:
+            parts = _parts(path)
+            if parts[:len(self._parts)] == self._parts or self._parts[:len(parts)] == parts:
+                with self._lock:
+                    self._generation += 1
+                return
@@ -0,0 +1,22 @@
+import importlib
+
+
+class LazyModule:
+    """Stands in for a module and imports it on first attribute access.
+
+    firebase_admin pulls in google-auth, requests and friends, which is the
+    bulk of cold-start import time; nothing needs it until the first read.
+    """
+
+    def __init__(self, name):
+        self._name = name
+
+    def __getattr__(self, attribute):
+        # Looked up on every access so patched attributes are honoured
+        return getattr(importlib.import_module(self._name), attribute)
+
+    def __repr__(self):
+        return f"<lazy module {self._name!r}>"
+
+
+db = LazyModule('firebase_admin.db')
@@ -0,0 +1,72 @@
+import fcntl
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class LeaderElection:
+    """Picks one process per host through an exclusive flock() on a lock file.
+
+    Every candidate retries the lock every `retry_interval` seconds; the
+    kernel drops it when the holder exits or dies, so another candidate takes
+    over without any cleanup. The holder's pid is written into the file for
+    the others to report.
+    """
+
+    def __init__(self, retry_interval=2.0):
+        self.retry_interval = retry_interval
+        self.lock_path = None
+        self.is_leader = False
+        self.elected_at = None
+        self._fd = None
+        self._thread = None
+
+    def start(self, lock_path, on_elected):
+        """Campaign in the background; on_elected() runs once this process wins"""
+        self.lock_path = lock_path
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._campaign, args=(on_elected,),
+                                            name='leader-election', daemon=True)
+            self._thread.start()
+
+    def try_acquire(self):
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode())
+        self._fd = fd       # held open for the life of the process
+        self.is_leader = True
+        self.elected_at = time.time()
+        return True
+
+    def _campaign(self, on_elected):
+        while not self.try_acquire():
+            time.sleep(self.retry_interval)
+        logger.info("Elected Firebase listener leader (pid %s)", os.getpid())
+        try:
+            on_elected()
+        except Exception as e:
+            logger.exception("Error taking over as listener leader: %s", e)
+
+    def leader_pid(self):
+        try:
+            with open(self.lock_path) as f:
+                return int(f.read().strip() or 0) or None
+        except (OSError, TypeError, ValueError):
+            return None
+
+    def info(self):
+        if self.lock_path is None:
+            return None
+        return {'lock': self.lock_path, 'is_leader': self.is_leader,
+                'leader_pid': self.leader_pid(), 'elected_at': self.elected_at}
+
+
+listener_election = LeaderElection()
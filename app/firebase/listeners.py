@@ -0,0 +1,154 @@
+from app.firebase.lazy import db
+from app.monitoring.metrics import record_listener_event
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def _split_path(path):
+    """Split a Firebase path like '/floor1/rooms' into its parts"""
+    return tuple(part for part in (path or '').split('/') if part)
+
+
+def _normalize(value):
+    """Turn Firebase arrays into dicts keyed by index so paths address them"""
+    if isinstance(value, list):
+        return {str(i): _normalize(item) for i, item in enumerate(value) if item is not None}
+    if isinstance(value, dict):
+        return {str(key): _normalize(item) for key, item in value.items() if item is not None}
+    return value
+
+
+class TreeMirror:
+    """In-memory copy of one Firebase subtree, kept current by a listen() stream"""
+
+    def __init__(self, name, path):
+        self.name = name
+        self.path = path
+        self.data = None
+        self.ready = False
+        self.version = 0
+        self._lock = threading.RLock()
+        self._subscribers = []
+        self._registration = None
+
+    def subscribe(self, callback):
+        """Register callback(mirror, parts, old, new), called after every change;
+        registering the same callback again does nothing"""
+        with self._lock:
+            if callback not in self._subscribers:
+                self._subscribers.append(callback)
+
+    def get(self, parts=()):
+        """Return the value stored at parts (a tuple of keys) or None"""
+        with self._lock:
+            node = self.data
+            for part in parts:
+                if not isinstance(node, dict):
+                    return None
+                node = node.get(part)
+            return node
+
+    def apply_event(self, event_type, path, data):
+        """Apply a 'put' or 'patch' event and notify subscribers of each change"""
+        parts = _split_path(path)
+        if event_type == 'patch' and isinstance(data, dict):
+            changes = [(parts + _split_path(key), value) for key, value in data.items()]
+        else:
+            changes = [(parts, data)]
+
+        with self._lock:
+            applied = []
+            for change_parts, value in changes:
+                old = self.get(change_parts)
+                new = _normalize(value)
+                self._set(change_parts, new)
+                applied.append((change_parts, old, new))
+            if not parts:
+                self.ready = True
+            self.version += 1
+
+            for change_parts, old, new in applied:
+                for callback in self._subscribers:
+                    try:
+                        callback(self, change_parts, old, new)
+                    except Exception as e:
+                        logger.exception("Error in %s mirror subscriber: %s", self.name, e)
+
+    def _set(self, parts, value):
+        """Store value at parts, pruning empty parents when value is None"""
+        if not parts:
+            self.data = value
+            return
+
+        if not isinstance(self.data, dict):
+            if value is None:
+                return
+            self.data = {}
+
+        node = self.data
+        trail = []
+        for part in parts[:-1]:
+            child = node.get(part)
+            if not isinstance(child, dict):
+                if value is None:
+                    return
+                child = {}
+                node[part] = child
+            trail.append((node, part))
+            node = child
+
+        if value is None:
+            node.pop(parts[-1], None)
+            # Firebase drops empty nodes, so do we
+            for parent, key in reversed(trail):
+                if parent[key]:
+                    break
+                del parent[key]
+        else:
+            node[parts[-1]] = value
+
+    def start(self):
+        """Open the listen() stream for this subtree"""
+        if self._registration is not None:
+            return
+        self._registration = db.reference(self.path).listen(self._on_event)
+        logger.info("Listening for changes at %s", self.path)
+
+    def stop(self):
+        """Close the listen() stream"""
+        if self._registration is not None:
+            self._registration.close()
+            self._registration = None
+
+    def _on_event(self, event):
+        record_listener_event(self.path.rstrip('/') + (event.path or ''), event.data)
+        try:
+            self.apply_event(event.event_type, event.path, event.data)
+        except Exception as e:
+            logger.exception("Error applying %s event at %s: %s", self.name, event.path, e)
+
+
+# Subtrees kept in memory while Firebase is connected
+mirrors = {
+    'battery': TreeMirror('battery', '/energy_dashboard/battery'),
+    'grid': TreeMirror('grid', '/energy_dashboard/grid'),
+    'floors': TreeMirror('floors', '/energy_dashboard/floors'),
+    'people': TreeMirror('people', '/people'),
+}
+
+
+def start_listeners():
+    """Start a listener for every mirrored subtree"""
+    for mirror in mirrors.values():
+        try:
+            mirror.start()
+        except Exception as e:
+            logger.exception("Error starting listener for %s: %s", mirror.path, e)
+
+
+def stop_listeners():
+    """Stop all listeners"""
+    for mirror in mirrors.values():
+        mirror.stop()
@@ -0,0 +1,287 @@
+import json
+import queue
+import threading
+import time
+import logging
+from datetime import datetime
+from app.firebase.listeners import mirrors
+
+logger = logging.getLogger(__name__)
+
+# Rule priorities map onto the 'priority' values get_notifications() emits
+PRIORITY_MAP = {
+    'critical': 'high',
+    'high': 'high',
+    'warning': 'medium',
+    'medium': 'medium',
+    'low': 'low',
+    'info': 'info',
+}
+
+OPERATORS = {
+    '<': lambda value, target: value is not None and value < target,
+    '<=': lambda value, target: value is not None and value <= target,
+    '>': lambda value, target: value is not None and value > target,
+    '>=': lambda value, target: value is not None and value >= target,
+    '==': lambda value, target: value == target,
+    '!=': lambda value, target: value != target,
+}
+
+
+# Raw database fields that pages (and so rules) know by another name; see
+# FirebaseClient.get_battery_info
+FIELD_ALIASES = {
+    'battery': {'level': 'percentage'},
+}
+
+
+class _FormatDict(dict):
+    """Leave unknown {placeholders} untouched when formatting messages"""
+
+    def __missing__(self, key):
+        return '{' + key + '}'
+
+
+def _coerce(value, target):
+    """Compare numbers as numbers even when Firebase stored them as strings"""
+    if isinstance(target, bool) or not isinstance(target, (int, float)):
+        if isinstance(target, str) and isinstance(value, str):
+            return value.lower()
+        return value
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class NotificationRule:
+    def __init__(self, spec):
+        self.id = str(spec['id'])
+        self.entity = spec['entity']
+        self.entity_ids = set(spec.get('entity_ids') or [])
+        self.conditions = spec['when']
+        self.fields = {condition['field'] for condition in self.conditions}
+        self.priority = PRIORITY_MAP.get(str(spec.get('priority', 'info')).lower(), 'info')
+        self.title = spec.get('title', 'Notification')
+        self.message = spec.get('message', '')
+        self.action = spec.get('action', '')
+        self.action_url = spec.get('action_url', '#')
+        self.cooldown = float(spec.get('cooldown', 0))
+
+        for condition in self.conditions:
+            if condition['op'] != 'becomes' and condition['op'] not in OPERATORS:
+                raise ValueError(f"Rule {self.id}: unknown operator {condition['op']}")
+
+    def matches(self, record, previous, changed_fields):
+        """True when every condition holds for the entity's current record"""
+        for condition in self.conditions:
+            field = condition['field']
+            target = condition.get('value')
+            value = _coerce(record.get(field), target)
+            if condition['op'] == 'becomes':
+                # Transitions only fire on the update that changed the field
+                if field not in changed_fields:
+                    return False
+                if value != target or _coerce(previous.get(field), target) == target:
+                    return False
+            elif not OPERATORS[condition['op']](value, target):
+                return False
+        return True
+
+    def render(self, entity_id, record):
+        values = _FormatDict(record)
+        values['entity_id'] = entity_id
+        return {
+            'title': self.title.format_map(values),
+            'message': self.message.format_map(values),
+            'timestamp': datetime.now().strftime('%Y-%m-%d %I:%M %p'),
+            'action': self.action,
+            'action_url': self.action_url.format_map(values),
+            'priority': self.priority,
+            'rule_id': self.id,
+            'entity_id': entity_id,
+        }
+
+
+def _with_aliases(entity, record, changed_fields):
+    aliases = FIELD_ALIASES.get(entity)
+    if not aliases:
+        return record, changed_fields
+    record = dict(record)
+    for raw, name in aliases.items():
+        if raw in record and name not in record:
+            record[name] = record[raw]
+            if changed_fields is not None and raw in changed_fields:
+                changed_fields = set(changed_fields) | {name}
+    return record, changed_fields
+
+
+def read_rules(path):
+    """Rule dicts from a JSON file, checked the way load_rules() will use them"""
+    with open(path) as f:
+        specs = json.load(f)
+    if not isinstance(specs, list):
+        raise ValueError("expected a list of rules")
+    for i, spec in enumerate(specs):
+        try:
+            NotificationRule(spec)
+        except (KeyError, TypeError) as e:
+            raise ValueError(f"rule {i} is missing or has a malformed {e}") from None
+    return specs
+
+
+class NotificationRuleEngine:
+    """Evaluates notification rules against only the fields that changed.
+
+    Rules are indexed by (entity type, field), so an update touching one
+    field of one entity looks at just the rules that reference that field.
+    Alerts are edge-triggered: a rule fires once when its conditions start
+    holding for an entity and re-arms when they stop, subject to a cooldown.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rules = {}
+        self._index = {}            # (entity, field) -> [rule]
+        self._entity_fields = {}    # entity -> fields referenced by any rule
+        self._values = {}           # (entity, entity_id) -> {field: last seen value}
+        self._active = set()        # (rule_id, entity_id) currently alerting
+        self._last_fired = {}       # (rule_id, entity_id) -> monotonic time
+        self._sinks = []
+        self._queue = queue.Queue()
+        self._worker = None
+
+    def load_rules(self, specs):
+        """Replace the rule set from a list of rule dicts (see Config.NOTIFICATION_RULES)"""
+        rules = {}
+        index = {}
+        entity_fields = {}
+        for spec in specs or []:
+            rule = NotificationRule(spec)
+            rules[rule.id] = rule
+            for field in rule.fields:
+                index.setdefault((rule.entity, field), []).append(rule)
+                entity_fields.setdefault(rule.entity, set()).add(field)
+
+        with self._lock:
+            self._rules = rules
+            self._index = index
+            self._entity_fields = entity_fields
+            self._values = {}
+            self._active = {key for key in self._active if key[0] in rules}
+        logger.info("Loaded %d notification rules", len(rules))
+
+    def add_sink(self, sink):
+        """Register sink(notification), called from a background delivery thread"""
+        if sink not in self._sinks:
+            self._sinks.append(sink)
+
+    def evaluate(self, entity, entity_id, record, changed_fields=None, prime=False):
+        """Evaluate rules for one entity; changed_fields=None means every field changed.
+
+        With prime=True conditions are recorded as active without notifying,
+        so the initial sync doesn't replay alerts for the existing state.
+        """
+        record = record if isinstance(record, dict) else {}
+        record, changed_fields = _with_aliases(entity, record, changed_fields)
+        fired = []
+
+        with self._lock:
+            if changed_fields is None:
+                changed_fields = self._entity_fields.get(entity, set())
+            candidates = {}
+            for field in changed_fields:
+                for rule in self._index.get((entity, field), ()):
+                    candidates[rule.id] = rule
+            if not candidates:
+                return []
+
+            state_key = (entity, entity_id)
+            previous = self._values.get(state_key, {})
+            now = time.monotonic()
+
+            for rule in candidates.values():
+                if rule.entity_ids and entity_id not in rule.entity_ids:
+                    continue
+                alert_key = (rule.id, entity_id)
+                if not rule.matches(record, previous, changed_fields):
+                    self._active.discard(alert_key)
+                    continue
+                if alert_key in self._active:
+                    continue
+                self._active.add(alert_key)
+                if prime:
+                    continue
+                last = self._last_fired.get(alert_key)
+                if last is not None and now - last < rule.cooldown:
+                    continue
+                self._last_fired[alert_key] = now
+                fired.append(rule.render(entity_id, record))
+
+            # Remember just the fields some rule cares about, for transitions
+            values = dict(previous)
+            for field in changed_fields:
+                if (entity, field) in self._index:
+                    values[field] = record.get(field)
+            self._values[state_key] = values
+
+        for notification in fired:
+            self._deliver(notification)
+        return fired
+
+    def _deliver(self, notification):
+        if not self._sinks:
+            return
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._drain, name='notification-sinks', daemon=True)
+                self._worker.start()
+        self._queue.put(notification)
+
+    def _drain(self):
+        while True:
+            notification = self._queue.get()
+            for sink in self._sinks:
+                try:
+                    sink(notification)
+                except Exception as e:
+                    logger.exception("Error delivering notification %s: %s", notification.get('rule_id'), e)
+
+    # Mirror subscribers
+
+    def on_singleton_change(self, mirror, parts, old, new):
+        """battery and grid are single records: the mirror name is the entity"""
+        changed = {parts[0]} if parts else None
+        self.evaluate(mirror.name, mirror.name, mirror.get(), changed, prime=not parts and old is None)
+
+    def on_floors_change(self, mirror, parts, old, new):
+        if not parts:
+            # Full (re)sync of the floors tree
+            for floor_id, floor in (new or {}).items():
+                self._evaluate_floor(floor_id, floor, None, old is None)
+            return
+
+        floor_id = parts[0]
+        if len(parts) == 1:
+            self._evaluate_floor(floor_id, new, None, False)
+        elif parts[1] != 'rooms':
+            self.evaluate('floor', floor_id, mirror.get(parts[:1]), {parts[1]})
+        elif len(parts) == 2:
+            for room_id, room in (new or {}).items():
+                self.evaluate('room', f"{floor_id}/{room_id}", room)
+        elif len(parts) == 3:
+            self.evaluate('room', f"{floor_id}/{parts[2]}", new)
+        else:
+            self.evaluate('room', f"{floor_id}/{parts[2]}", mirror.get(parts[:3]), {parts[3]})
+
+    def _evaluate_floor(self, floor_id, floor, changed_fields, prime):
+        self.evaluate('floor', floor_id, floor, changed_fields, prime=prime)
+        rooms = floor.get('rooms') if isinstance(floor, dict) else None
+        for room_id, room in (rooms or {}).items():
+            self.evaluate('room', f"{floor_id}/{room_id}", room, prime=prime)
+
+
+notification_engine = NotificationRuleEngine()
+mirrors['battery'].subscribe(notification_engine.on_singleton_change)
+mirrors['grid'].subscribe(notification_engine.on_singleton_change)
+mirrors['floors'].subscribe(notification_engine.on_floors_change)
@@ -0,0 +1,173 @@
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+import logging
+import threading
+import time
+
+from app.monitoring import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class ReadTimeout(TimeoutError):
+    """A Firebase read missed its deadline; it may still complete in the background"""
+
+
+class CircuitOpenError(RuntimeError):
+    """Reads are being short-circuited because Firebase keeps failing"""
+
+
+class CircuitBreaker:
+    """Trips open after `failure_threshold` consecutive failures and rejects calls
+    for `reset_timeout` seconds; then lets a single probe through (half-open),
+    closing again if it succeeds and re-opening if it fails"""
+
+    CLOSED, HALF_OPEN, OPEN = 'closed', 'half_open', 'open'
+    _STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._set_state(self.CLOSED)
+        self.failures = 0
+        self.opened_at = None
+        self.trips = 0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def configure(self, failure_threshold=None, reset_timeout=None):
+        if failure_threshold:
+            self.failure_threshold = failure_threshold
+        if reset_timeout is not None:
+            self.reset_timeout = reset_timeout
+
+    def before_call(self):
+        """Raise CircuitOpenError unless a call may go through now"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self._set_state(self.HALF_OPEN)
+            if self.state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return
+        raise CircuitOpenError("Firebase circuit is open")
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self._probing = False
+            if self.state != self.CLOSED:
+                logger.info("Firebase circuit closed")
+                self._set_state(self.CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.trips += 1
+                    logger.warning("Firebase circuit opened after %d consecutive failures", self.failures)
+                self.opened_at = time.monotonic()
+                self._set_state(self.OPEN)
+
+    def _set_state(self, state):
+        self.state = state
+        metrics.FIREBASE_CIRCUIT_STATE.set(self._STATE_VALUES[state])
+
+    def to_dict(self):
+        with self._lock:
+            retry_in = None
+            if self.state == self.OPEN:
+                retry_in = round(max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at)), 1)
+            return {'state': self.state, 'consecutive_failures': self.failures,
+                    'trips': self.trips, 'retry_in_seconds': retry_in}
+
+
+class _DeadlineRef:
+    # Stands in for a reference/query so timed_get times (and traces) the bounded call
+    def __init__(self, ref, guard, timeout):
+        self.ref = ref
+        self.guard = guard
+        self.timeout = timeout
+
+    def get(self, **kwargs):
+        future = self.guard.executor().submit(self.ref.get, **kwargs)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            future.cancel()
+            raise ReadTimeout(f"Firebase read exceeded {self.timeout:g} s") from None
+
+
+class ReadGuard:
+    """Every FirebaseClient read goes through get(): it is abandoned after the
+    path's deadline and short-circuited while the breaker is open, so a degraded
+    upstream costs a request at most one deadline rather than a pinned thread.
+
+    Reads run on a small worker pool; a read that misses its deadline keeps
+    its worker until the library gives up, and queued reads count against
+    their own deadline, so the pool size bounds the threads Firebase can hold.
+    """
+
+    def __init__(self, timeout=2.0, path_timeouts=None, max_workers=8):
+        self.timeout = timeout
+        self.path_timeouts = dict(path_timeouts or {})
+        self.max_workers = max_workers
+        self.breaker = CircuitBreaker()
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def configure(self, timeout=None, path_timeouts=None, max_workers=None,
+                  failure_threshold=None, reset_timeout=None):
+        if timeout is not None:
+            self.timeout = timeout
+        if path_timeouts is not None:
+            self.path_timeouts = dict(path_timeouts)
+        if max_workers:
+            self.max_workers = max_workers
+        self.breaker.configure(failure_threshold, reset_timeout)
+
+    def executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix='firebase-read')
+            return self._executor
+
+    def timeout_for(self, path):
+        """Deadline for path: the longest matching prefix in path_timeouts, else the default"""
+        path = '/' + '/'.join(part for part in str(path or '/').split('/') if part)
+        best = None
+        for prefix, seconds in self.path_timeouts.items():
+            prefix = '/' + prefix.strip('/')
+            if (path == prefix or path.startswith(prefix.rstrip('/') + '/')) and \
+                    (best is None or len(prefix) > len(best[0])):
+                best = (prefix, seconds)
+        return best[1] if best else self.timeout
+
+    def get(self, ref, path=None, **kwargs):
+        """timed_get(ref, path, **kwargs) within the path's deadline, via the breaker"""
+        path = path or getattr(ref, 'path', '/')
+        try:
+            self.breaker.before_call()
+        except CircuitOpenError:
+            metrics.FIREBASE_CIRCUIT_REJECTIONS.inc(1, metrics.path_label(path))
+            raise
+
+        timeout = self.timeout_for(path)
+        try:
+            data = metrics.timed_get(_DeadlineRef(ref, self, timeout) if timeout and timeout > 0 else ref,
+                                     path, **kwargs)
+        except ReadTimeout:
+            metrics.FIREBASE_READ_TIMEOUTS.inc(1, metrics.path_label(path))
+            self.breaker.record_failure()
+            raise
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+        return data
+
+
+read_guard = ReadGuard()
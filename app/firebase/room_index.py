@@ -0,0 +1,162 @@
+import threading
+from app.firebase.invalidation import LoadedState, invalidator
+from app.firebase.listeners import mirrors
+
+
+def _appliances_of(room):
+    appliances = room.get('appliances') if isinstance(room, dict) else None
+    if not isinstance(appliances, dict):
+        return {}
+    return {key: appliance for key, appliance in appliances.items() if isinstance(appliance, dict)}
+
+
+class RoomIndex:
+    """Maps room id -> (floor id, database path, room record) for O(1) lookups.
+
+    Room ids are only unique within a floor, so each id maps to the floors
+    that have a room with that id. Appliances are indexed the same way.
+    """
+
+    def __init__(self, base_path):
+        self.base_path = base_path
+        self._lock = threading.Lock()
+        self._rooms = {}            # room_id -> {floor_id: entry}
+        self._floor_rooms = {}      # floor_id -> set of room ids
+        self._appliances = {}       # appliance_id -> {(floor_id, room_id): appliance path}
+
+    def rebuild(self, floors):
+        """Re-index every room from a full floors tree"""
+        with self._lock:
+            self._rooms = {}
+            self._floor_rooms = {}
+            self._appliances = {}
+            for floor_id, floor in (floors or {}).items():
+                rooms = floor.get('rooms') if isinstance(floor, dict) else None
+                self._set_floor_rooms(floor_id, rooms)
+
+    def set_floor_rooms(self, floor_id, rooms):
+        """Replace the rooms indexed for one floor"""
+        with self._lock:
+            self._set_floor_rooms(floor_id, rooms)
+
+    def set_room(self, floor_id, room_id, room):
+        """Index or update one room; None removes it"""
+        with self._lock:
+            self._set_room(floor_id, room_id, room)
+
+    def lookup(self, room_id, floor_id=None):
+        """Return the entry for room_id (on floor_id, if given) or None"""
+        with self._lock:
+            entries = self._rooms.get(str(room_id))
+            if not entries:
+                return None
+            if floor_id is not None:
+                return entries.get(str(floor_id))
+            return next(iter(entries.values()))
+
+    def lookup_appliance(self, appliance_id, room_id=None, floor_id=None):
+        """Return the database path of an appliance, narrowed by room/floor if given"""
+        with self._lock:
+            locations = self._appliances.get(str(appliance_id))
+            if not locations:
+                return None
+            for (appliance_floor, appliance_room), path in locations.items():
+                if room_id is not None and appliance_room != str(room_id):
+                    continue
+                if floor_id is not None and appliance_floor != str(floor_id):
+                    continue
+                return path
+            return None
+
+    def floor_appliances(self, floor_id):
+        """Return [(appliance path, appliance record)] for every appliance on a floor"""
+        with self._lock:
+            result = []
+            for room_id in self._floor_rooms.get(str(floor_id), ()):
+                entry = self._rooms[room_id][str(floor_id)]
+                for key, appliance in _appliances_of(entry['record']).items():
+                    result.append((f"{entry['path']}/appliances/{key}", appliance))
+            return result
+
+    def __len__(self):
+        with self._lock:
+            return sum(len(entries) for entries in self._rooms.values())
+
+    def _set_floor_rooms(self, floor_id, rooms):
+        for room_id in list(self._floor_rooms.get(floor_id, ())):
+            self._set_room(floor_id, room_id, None)
+        if isinstance(rooms, dict):
+            for room_id, room in rooms.items():
+                self._set_room(floor_id, room_id, room)
+
+    def _set_room(self, floor_id, room_id, room):
+        entries = self._rooms.get(room_id)
+        old = entries.get(floor_id) if entries else None
+        if old:
+            self._index_appliances(old, remove=True)
+
+        if isinstance(room, dict):
+            entry = {
+                'floor_id': floor_id,
+                'room_id': room_id,
+                'path': f"{self.base_path}/{floor_id}/rooms/{room_id}",
+                'record': room
+            }
+            self._rooms.setdefault(room_id, {})[floor_id] = entry
+            self._floor_rooms.setdefault(floor_id, set()).add(room_id)
+            self._index_appliances(entry)
+            return
+
+        if entries:
+            entries.pop(floor_id, None)
+            if not entries:
+                del self._rooms[room_id]
+        floor_rooms = self._floor_rooms.get(floor_id)
+        if floor_rooms:
+            floor_rooms.discard(room_id)
+            if not floor_rooms:
+                del self._floor_rooms[floor_id]
+
+    def _index_appliances(self, entry, remove=False):
+        location = (entry['floor_id'], entry['room_id'])
+        if remove:
+            # The mirrored record may already have changed in place, so undo
+            # exactly what was indexed rather than re-reading it
+            for appliance_id in entry.get('appliance_ids', ()):
+                locations = self._appliances.get(appliance_id)
+                if locations:
+                    locations.pop(location, None)
+                    if not locations:
+                        del self._appliances[appliance_id]
+            return
+
+        entry['appliance_ids'] = []
+        for key, appliance in _appliances_of(entry['record']).items():
+            appliance_id = str(appliance.get('id', key))
+            self._appliances.setdefault(appliance_id, {})[location] = f"{entry['path']}/appliances/{key}"
+            entry['appliance_ids'].append(appliance_id)
+
+    # Mirror subscriber
+
+    def on_floors_change(self, mirror, parts, old, new):
+        if not parts:
+            self.rebuild(new)
+        elif len(parts) == 1:
+            rooms = new.get('rooms') if isinstance(new, dict) else None
+            self.set_floor_rooms(parts[0], rooms)
+        elif parts[1] != 'rooms':
+            return
+        elif len(parts) == 2:
+            self.set_floor_rooms(parts[0], new)
+        else:
+            # Field edits mutate the mirrored record in place, but re-point
+            # the entry anyway in case the room node itself was replaced
+            self.set_room(parts[0], parts[2], mirror.get(parts[:3]))
+
+
+room_index = RoomIndex(mirrors['floors'].path)
+mirrors['floors'].subscribe(room_index.on_floors_change)
+
+# Without a listener the index is built from a one-off read instead (see _ensure_room_index)
+room_index_loaded = LoadedState(mirrors['floors'].path)
+invalidator.add_handler(room_index_loaded.invalidate)
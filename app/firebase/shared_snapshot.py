@@ -0,0 +1,289 @@
+import json
+import logging
+import mmap
+import os
+import struct
+import subprocess
+import sys
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# A fixed header, then the JSON payload {path: {"version": mirror version, "value": subtree}}.
+# The writer makes the sequence number odd while it rewrites the payload and even
+# again when done (a seqlock); readers retry until they see the same even number
+# before and after copying the payload, so they never load a torn update.
+MAGIC = b'EDSHM001'
+# magic, sequence, payload length, published_at, heartbeat
+_HEADER = struct.Struct('<8sQQdd')
+_SEQ = struct.Struct('<Q')
+_SEQ_OFFSET = 8
+_LENGTH_OFFSET = 16
+_HEARTBEAT_OFFSET = 32
+DATA_OFFSET = 64
+
+
+class SnapshotTooLarge(ValueError):
+    """The payload doesn't fit in the shared file's capacity"""
+
+
+class SharedSnapshotWriter:
+    """Publishes the mirrors into a memory-mapped file shared by the workers on a host.
+
+    Under gunicorn one refresher process (started from gunicorn.conf.py) holds
+    the Firebase listeners and writes here; workers map the file read-only
+    through SharedSnapshotReader, so listen() streams and reads don't
+    multiply with the worker count.
+    """
+
+    def __init__(self, path, capacity, min_interval=0.2, heartbeat_interval=5.0):
+        self.path = path
+        self.capacity = capacity
+        self.min_interval = min_interval
+        self.heartbeat_interval = heartbeat_interval
+        self.seq = 0
+        self.published = 0
+        self._mirrors = []
+        self._changed = threading.Event()
+        self._thread = None
+
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if os.fstat(fd).st_size != DATA_OFFSET + capacity:
+                os.ftruncate(fd, DATA_OFFSET + capacity)
+            self._map = mmap.mmap(fd, DATA_OFFSET + capacity, access=mmap.ACCESS_WRITE)
+        finally:
+            os.close(fd)
+
+        magic, seq = struct.unpack_from('<8sQ', self._map, 0)
+        if magic == MAGIC:
+            # Carry on from a previous refresher so readers see the next version as new
+            self.seq = seq + (seq & 1)
+        else:
+            _HEADER.pack_into(self._map, 0, MAGIC, 0, 0, 0.0, 0.0)
+
+    def publish(self, payload):
+        """Write encoded `payload` as the next version"""
+        if len(payload) > self.capacity:
+            raise SnapshotTooLarge(f"{len(payload)} byte snapshot exceeds SHARED_SNAPSHOT_SIZE ({self.capacity})")
+        _SEQ.pack_into(self._map, _SEQ_OFFSET, self.seq + 1)
+        self._map[DATA_OFFSET:DATA_OFFSET + len(payload)] = payload
+        now = time.time()
+        struct.pack_into('<Qdd', self._map, _LENGTH_OFFSET, len(payload), now, now)
+        self.seq += 2
+        _SEQ.pack_into(self._map, _SEQ_OFFSET, self.seq)
+        self.published += 1
+
+    def heartbeat(self):
+        struct.pack_into('<d', self._map, _HEARTBEAT_OFFSET, time.time())
+
+    def track(self, mirror):
+        """Publish `mirror` whenever it changes"""
+        if mirror not in self._mirrors:
+            self._mirrors.append(mirror)
+            mirror.subscribe(self._on_change)
+
+    def _on_change(self, mirror, parts, old, new):
+        self._changed.set()
+
+    def _encode(self):
+        entries = []
+        for mirror in self._mirrors:
+            with mirror._lock:
+                if not mirror.ready:
+                    continue
+                value = json.dumps(mirror.data, separators=(',', ':'), default=str)
+                version = mirror.version
+            entries.append(f'{json.dumps(mirror.path)}:{{"version":{version},"value":{value}}}')
+        return ('{' + ','.join(entries) + '}').encode()
+
+    def start(self):
+        if self._thread is None:
+            # Publish what the mirrors already hold, then every change
+            self._changed.set()
+            self._thread = threading.Thread(target=self._run, name='shared-snapshot-writer', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        last_heartbeat = 0.0
+        while True:
+            changed = self._changed.wait(self.heartbeat_interval)
+            if changed:
+                # Let a burst of listener events settle into one version
+                time.sleep(self.min_interval)
+                self._changed.clear()
+                try:
+                    self.publish(self._encode())
+                except Exception as e:
+                    logger.exception("Error publishing shared snapshot: %s", e)
+            if time.time() - last_heartbeat >= self.heartbeat_interval:
+                self.heartbeat()
+                last_heartbeat = time.time()
+
+
+class SharedSnapshotReader:
+    """Loads each new published version into this worker's mirrors"""
+
+    def __init__(self):
+        self.path = None
+        self.seq = 0
+        self.published_at = None
+        self.loads = 0
+        self.retries = 0
+        self.poll_interval = 0.25
+        self.max_age = 30.0
+        self.stale = False
+        self._map = None
+        self._mirrors = {}
+        self._versions = {}
+        self._thread = None
+        self._stop = threading.Event()
+
+    def attach(self, path, mirrors, poll_interval=None, max_age=None):
+        """Follow the shared file at `path`, feeding {mirror.path: mirror} `mirrors`"""
+        self.path = path
+        self._mirrors = {mirror.path: mirror for mirror in mirrors}
+        if poll_interval:
+            self.poll_interval = poll_interval
+        if max_age:
+            self.max_age = max_age
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='shared-snapshot-reader', daemon=True)
+            self._thread.start()
+
+    def detach(self, timeout=5.0):
+        """Stop following the file, e.g. because this process now holds the listeners.
+
+        Waits up to `timeout` seconds for the reader thread to finish a load
+        in progress, so it can't overwrite the mirrors once listeners own them.
+        """
+        self._stop.set()
+        thread, self._thread = self._thread, None
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+            if thread.is_alive():
+                logger.warning("Shared snapshot reader still running %.0f s after detach", timeout)
+
+    def _open(self):
+        try:
+            with open(self.path, 'rb') as f:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return False
+        if self._map[:len(MAGIC)] != MAGIC:
+            self._map.close()
+            self._map = None
+            return False
+        return True
+
+    def read(self, attempts=100):
+        """(seq, published_at, payload bytes) if a version newer than the last read is
+        available, else None. Retries while the writer is mid-update."""
+        for _ in range(attempts):
+            seq = _SEQ.unpack_from(self._map, _SEQ_OFFSET)[0]
+            if seq == self.seq:
+                return None
+            if seq & 1:
+                self.retries += 1
+                time.sleep(0)
+                continue
+            length, published_at = struct.unpack_from('<Qd', self._map, _LENGTH_OFFSET)
+            if DATA_OFFSET + length > len(self._map):
+                # The writer was restarted with a larger capacity; map the file again
+                self._map.close()
+                if not self._open():
+                    return None
+                continue
+            payload = self._map[DATA_OFFSET:DATA_OFFSET + length]
+            if _SEQ.unpack_from(self._map, _SEQ_OFFSET)[0] == seq:
+                return seq, published_at, payload
+            self.retries += 1
+        return None
+
+    def heartbeat_age(self):
+        heartbeat = struct.unpack_from('<d', self._map, _HEARTBEAT_OFFSET)[0]
+        return time.time() - heartbeat if heartbeat else None
+
+    def poll(self):
+        """Load a newer version if there is one; mark mirrors stale if the refresher went quiet"""
+        if self._map is None and not self._open():
+            return False
+        result = self.read()
+        if result is not None:
+            seq, published_at, payload = result
+            self._load(json.loads(payload))
+            self.seq, self.published_at = seq, published_at
+            self.loads += 1
+
+        age = self.heartbeat_age()
+        if age is not None and age > self.max_age and not self.stale:
+            logger.warning("Shared snapshot refresher silent for %.0f s; reading Firebase directly", age)
+            self._set_stale(True)
+        elif self.stale and age is not None and age <= self.max_age:
+            self._set_stale(False)
+        return result is not None
+
+    def _load(self, entries):
+        for path, entry in entries.items():
+            mirror = self._mirrors.get(path)
+            if mirror is None or self._versions.get(path) == entry['version']:
+                continue
+            mirror.apply_event('put', '/', entry['value'])
+            self._versions[path] = entry['version']
+
+    def _set_stale(self, stale):
+        self.stale = stale
+        for mirror in self._mirrors.values():
+            with mirror._lock:
+                if stale:
+                    mirror.ready = False
+        if not stale:
+            # Reload everything on the next version
+            self._versions.clear()
+            self.seq = 0
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.poll()
+            except Exception as e:
+                logger.exception("Error reading shared snapshot %s: %s", self.path, e)
+            self._stop.wait(self.poll_interval)
+
+    def info(self):
+        if self.path is None:
+            return None
+        return {
+            'path': self.path,
+            'seq': self.seq,
+            'published_at': self.published_at,
+            'heartbeat_age_seconds': round(self.heartbeat_age(), 1) if self._map is not None
+            and self.heartbeat_age() is not None else None,
+            'loads': self.loads,
+            'torn_read_retries': self.retries,
+            'stale': self.stale,
+        }
+
+
+shared_reader = SharedSnapshotReader()
+
+
+def _refresher_main(parent_pid):
+    # Build the app as the writer: create_app starts the listeners and the publisher
+    os.environ['SHARED_SNAPSHOT_ROLE'] = 'writer'
+    os.environ['FIREBASE_INIT_ASYNC'] = '0'
+    import run  # noqa: F401
+    while os.getppid() == parent_pid:
+        time.sleep(2)
+
+
+def start_refresher():
+    """Start the refresher process (from the gunicorn master, before workers fork)"""
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    return subprocess.Popen([sys.executable, '-m', 'app.firebase.shared_snapshot', str(os.getpid())], cwd=root)
+
+
+if __name__ == '__main__':
+    _refresher_main(int(sys.argv[1]))
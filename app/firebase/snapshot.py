@@ -0,0 +1,313 @@
+from datetime import datetime, timezone
+import atexit
+import json
+import logging
+import os
+import struct
+import tempfile
+import threading
+import time
+import zlib
+
+from flask import g, has_request_context
+
+from app.monitoring.metrics import path_label, record_cache
+
+logger = logging.getLogger(__name__)
+
+# File layout: header, then the zlib-compressed JSON body
+# {path: {"fetched_at": unix time, "value": node}}
+MAGIC = b'EDSNAP'
+VERSION = 1
+_HEADER = struct.Struct('>6sBdII')     # magic, version, saved_at, entry count, crc32 of body
+
+
+def _encode(value):
+    return json.dumps(value, separators=(',', ':'), default=str)
+
+
+# Query results are cached under a child of the queried path that can't be a
+# database key (keys may not contain '.'), and count as that path for invalidation
+QUERY_PREFIX = '.query:'
+
+
+def _split_path(path, query=None):
+    parts = tuple(part for part in (path or '').split('/') if part)
+    return parts + (QUERY_PREFIX + query,) if query else parts
+
+
+def _base(parts):
+    return parts[:-1] if parts and parts[-1].startswith(QUERY_PREFIX) else parts
+
+
+def _key(parts):
+    # '/path', or '/path?query' for a query result
+    path = '/' + '/'.join(_base(parts))
+    return path if _base(parts) == parts else f"{path}?{parts[-1][len(QUERY_PREFIX):]}"
+
+
+class PathCache:
+    """Last successful read of each Firebase path, persisted to disk.
+
+    Reads go through fetch(); good results are remembered (at most once per
+    `min_interval` per path) and served instead when Firebase is unreachable
+    or still initializing. Values are kept JSON-encoded, so callers get a
+    fresh copy they may modify. A path without an entry of its own is served
+    from the nearest cached ancestor. Query results are kept per query string
+    alongside the path they query.
+
+    With a `ttl`, results also answer reads outright for that many seconds,
+    until invalidate() reports the path (or an ancestor or descendant) changed.
+    Invalidated entries stay available as the fallback. set_ttl_overrides()
+    lengthens the ttl of individual path labels (see UsageLedger).
+    """
+
+    def __init__(self, min_interval=1.0, ttl=0.0):
+        self.min_interval = min_interval
+        self.ttl = ttl
+        self.ttl_overrides = {}         # path label -> ttl
+        self.file = None
+        self.interval = 30.0
+        self.loaded = 0
+        self.saved_at = None
+        self._lock = threading.Lock()
+        self._entries = {}              # path parts -> (fetched_at, encoded value)
+        self._fresh = set()             # path parts that may answer reads until ttl expires
+        self._mirrors = []
+        self._mirror_versions = {}
+        self._dirty = False
+        self._thread = None
+
+    def configure(self, file=None, interval=None, ttl=None):
+        self.file = file or None
+        if interval is not None:
+            self.interval = interval
+        if ttl is not None:
+            self.ttl = ttl
+
+    def put(self, path, value, query=None):
+        parts = _split_path(path, query)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(parts)
+            if entry is not None and now - entry[0] < self.min_interval and parts in self._fresh:
+                return
+        encoded = _encode(value)
+        with self._lock:
+            self._entries[parts] = (now, encoded)
+            self._fresh.add(parts)
+            self._dirty = True
+
+    def set_ttl_overrides(self, overrides):
+        self.ttl_overrides = dict(overrides)
+
+    def ttl_for(self, path):
+        if not self.ttl_overrides:
+            return self.ttl
+        return max(self.ttl, self.ttl_overrides.get(path_label(path), 0))
+
+    def invalidate(self, paths):
+        """Stop answering reads from entries that overlap any of `paths`"""
+        changed = [_split_path(path) for path in paths]
+
+        def overlaps(parts):
+            parts = _base(parts)
+            return any(parts[:len(other)] == other or other[:len(parts)] == parts for other in changed)
+
+        with self._lock:
+            self._fresh = {parts for parts in self._fresh if not overlaps(parts)}
+
+    def get(self, path, fresh=False, query=None):
+        """(value, fetched_at) for path, or None if nothing covers it; with `fresh`,
+        only from an entry still within its ttl and not invalidated"""
+        parts = _split_path(path, query)
+        with self._lock:
+            for depth in range(len(parts), -1, -1):
+                entry = self._entries.get(parts[:depth])
+                if entry is not None:
+                    break
+            else:
+                return None
+            if fresh and (parts[:depth] not in self._fresh or time.time() - entry[0] >= self.ttl_for(path)):
+                return None
+        fetched_at, encoded = entry
+        node = json.loads(encoded)
+        for part in parts[depth:]:
+            if isinstance(node, list) and part.isdigit() and int(part) < len(node):
+                node = node[int(part)]
+            elif isinstance(node, dict):
+                node = node.get(part)
+            else:
+                return None
+            if node is None:
+                return None
+        return node, fetched_at
+
+    def fetch(self, path, read, prefer_cached=False, query=None):
+        """read() for path (or a `query` on it, described by a string) through the
+        cache: remember a good result, or serve the last known one if read() fails.
+        A fresh entry (see ttl) is served without calling read(); with
+        prefer_cached, so is any cached value."""
+        if self.ttl > 0 or self.ttl_overrides:
+            cached = self.get(path, fresh=True, query=query)
+            record_cache('read_cache', cached is not None)
+            if cached is not None:
+                return cached[0]
+        if prefer_cached:
+            cached = self.get(path, query=query)
+            if cached is not None:
+                return self._serve(path, cached)
+        try:
+            value = read()
+        except Exception as e:
+            cached = self.get(path, query=query)
+            if cached is None:
+                raise
+            logger.warning("Serving %s from the last-known-good snapshot: %s", path, e)
+            return self._serve(path, cached)
+        if value is not None:
+            self.put(path, value, query)
+        return value
+
+    def _serve(self, path, cached):
+        value, fetched_at = cached
+        record_cache('snapshot', True)
+        if has_request_context():
+            g.data_as_of = min(g.get('data_as_of', fetched_at), fetched_at)
+        return value
+
+    def items(self):
+        """[(key, (fetched_at, encoded value))] for every cached path and query"""
+        with self._lock:
+            return [(_key(parts), entry) for parts, entry in self._entries.items()]
+
+    def track(self, mirror):
+        """Include a listener mirror's data in every save, once it has synced"""
+        if mirror not in self._mirrors:
+            self._mirrors.append(mirror)
+
+    def _capture_mirrors(self):
+        now = time.time()
+        for mirror in self._mirrors:
+            with mirror._lock:
+                if not mirror.ready or mirror.data is None:
+                    continue
+                version = mirror.version
+                encoded = None if self._mirror_versions.get(mirror.path) == version else _encode(mirror.data)
+            parts = _split_path(mirror.path)
+            with self._lock:
+                # The mirror is live, so an unchanged copy is still current
+                if encoded is None and parts in self._entries:
+                    encoded = self._entries[parts][1]
+                if encoded is not None:
+                    self._entries[parts] = (now, encoded)
+                    self._dirty = True
+            self._mirror_versions[mirror.path] = version
+
+    def save(self):
+        """Write the snapshot atomically; returns True if a file was written"""
+        if not self.file:
+            return False
+        self._capture_mirrors()
+        with self._lock:
+            if not self._dirty:
+                return False
+            entries = dict(self._entries)
+            self._dirty = False
+
+        body = '{' + ','.join(
+            f'{json.dumps("/" + "/".join(parts))}:{{"fetched_at":{fetched_at},"value":{encoded}}}'
+            for parts, (fetched_at, encoded) in entries.items()) + '}'
+        body = zlib.compress(body.encode(), 6)
+        saved_at = time.time()
+        header = _HEADER.pack(MAGIC, VERSION, saved_at, len(entries), zlib.crc32(body))
+
+        directory = os.path.dirname(os.path.abspath(self.file))
+        fd, tmp_path = tempfile.mkstemp(prefix='.snapshot-', dir=directory)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(header)
+                f.write(body)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.file)
+        except OSError:
+            with self._lock:
+                self._dirty = True
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        self.saved_at = saved_at
+        return True
+
+    def load(self):
+        """Read the snapshot file into the cache; returns the number of paths loaded"""
+        if not self.file or not os.path.exists(self.file):
+            return 0
+        try:
+            with open(self.file, 'rb') as f:
+                header = f.read(_HEADER.size)
+                body = f.read()
+            magic, version, saved_at, count, crc = _HEADER.unpack(header)
+            if magic != MAGIC or version != VERSION or zlib.crc32(body) != crc:
+                raise ValueError("not a snapshot file, or corrupt")
+            entries = json.loads(zlib.decompress(body))
+        except (OSError, ValueError, struct.error, zlib.error) as e:
+            logger.warning("Ignoring snapshot %s: %s", self.file, e)
+            return 0
+
+        with self._lock:
+            for path, entry in entries.items():
+                parts = _split_path(path)
+                # Anything read since startup is newer than the file
+                if parts not in self._entries:
+                    self._entries[parts] = (entry['fetched_at'], _encode(entry['value']))
+            self.loaded = len(entries)
+            self.saved_at = saved_at
+        logger.info("Loaded %d paths from snapshot %s (saved %.0f s ago)",
+                    len(entries), self.file, time.time() - saved_at)
+        return len(entries)
+
+    def start(self):
+        """Save in the background every `interval` seconds, and at exit"""
+        with self._lock:
+            if not self.file or self.interval <= 0 or self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name='snapshot-writer', daemon=True)
+            self._thread.start()
+        atexit.register(self._save_quietly)
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            self._save_quietly()
+
+    def _save_quietly(self):
+        try:
+            self.save()
+        except Exception as e:
+            logger.exception("Error saving snapshot to %s: %s", self.file, e)
+
+    def info(self):
+        with self._lock:
+            oldest = min((fetched_at for fetched_at, _ in self._entries.values()), default=None)
+            return {
+                'file': self.file,
+                'paths': len(self._entries),
+                'loaded_from_file': self.loaded,
+                'saved_at': self.saved_at,
+                'oldest_age_seconds': round(time.time() - oldest, 1) if oldest else None,
+            }
+
+
+snapshot_cache = PathCache()
+
+
+def add_staleness_headers(response):
+    """Mark responses that were (partly) served from the snapshot, with its age"""
+    as_of = g.get('data_as_of')
+    if as_of is not None:
+        response.headers['X-Data-Source'] = 'snapshot'
+        response.headers['X-Data-As-Of'] = datetime.fromtimestamp(as_of, timezone.utc).isoformat(timespec='seconds')
+        response.headers['X-Data-Age'] = str(max(0, int(time.time() - as_of)))
+    return response
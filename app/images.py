@@ -0,0 +1,242 @@
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+
+from flask import abort, current_app, request, send_file, url_for
+from werkzeug.security import safe_join
+
+logger = logging.getLogger(__name__)
+
+# Only photos and plans under static/images are transcoded
+IMAGE_DIR = 'images'
+SOURCE_TYPES = {'.png', '.jpg', '.jpeg'}
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+
+def _pillow():
+    try:
+        from PIL import Image, features
+    except ImportError:
+        return None
+    return Image if features.check('webp') else None
+
+
+class ImageVariants:
+    """WebP copies of static images at a few bucketed widths, made on first request.
+
+    Variants are written to `cache_dir`, named after the source's content
+    hash, so an edited image gets new variants and URLs. The directory is
+    kept under `max_bytes` by evicting the least recently served files; a
+    hit refreshes the file's mtime, which orders the eviction.
+    """
+
+    def __init__(self, cache_dir=None, max_bytes=64 * 1024 * 1024, widths=(320, 480, 640, 960), quality=80):
+        self.cache_dir = cache_dir or os.path.join(tempfile.gettempdir(), 'energy_dashboard_images')
+        self.max_bytes = max_bytes
+        self.widths = tuple(sorted(widths))
+        self.quality = quality
+        self.image = _pillow()
+        self._lock = threading.Lock()
+        self._building = {}             # variant name -> lock held while it is generated
+        self._sources = {}              # source path -> ((size, mtime), digest, width)
+        self._index = None              # variant name -> (bytes, last served)
+        self._total = 0
+
+    def configure(self, cache_dir=None, max_bytes=None, widths=None, quality=None):
+        with self._lock:
+            if cache_dir:
+                self.cache_dir = cache_dir
+                self._index = None
+            if max_bytes is not None:
+                self.max_bytes = max_bytes
+            if widths:
+                self.widths = tuple(sorted(widths))
+            if quality is not None:
+                self.quality = quality
+
+    @property
+    def available(self):
+        return self.image is not None
+
+    def source_info(self, source):
+        """(content hash, pixel width) of a source image, re-read only when it changes"""
+        stat = os.stat(source)
+        key = (stat.st_size, stat.st_mtime)
+        cached = self._sources.get(source)
+        if cached is None or cached[0] != key:
+            with open(source, 'rb') as f:
+                digest = hashlib.sha256(f.read()).hexdigest()[:10]
+            with self.image.open(source) as image:
+                cached = self._sources[source] = (key, digest, image.width)
+        return cached[1], cached[2]
+
+    def widths_for(self, source):
+        """The configured widths narrower than the source, plus its own width"""
+        source_width = self.source_info(source)[1]
+        return [width for width in self.widths if width < source_width] + [source_width]
+
+    def bucket(self, source, width):
+        """The narrowest available width of at least `width` (never upscaled)"""
+        widths = self.widths_for(source)
+        return next((bucket for bucket in widths if bucket >= width), widths[-1])
+
+    def variant(self, source, width):
+        """Path of the WebP variant of `source` for a width bucket, generating it if needed"""
+        stem = os.path.splitext(os.path.basename(source))[0]
+        width = self.bucket(source, width)
+        name = f"{stem}.{self.source_info(source)[0]}.{width}w.webp"
+        path = os.path.join(self.cache_dir, name)
+        with self._lock:
+            self._load_index()
+            if name in self._index:
+                self._touch(name, path)
+                return path
+            building = self._building.setdefault(name, threading.Lock())
+
+        with building:
+            with self._lock:
+                if name in self._index:
+                    return path
+            try:
+                size = self._transcode(source, path, width)
+            finally:
+                with self._lock:
+                    self._building.pop(name, None)
+            with self._lock:
+                self._index[name] = (size, time.time())
+                self._total += size
+                self._evict()
+        return path
+
+    def _transcode(self, source, path, width):
+        started = time.perf_counter()
+        with self.image.open(source) as image:
+            if image.width > width:
+                image = image.resize((width, round(image.height * width / image.width)), self.image.LANCZOS)
+            if image.mode not in ('RGB', 'RGBA'):
+                image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+            os.makedirs(self.cache_dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(prefix='.variant-', dir=self.cache_dir)
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    image.save(f, 'WEBP', quality=self.quality, method=4)
+                os.replace(tmp_path, path)
+            except Exception:
+                if os.path.exists(tmp_path):
+                    os.unlink(tmp_path)
+                raise
+        size = os.path.getsize(path)
+        logger.info("Transcoded %s to %s (%d bytes) in %.0f ms", os.path.basename(source),
+                    os.path.basename(path), size, (time.perf_counter() - started) * 1000)
+        return size
+
+    def _load_index(self):
+        # Pick up variants left by earlier runs (and other workers) once
+        if self._index is not None:
+            return
+        self._index, self._total = {}, 0
+        if not os.path.isdir(self.cache_dir):
+            return
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.webp') and not name.startswith('.'):
+                stat = os.stat(os.path.join(self.cache_dir, name))
+                self._index[name] = (stat.st_size, stat.st_mtime)
+                self._total += stat.st_size
+
+    def _touch(self, name, path):
+        size, _ = self._index[name]
+        now = time.time()
+        self._index[name] = (size, now)
+        try:
+            os.utime(path, (now, now))
+        except OSError:
+            # Removed behind our back (another worker evicted it)
+            del self._index[name]
+            self._total -= size
+            raise FileNotFoundError(path)
+
+    def _evict(self):
+        for name, (size, _) in sorted(self._index.items(), key=lambda item: item[1][1]):
+            if self._total <= self.max_bytes:
+                break
+            try:
+                os.unlink(os.path.join(self.cache_dir, name))
+            except OSError:
+                pass
+            del self._index[name]
+            self._total -= size
+
+    def info(self):
+        with self._lock:
+            self._load_index()
+            return {'available': self.available, 'dir': self.cache_dir, 'variants': len(self._index),
+                    'bytes': self._total, 'max_bytes': self.max_bytes}
+
+
+image_variants = ImageVariants()
+
+
+# (image name, source hash, script root) -> srcset; pages render it on every load
+_srcsets = {}
+
+
+def _source_path(filename):
+    path = safe_join(current_app.static_folder, IMAGE_DIR, filename)
+    if path is None or os.path.splitext(path)[1].lower() not in SOURCE_TYPES or not os.path.isfile(path):
+        return None
+    return path
+
+
+def image_srcset(filename):
+    """srcset of WebP variants for a static image name like 'images/building_section.jpg';
+    '' when Pillow (with WebP support) is not installed or the image doesn't exist"""
+    if not image_variants.available or not filename.startswith(IMAGE_DIR + '/'):
+        return ''
+    name = filename[len(IMAGE_DIR) + 1:]
+    source = _source_path(name)
+    if source is None:
+        return ''
+    version = image_variants.source_info(source)[0]
+    key = (name, version, request.script_root)
+    srcset = _srcsets.get(key)
+    if srcset is None:
+        srcset = _srcsets[key] = ', '.join(
+            f"{url_for('main.image_variant', width=width, filename=name, v=version)} {width}w"
+            for width in image_variants.widths_for(source))
+    return srcset
+
+
+def serve_variant(width, filename):
+    """The WebP variant for a width bucket; the original image if Pillow is missing"""
+    source = _source_path(filename)
+    if source is None:
+        abort(404)
+    if not image_variants.available:
+        return send_file(source, max_age=3600)
+    try:
+        path = image_variants.variant(source, width)
+    except FileNotFoundError:
+        path = image_variants.variant(source, width)
+    # Serving refreshes the file's mtime (see ImageVariants), so validate by name, which
+    # carries the source hash and width
+    response = send_file(path, mimetype='image/webp', conditional=True,
+                         etag=os.path.basename(path), last_modified=os.path.getmtime(source))
+    if request.args.get('v') == image_variants.source_info(source)[0]:
+        response.headers['Cache-Control'] = IMMUTABLE
+    else:
+        response.cache_control.max_age = 3600
+    return response
+
+
+def init_images(app):
+    """Configure the variant cache (IMAGE_*) and expose image_srcset() to templates"""
+    image_variants.configure(cache_dir=app.config.get('IMAGE_CACHE_DIR'),
+                             max_bytes=app.config.get('IMAGE_CACHE_MAX_BYTES'),
+                             widths=app.config.get('IMAGE_WIDTHS'),
+                             quality=app.config.get('IMAGE_QUALITY'))
+    if not image_variants.available:
+        logger.info("Pillow with WebP support is not installed; serving original images")
+    app.add_template_global(image_srcset)
@@ -0,0 +1,83 @@
+from flask import before_render_template, g, request, template_rendered
+import threading
+import time
+
+from app.monitoring import tracing
+from app.monitoring.memory import memory_tracker
+from app.monitoring.startup import startup_timer
+from app.monitoring.metrics import REQUEST_DURATION, REQUESTS_IN_FLIGHT, TEMPLATE_RENDER_DURATION, payload_sizer
+
+_render_starts = threading.local()
+
+
+def init_monitoring(app):
+    """Hook request metrics (METRICS_ENABLED) and Firebase tracing (TRACING_ENABLED) into the app"""
+    metrics_enabled = app.config.get('METRICS_ENABLED', True)
+    tracing_enabled = app.config.get('TRACING_ENABLED', True)
+    tracing.trace_store.size = app.config.get('TRACE_HISTORY', tracing.trace_store.size)
+    memory_tracker.interval = app.config.get('MEMORY_SAMPLE_INTERVAL', memory_tracker.interval)
+    payload_sizer.every = app.config.get('FIREBASE_BYTES_SAMPLE_EVERY', payload_sizer.every)
+
+    @app.before_request
+    def _start_request():
+        g._request_start = time.perf_counter()
+        if not startup_timer.first_request_seen:
+            startup_timer.first_request()
+        if metrics_enabled:
+            REQUESTS_IN_FLIGHT.inc()
+        if tracing_enabled:
+            # The id keying /debug/trace is always ours; the caller's is only recorded
+            g._trace, g._trace_token = tracing.start_trace(
+                tracing.new_request_id(), request.method, request.path,
+                tracing.client_request_id(request.headers.get('X-Request-ID')))
+
+    @app.after_request
+    def _finish_response(response):
+        if metrics_enabled:
+            _observe_request(response.status_code)
+        trace = g.get('_trace')
+        if trace is not None:
+            trace.finish(request.endpoint, response.status_code)
+            response.headers['X-Request-ID'] = trace.request_id
+            response.headers['Server-Timing'] = trace.server_timing()
+        return response
+
+    @app.teardown_request
+    def _finish_request(error=None):
+        if '_request_start' not in g:
+            return
+        # after_request is skipped when a view raises
+        if metrics_enabled:
+            _observe_request(500)
+            REQUESTS_IN_FLIGHT.dec()
+        trace = g.get('_trace')
+        if trace is not None:
+            if trace.duration is None:
+                trace.finish(request.endpoint, 500)
+            tracing.trace_store.add(trace)
+            tracing.end_trace(g._trace_token)
+
+    if metrics_enabled:
+        before_render_template.connect(_start_render_timer, app)
+        template_rendered.connect(_record_render, app)
+
+
+def _observe_request(status):
+    if g.get('_request_observed'):
+        return
+    g._request_observed = True
+    endpoint = request.endpoint or 'unmatched'
+    REQUEST_DURATION.observe(time.perf_counter() - g._request_start, endpoint, request.method, str(status))
+
+
+def _start_render_timer(sender, template, context, **extra):
+    stack = getattr(_render_starts, 'stack', None)
+    if stack is None:
+        stack = _render_starts.stack = []
+    stack.append(time.perf_counter())
+
+
+def _record_render(sender, template, context, **extra):
+    stack = getattr(_render_starts, 'stack', None)
+    if stack:
+        TEMPLATE_RENDER_DURATION.observe(time.perf_counter() - stack.pop(), template.name or 'string')
@@ -0,0 +1,147 @@
+from datetime import datetime, timezone
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+
+from app.monitoring import tracing
+
+_listener = None
+
+
+class RateLimitFilter(logging.Filter):
+    """Let at most `limit` records per `interval` seconds through from each call site
+    (file and line); the next record let through reports how many were dropped"""
+
+    def __init__(self, limit=20, interval=10.0):
+        super().__init__()
+        self.limit = limit
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._sites = {}                # (pathname, lineno) -> [window start, count, suppressed]
+
+    def filter(self, record):
+        if self.limit <= 0:
+            return True
+        key = (record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            site = self._sites.get(key)
+            if site is None or now - site[0] >= self.interval:
+                if site and site[2]:
+                    record.suppressed = site[2]
+                self._sites[key] = [now, 1, 0]
+                return True
+            if site[1] < self.limit:
+                site[1] += 1
+                return True
+            site[2] += 1
+            return False
+
+
+def _truncate(text, max_length):
+    if max_length and len(text) > max_length:
+        return f"{text[:max_length]}... [{len(text) - max_length} chars truncated]"
+    return text
+
+
+class BackgroundQueueHandler(logging.handlers.QueueHandler):
+    """Hands records to the writer thread without blocking; drops them if the queue is full.
+
+    The message is rendered and truncated here, since its arguments may change
+    after the call returns.
+    """
+
+    def __init__(self, log_queue, max_length=2000):
+        super().__init__(log_queue)
+        self.max_length = max_length
+        self.dropped = 0
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = _truncate(record.getMessage(), self.max_length)
+        record.args = None
+        if record.exc_info:
+            record.exc_text = _truncate(logging.Formatter().formatException(record.exc_info), self.max_length * 4)
+            record.exc_info = None
+        trace = tracing.current_trace()
+        record.request_id = trace.request_id if trace is not None else None
+        record.client_request_id = trace.client_request_id if trace is not None else None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line"""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for field in ('request_id', 'client_request_id', 'suppressed'):
+            value = getattr(record, field, None)
+            if value:
+                entry[field] = value
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Human-readable lines for local development"""
+
+    def __init__(self):
+        super().__init__('%(asctime)s %(levelname)-7s %(name)s: %(message)s')
+
+    def format(self, record):
+        line = super().format(record)
+        extras = [f"{field}={getattr(record, field)}"
+                  for field in ('request_id', 'client_request_id', 'suppressed') if getattr(record, field, None)]
+        return f"{line} [{' '.join(extras)}]" if extras else line
+
+
+class _StdoutHandler(logging.StreamHandler):
+    # Resolve sys.stdout when writing, so redirected stdout is honoured
+    @property
+    def stream(self):
+        return sys.stdout
+
+    @stream.setter
+    def stream(self, value):
+        pass
+
+
+def init_logging(app):
+    """Route the `app` logger hierarchy through a queue to a background writer"""
+    global _listener
+    logger = logging.getLogger('app')
+    logger.setLevel(str(app.config.get('LOG_LEVEL', 'INFO')).upper())
+    if _listener is not None:
+        return
+
+    writer = _StdoutHandler()
+    writer.setFormatter(JsonFormatter() if app.config.get('LOG_FORMAT', 'json') == 'json' else TextFormatter())
+
+    log_queue = queue.Queue(maxsize=app.config.get('LOG_QUEUE_SIZE', 10000))
+    handler = BackgroundQueueHandler(log_queue, max_length=app.config.get('LOG_MAX_LENGTH', 2000))
+    handler.addFilter(RateLimitFilter(limit=app.config.get('LOG_RATE_LIMIT', 20),
+                                      interval=app.config.get('LOG_RATE_INTERVAL', 10.0)))
+    logger.addHandler(handler)
+    logger.propagate = False
+
+    _listener = logging.handlers.QueueListener(log_queue, writer)
+    _listener.start()
+    atexit.register(_listener.stop)
@@ -0,0 +1,212 @@
+from collections import deque
+from contextlib import nullcontext
+import gc
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+# Never descend into these; they are shared runtime machinery, not retained data
+_OPAQUE = (type, type(sys), type(len), type(lambda: None), threading.Thread)
+
+
+def deep_size(obj, seen=None):
+    """Bytes retained by obj and everything it references that isn't in `seen`.
+
+    Follows containers and instances of the app's own classes; locks, threads,
+    modules and functions are not followed. Pass the same `seen` set to several
+    calls so shared objects are only counted once.
+    """
+    seen = set() if seen is None else seen
+    total = 0
+    stack = [obj]
+    while stack:
+        item = stack.pop()
+        if id(item) in seen or isinstance(item, _OPAQUE):
+            continue
+        seen.add(id(item))
+        try:
+            total += sys.getsizeof(item)
+        except TypeError:
+            continue
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset, deque)):
+            stack.extend(item)
+        elif type(item).__module__.startswith('app.') and hasattr(item, '__dict__'):
+            attributes = vars(item)
+            if id(attributes) not in seen:
+                seen.add(id(attributes))
+                total += sys.getsizeof(attributes)
+                stack.extend(value for key, value in attributes.items()
+                             if not key.endswith('lock') and not key.endswith('cond'))
+    return total
+
+
+def rss_bytes():
+    """Current resident set size, where the platform exposes it"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+def _guard(obj):
+    # The structure's own lock, so listener threads can't mutate it mid-walk
+    return getattr(obj, '_lock', None) or getattr(obj, '_cond', None) or nullcontext()
+
+
+def retained_structures():
+    """(name, object, lock) for every long-lived in-memory structure: each mirror and
+    cached path first, so the totals that follow exclude them"""
+    from app.firebase.listeners import mirrors
+    from app.firebase.aggregates import building_aggregates
+    from app.firebase.room_index import room_index
+    from app.firebase.appliance_commands import appliance_commands
+    from app.firebase.notification_rules import notification_engine
+    from app.firebase.snapshot import snapshot_cache
+    from app.monitoring.profiler import request_profiler
+    from app.monitoring.tracing import trace_store
+
+    structures = [(f"mirror:{mirror.path}", mirror.data, mirror._lock) for mirror in mirrors.values()]
+    # Entries are immutable tuples, so they can be sized without the cache's lock
+    structures.extend((f"cache:{key}", entry, nullcontext()) for key, entry in snapshot_cache.items())
+    for name, obj in [('room_index', room_index),
+                      ('building_aggregates', building_aggregates),
+                      ('notification_engine', notification_engine),
+                      ('appliance_commands', appliance_commands),
+                      ('snapshot_cache', snapshot_cache),
+                      ('trace_store', trace_store),
+                      ('request_profiler', request_profiler)]:
+        structures.append((name, obj, _guard(obj)))
+    return structures
+
+
+def _children(node, key):
+    children = node.get(key) if isinstance(node, dict) else None
+    return children if isinstance(children, dict) else {}
+
+
+def model_sizes():
+    """Count and retained bytes per model type held in the mirrors; children are
+    sized first, so a floor's bytes exclude its rooms and a room's its appliances"""
+    from app.firebase.listeners import mirrors
+
+    models = {name: {'count': 0, 'bytes': 0} for name in ('floor', 'room', 'appliance', 'person')}
+    seen = set()
+
+    def add(name, obj):
+        models[name]['count'] += 1
+        models[name]['bytes'] += deep_size(obj, seen)
+
+    with mirrors['floors']._lock:
+        floors = mirrors['floors'].data or {}
+        for floor in (floors.values() if isinstance(floors, dict) else []):
+            for room in _children(floor, 'rooms').values():
+                for appliance in _children(room, 'appliances').values():
+                    add('appliance', appliance)
+                add('room', room)
+            add('floor', floor)
+
+    with mirrors['people']._lock:
+        people = mirrors['people'].data or {}
+        for person in (people.values() if isinstance(people, dict) else []):
+            add('person', person)
+    return models
+
+
+class MemoryTracker:
+    """Periodic memory samples, kept to report growth over time"""
+
+    def __init__(self, interval=60.0, history=120):
+        self.interval = interval
+        self.samples = deque(maxlen=history)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._window_lock = threading.Lock()
+
+    def measure(self):
+        """Retained bytes per structure plus process totals, right now"""
+        seen = set()
+        structures = {}
+        for name, obj, lock in retained_structures():
+            with lock:
+                structures[name] = deep_size(obj, seen)
+        return {
+            'ts': time.time(),
+            'rss_bytes': rss_bytes(),
+            'gc_objects': len(gc.get_objects()),
+            'structures': structures,
+        }
+
+    def sample(self):
+        measurement = self.measure()
+        with self._lock:
+            self.samples.append(measurement)
+        return measurement
+
+    def ensure_sampling(self):
+        """Start the background sampler on first use"""
+        with self._lock:
+            if self.interval <= 0 or (self._thread is not None and self._thread.is_alive()):
+                return
+            self._thread = threading.Thread(target=self._run, name='memory-tracker', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            self.sample()
+
+    def growth(self):
+        """Per-structure and RSS deltas since the previous and the oldest sample"""
+        with self._lock:
+            samples = list(self.samples)
+        if len(samples) < 2:
+            return None
+        latest, previous, oldest = samples[-1], samples[-2], samples[0]
+
+        def delta(before):
+            structures = {name: size - before['structures'].get(name, 0)
+                          for name, size in latest['structures'].items()}
+            rss = latest['rss_bytes'] - before['rss_bytes'] \
+                if latest['rss_bytes'] is not None and before['rss_bytes'] is not None else None
+            return {'seconds': round(latest['ts'] - before['ts'], 1), 'rss_bytes': rss,
+                    'gc_objects': latest['gc_objects'] - before['gc_objects'], 'structures': structures}
+
+        return {'since_previous': delta(previous), 'since_oldest': delta(oldest)}
+
+    def allocation_window(self, seconds, limit=20):
+        """Top allocation sites (by net bytes) over the next `seconds`, via tracemalloc.
+
+        Blocks the caller for the window; other requests keep being served
+        and their allocations are what gets measured. Returns None if another
+        window is already open.
+        """
+        if not self._window_lock.acquire(blocking=False):
+            return None
+        started_here = not tracemalloc.is_tracing()
+        try:
+            if started_here:
+                tracemalloc.start(10)
+            before = tracemalloc.take_snapshot()
+            time.sleep(seconds)
+            after = tracemalloc.take_snapshot()
+            filters = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+            stats = after.filter_traces(filters).compare_to(before.filter_traces(filters), 'lineno')
+            return [{
+                'site': f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                'size_diff_bytes': stat.size_diff,
+                'size_bytes': stat.size,
+                'count_diff': stat.count_diff,
+            } for stat in stats[:limit]]
+        finally:
+            if started_here:
+                tracemalloc.stop()
+            self._window_lock.release()
+
+
+memory_tracker = MemoryTracker()
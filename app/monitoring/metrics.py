@@ -0,0 +1,289 @@
+import bisect
+import json
+import threading
+import time
+
+from app.monitoring import tracing
+from app.monitoring.usage import usage_ledger
+
+# Seconds; covers mirror hits (sub-millisecond) up to slow Firebase round trips
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+REGISTRY = []
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    type = 'untyped'
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labels)
+        self._lock = threading.Lock()
+        self._values = {}
+        REGISTRY.append(self)
+
+    def value(self, *labels):
+        """Current value for one label set (0 if never touched)"""
+        with self._lock:
+            return self._values.get(labels, 0)
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            yield self.name + _format_labels(self.labelnames, labels), value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        lines.extend(f"{series} {_format_value(value)}" for series, value in self.samples())
+        return '\n'.join(lines)
+
+
+class Counter(_Metric):
+    """Monotonic count per label set; label values are passed positionally"""
+    type = 'counter'
+
+    def inc(self, amount=1, *labels):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+
+class Gauge(_Metric):
+    """Value that goes up and down, or is computed at scrape time by set_function()"""
+    type = 'gauge'
+
+    def __init__(self, name, help, labels=()):
+        super().__init__(name, help, labels)
+        self._function = None
+
+    def inc(self, amount=1, *labels):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, amount=1, *labels):
+        self.inc(-amount, *labels)
+
+    def set(self, value, *labels):
+        with self._lock:
+            self._values[labels] = value
+
+    def set_function(self, function):
+        """Compute the gauge on scrape; function returns {label tuple: value}"""
+        self._function = function
+
+    def samples(self):
+        if self._function is None:
+            yield from super().samples()
+            return
+        for labels, value in sorted(self._function().items()):
+            yield self.name + _format_labels(self.labelnames, labels), value
+
+
+class Histogram(_Metric):
+    """Bucketed observations per label set, exposed as cumulative _bucket/_sum/_count"""
+    type = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(labels)
+            if series is None:
+                # Per-bucket (non-cumulative) counts plus one overflow slot, sum, count
+                series = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def value(self, *labels):
+        """(count, sum) for one label set"""
+        with self._lock:
+            series = self._values.get(labels)
+            return (series[2], series[1]) if series else (0, 0.0)
+
+    def samples(self):
+        with self._lock:
+            items = sorted((labels, (list(series[0]), series[1], series[2]))
+                           for labels, series in self._values.items())
+        for labels, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = 'le="' + _format_value(bound) + '"'
+                yield self.name + '_bucket' + _format_labels(self.labelnames, labels, le), cumulative
+            yield self.name + '_sum' + _format_labels(self.labelnames, labels), total
+            yield self.name + '_count' + _format_labels(self.labelnames, labels), count
+
+
+def render():
+    """All metrics in the Prometheus text exposition format"""
+    return '\n'.join(metric.render() for metric in REGISTRY) + '\n'
+
+
+# HTTP
+
+REQUESTS_IN_FLIGHT = Gauge('dashboard_http_requests_in_flight', 'Requests currently being served')
+REQUEST_DURATION = Histogram('dashboard_http_request_duration_seconds', 'Request latency by endpoint',
+                             ('endpoint', 'method', 'status'))
+TEMPLATE_RENDER_DURATION = Histogram('dashboard_template_render_seconds', 'Jinja render time by template',
+                                     ('template',))
+ADMISSION_IN_FLIGHT = Gauge('dashboard_api_admitted_in_flight', 'API requests holding a concurrency slot')
+ADMISSION_QUEUED = Gauge('dashboard_api_queued', 'API requests waiting for a concurrency slot')
+ADMISSION_REJECTIONS = Counter('dashboard_api_rejections_total', 'API requests turned away by admission control',
+                               ('reason', 'endpoint'))
+
+# Firebase reads made by FirebaseClient
+
+FIREBASE_READS = Counter('dashboard_firebase_reads_total', 'Firebase get() calls by database path', ('path',))
+FIREBASE_READ_ERRORS = Counter('dashboard_firebase_read_errors_total', 'Failed Firebase get() calls by path',
+                               ('path',))
+FIREBASE_READ_BYTES = Counter('dashboard_firebase_read_bytes_total', 'JSON bytes returned by Firebase get() by path',
+                              ('path',))
+FIREBASE_READ_DURATION = Histogram('dashboard_firebase_read_duration_seconds', 'Firebase get() latency by path',
+                                   ('path',))
+FIREBASE_READ_TIMEOUTS = Counter('dashboard_firebase_read_timeouts_total', 'Firebase reads abandoned at their deadline',
+                                 ('path',))
+FIREBASE_CIRCUIT_REJECTIONS = Counter('dashboard_firebase_circuit_rejections_total',
+                                      'Firebase reads short-circuited by the open breaker', ('path',))
+FIREBASE_CIRCUIT_STATE = Gauge('dashboard_firebase_circuit_state', 'Firebase read breaker: 0 closed, 1 half-open, 2 open')
+FIREBASE_BUDGET_USED = Gauge('dashboard_firebase_budget_used_ratio',
+                             "Share of today's Firebase byte/read budget used by this process")
+FIREBASE_BUDGET_USED.set_function(lambda: {(): usage_ledger.pressure()})
+
+# In-memory mirrors and indexes: a hit is served from memory, a miss falls through to Firebase
+
+CACHE_REQUESTS = Counter('dashboard_cache_requests_total', 'Lookups against in-memory mirrors and indexes',
+                         ('cache', 'result'))
+INVALIDATIONS = Counter('dashboard_invalidations_total',
+                        'Changed-path messages sent to and received from other instances', ('direction',))
+CACHE_HIT_RATIO = Gauge('dashboard_cache_hit_ratio', 'Share of lookups served from memory', ('cache',))
+
+
+def _cache_hit_ratios():
+    with CACHE_REQUESTS._lock:
+        values = dict(CACHE_REQUESTS._values)
+    ratios = {}
+    for cache in {labels[0] for labels in values}:
+        hits = values.get((cache, 'hit'), 0)
+        total = hits + values.get((cache, 'miss'), 0)
+        ratios[(cache,)] = hits / total if total else 0.0
+    return ratios
+
+
+CACHE_HIT_RATIO.set_function(_cache_hit_ratios)
+
+# Collections whose child keys are ids; they are collapsed so path labels stay bounded
+ID_COLLECTIONS = {'floors', 'rooms', 'appliances', 'notifications', 'alerts', 'people'}
+
+
+def path_label(path):
+    """Database path with ids collapsed, e.g. /energy_dashboard/floors/{id}/rooms"""
+    parts = [part for part in str(path or '/').split('/') if part]
+    for i in range(1, len(parts)):
+        if parts[i - 1] in ID_COLLECTIONS:
+            parts[i] = '{id}'
+    return '/' + '/'.join(parts)
+
+
+def payload_size(data):
+    """Approximate wire size of a Firebase payload in bytes"""
+    if data is None:
+        return 0
+    return len(json.dumps(data, separators=(',', ':'), default=str))
+
+
+class PayloadSizer:
+    """Estimates payload sizes without serializing every payload (listener events,
+    which arrive far more often than reads).
+
+    A path label's payloads tend to stay about the same size, so each label's
+    objects are measured (payload_size) on the first payload and every
+    `every`-th after that; the ones in between count the last measurement.
+    Scalars are always measured. every=1 measures everything.
+    """
+
+    def __init__(self, every=16):
+        self.every = every
+        self._lock = threading.Lock()
+        self._labels = {}           # label -> [payloads since the last measurement, its size]
+
+    def size(self, label, data):
+        if not isinstance(data, (dict, list)) or self.every <= 1:
+            return payload_size(data)
+        with self._lock:
+            sample = self._labels.get(label)
+            if sample is not None and sample[0] < self.every - 1:
+                sample[0] += 1
+                return sample[1]
+        size = payload_size(data)
+        with self._lock:
+            self._labels[label] = [0, size]
+        return size
+
+
+payload_sizer = PayloadSizer()
+
+
+def record_firebase_read(path, seconds, size=0, error=False):
+    label = path_label(path)
+    FIREBASE_READS.inc(1, label)
+    FIREBASE_READ_DURATION.observe(seconds, label)
+    if error:
+        FIREBASE_READ_ERRORS.inc(1, label)
+    else:
+        FIREBASE_READ_BYTES.inc(size, label)
+        usage_ledger.record(label, size)
+
+
+def record_listener_event(path, data):
+    """Account the bytes a listen() stream delivered for `path`"""
+    label = path_label(path)
+    usage_ledger.record(label, payload_sizer.size(label, data), 'listener')
+
+
+def record_cache(cache, hit):
+    CACHE_REQUESTS.inc(1, cache, 'hit' if hit else 'miss')
+
+
+def timed_get(ref, path=None, **kwargs):
+    """ref.get(**kwargs) for a reference or query, recorded in the Firebase read
+    metrics and the current request's trace.
+
+    Queries don't expose their path, so pass `path` for those.
+    """
+    path = path or getattr(ref, 'path', '/')
+    start = time.perf_counter()
+    try:
+        data = ref.get(**kwargs)
+    except Exception:
+        seconds = time.perf_counter() - start
+        record_firebase_read(path, seconds, error=True)
+        tracing.record_read(path, seconds, 0, error=True)
+        raise
+    seconds = time.perf_counter() - start
+    # Reads are billed and counted against the daily budget, so measure each one
+    size = payload_size(data)
+    record_firebase_read(path, seconds, size)
+    tracing.record_read(path, seconds, size)
+    return data
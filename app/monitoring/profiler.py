@@ -0,0 +1,189 @@
+from collections import Counter, deque
+import hmac
+import random
+import sys
+import threading
+import time
+import uuid
+
+from werkzeug.wsgi import ClosingIterator
+
+# Leaf-most frame from one of these modules decides where a sample's time went
+CATEGORY_MODULES = [
+    ('firebase', ('firebase_admin', 'google', 'requests', 'urllib3', 'http.client', 'ssl', 'socket',
+                  'app.firebase.resilience', 'benchmarks.fake_firebase')),
+    ('jinja', ('jinja2', 'markupsafe')),
+    ('json', ('json', 'flask.json', 'simplejson')),
+]
+
+
+def _module(frame):
+    return frame.f_globals.get('__name__') or ''
+
+
+def _category(frame):
+    if frame.f_code.co_filename.endswith('.html'):
+        return 'jinja'  # compiled template code
+    module = _module(frame)
+    for category, prefixes in CATEGORY_MODULES:
+        for prefix in prefixes:
+            if module == prefix or module.startswith(prefix + '.'):
+                return category
+    return None
+
+
+class RequestProfile:
+    """Stack samples taken while one request was being served"""
+
+    def __init__(self, profile_id, method, path):
+        self.id = profile_id
+        self.method = method
+        self.path = path
+        self.status = None
+        self.started = time.time()
+        self._start = time.perf_counter()
+        self.duration = None
+        self.samples = 0
+        self.stacks = Counter()         # 'mod:func;mod:func' -> samples
+        self.categories = Counter()     # 'firebase' / 'jinja' / 'json' / 'app' -> samples
+
+    def add_sample(self, frame):
+        names = []
+        category = None
+        while frame is not None:
+            names.append(f"{_module(frame) or frame.f_code.co_filename}:{frame.f_code.co_name}")
+            if category is None:
+                category = _category(frame)
+            frame = frame.f_back
+        self.samples += 1
+        self.stacks[';'.join(reversed(names))] += 1
+        self.categories[category or 'app'] += 1
+
+    def finish(self, status):
+        self.status = status
+        self.duration = time.perf_counter() - self._start
+
+    def collapsed(self):
+        """Brendan Gregg collapsed-stack lines, ready for flamegraph.pl or speedscope"""
+        return '\n'.join(f"{stack} {count}" for stack, count in self.stacks.most_common())
+
+    def summary(self):
+        total = self.samples or 1
+        return {
+            'id': self.id,
+            'method': self.method,
+            'path': self.path,
+            'status': self.status,
+            'started': self.started,
+            'duration_ms': round((self.duration or 0) * 1000, 3),
+            'samples': self.samples,
+            'categories': {category: round(100.0 * count / total, 1)
+                           for category, count in self.categories.most_common()},
+        }
+
+
+class SamplingProfiler:
+    """One background thread samples the stacks of every request being profiled"""
+
+    def __init__(self, interval=0.005, history=50):
+        self.interval = interval
+        self.profiles = deque(maxlen=history)
+        self._lock = threading.Lock()
+        self._active = {}               # thread id -> RequestProfile
+        self._wake = threading.Event()
+        self._thread = None
+
+    def configure(self, interval=None, history=None):
+        if interval:
+            self.interval = interval
+        if history and history != self.profiles.maxlen:
+            with self._lock:
+                self.profiles = deque(self.profiles, maxlen=history)
+
+    def start(self, profile):
+        """Begin sampling the calling thread into `profile`"""
+        with self._lock:
+            self._active[threading.get_ident()] = profile
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    def stop(self, status):
+        with self._lock:
+            profile = self._active.pop(threading.get_ident(), None)
+            if profile is None:
+                return None
+            profile.finish(status)
+            self.profiles.append(profile)
+        return profile
+
+    def get(self, profile_id):
+        with self._lock:
+            return next((profile for profile in self.profiles if profile.id == profile_id), None)
+
+    def recent(self):
+        with self._lock:
+            return list(self.profiles)[::-1]
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            with self._lock:
+                active = dict(self._active)
+                if not active:
+                    self._wake.clear()
+                    continue
+            frames = sys._current_frames()
+            for thread_id, profile in active.items():
+                frame = frames.get(thread_id)
+                if frame is not None and profile.duration is None:
+                    profile.add_sample(frame)
+            del frames
+            time.sleep(self.interval)
+
+
+request_profiler = SamplingProfiler()
+
+
+class ProfilingMiddleware:
+    """WSGI middleware that profiles a request when its X-Profile header matches
+    `token`, or at random for a `sample_rate` share of requests"""
+
+    def __init__(self, wsgi_app, profiler=request_profiler, token=None, sample_rate=0.0):
+        self.wsgi_app = wsgi_app
+        self.profiler = profiler
+        self.token = token
+        self.sample_rate = sample_rate
+
+    def _wanted(self, environ):
+        header = environ.get('HTTP_X_PROFILE')
+        if header and self.token and hmac.compare_digest(header.encode(), self.token.encode()):
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def __call__(self, environ, start_response):
+        if not self._wanted(environ):
+            return self.wsgi_app(environ, start_response)
+
+        profile = RequestProfile(uuid.uuid4().hex, environ.get('REQUEST_METHOD'), environ.get('PATH_INFO'))
+        status = {}
+
+        def profiling_start_response(status_line, headers, exc_info=None):
+            status['code'] = int(status_line.split(' ', 1)[0])
+            # Profiles share the request's trace id when there is one
+            for name, value in headers:
+                if name.lower() == 'x-request-id':
+                    profile.id = value
+            headers = list(headers) + [('X-Profile-ID', profile.id)]
+            return start_response(status_line, headers, exc_info)
+
+        self.profiler.start(profile)
+        try:
+            body = self.wsgi_app(environ, profiling_start_response)
+        except BaseException:
+            self.profiler.stop(500)
+            raise
+        # Streamed bodies are produced while the server iterates them, so the
+        # profile ends when the server closes the body
+        return ClosingIterator(body, lambda: self.profiler.stop(status.get('code', 500)))
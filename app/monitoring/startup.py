@@ -0,0 +1,58 @@
+from collections import OrderedDict
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def _process_age():
+    """Seconds since this process started, where /proc exposes it"""
+    try:
+        with open('/proc/self/stat') as f:
+            start_ticks = int(f.read().rsplit(')', 1)[1].split()[19])
+        with open('/proc/uptime') as f:
+            uptime = float(f.read().split()[0])
+        return uptime - start_ticks / os.sysconf('SC_CLK_TCK')
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+class StartupTimer:
+    """Milestones from process start to the first served request"""
+
+    def __init__(self):
+        self._origin = time.perf_counter()
+        age = _process_age()
+        # Interpreter start and imports that ran before this module was loaded
+        self._offset = age if age is not None else 0.0
+        self._lock = threading.Lock()
+        self.phases = OrderedDict()
+        self.first_request_seen = False
+
+    def elapsed_ms(self):
+        return round((self._offset + time.perf_counter() - self._origin) * 1000, 1)
+
+    def mark(self, phase):
+        """Record that `phase` finished now (ms since process start); first mark wins"""
+        with self._lock:
+            if phase not in self.phases:
+                self.phases[phase] = self.elapsed_ms()
+
+    def first_request(self):
+        if not self.first_request_seen:
+            self.first_request_seen = True
+            self.mark('first_request')
+            self.log()
+
+    def report(self):
+        with self._lock:
+            return dict(self.phases)
+
+    def log(self):
+        logger.info("Startup timing (ms since process start): %s",
+                    ', '.join(f"{phase}={ms}" for phase, ms in self.report().items()))
+
+
+startup_timer = StartupTimer()
@@ -0,0 +1,162 @@
+from collections import OrderedDict
+import contextvars
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+
+_current_trace = contextvars.ContextVar('firebase_trace', default=None)
+
+# Frames from this file name the FirebaseClient method behind each read
+_CLIENT_FILE = os.path.join('app', 'firebase', 'firebase_client.py')
+
+# A caller's X-Request-ID is kept on the trace and in logs, so keep it short and header-safe
+_REQUEST_ID = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+
+
+class RequestTrace:
+    """Every Firebase read made while serving one request.
+
+    request_id is generated here and keys the trace store; client_request_id
+    is the caller's own X-Request-ID, kept only for correlation.
+    """
+
+    def __init__(self, request_id, method, path, client_request_id=None):
+        self.request_id = request_id
+        self.client_request_id = client_request_id
+        self.method = method
+        self.path = path
+        self.endpoint = None
+        self.status = None
+        self.started = time.time()
+        self._start = time.perf_counter()
+        self.duration = None
+        self.calls = []
+
+    def add_call(self, path, seconds, size, caller, error=False):
+        self.calls.append({
+            'path': path,
+            'duration_ms': round(seconds * 1000, 3),
+            'bytes': size,
+            'caller': caller,
+            'error': error,
+            'offset_ms': round((time.perf_counter() - self._start) * 1000, 3),
+        })
+
+    def finish(self, endpoint, status):
+        self.endpoint = endpoint
+        self.status = status
+        self.duration = time.perf_counter() - self._start
+
+    def firebase_ms(self):
+        return sum(call['duration_ms'] for call in self.calls)
+
+    def by_path(self):
+        """{path: {'count', 'duration_ms', 'bytes'}}, slowest first"""
+        totals = {}
+        for call in self.calls:
+            total = totals.setdefault(call['path'], {'count': 0, 'duration_ms': 0.0, 'bytes': 0})
+            total['count'] += 1
+            total['duration_ms'] += call['duration_ms']
+            total['bytes'] += call['bytes']
+        return OrderedDict(sorted(totals.items(), key=lambda item: -item[1]['duration_ms']))
+
+    def server_timing(self, max_paths=5):
+        """Server-Timing header value: app total, Firebase total, then the slowest paths"""
+        entries = [
+            f"app;dur={(self.duration or 0) * 1000:.2f}",
+            f'firebase;dur={self.firebase_ms():.2f};desc="{len(self.calls)} reads, '
+            f'{sum(call["bytes"] for call in self.calls)} B"',
+        ]
+        for i, (path, total) in enumerate(list(self.by_path().items())[:max_paths]):
+            desc = f"{path} x{total['count']}".replace('"', "'")
+            entries.append(f'fb{i};dur={total["duration_ms"]:.2f};desc="{desc}"')
+        return ', '.join(entries)
+
+    def to_dict(self):
+        return {
+            'request_id': self.request_id,
+            'client_request_id': self.client_request_id,
+            'method': self.method,
+            'path': self.path,
+            'endpoint': self.endpoint,
+            'status': self.status,
+            'started': self.started,
+            'duration_ms': round((self.duration or 0) * 1000, 3),
+            'firebase_ms': round(self.firebase_ms(), 3),
+            'firebase_reads': len(self.calls),
+            'firebase_bytes': sum(call['bytes'] for call in self.calls),
+            'by_path': self.by_path(),
+            'calls': self.calls,
+        }
+
+
+class TraceStore:
+    """The most recent finished traces, by request id"""
+
+    def __init__(self, size=200):
+        self.size = size
+        self._lock = threading.Lock()
+        self._traces = OrderedDict()
+
+    def add(self, trace):
+        with self._lock:
+            self._traces[trace.request_id] = trace
+            self._traces.move_to_end(trace.request_id)
+            while len(self._traces) > self.size:
+                self._traces.popitem(last=False)
+
+    def get(self, request_id):
+        with self._lock:
+            return self._traces.get(request_id)
+
+    def recent(self, limit=50):
+        with self._lock:
+            return list(self._traces.values())[-limit:][::-1]
+
+
+trace_store = TraceStore()
+
+
+def new_request_id():
+    return uuid.uuid4().hex
+
+
+def client_request_id(header_value):
+    """A caller's X-Request-ID if it is safe to record, else None"""
+    if header_value and _REQUEST_ID.match(header_value):
+        return header_value
+    return None
+
+
+def start_trace(request_id, method, path, client_request_id=None):
+    trace = RequestTrace(request_id, method, path, client_request_id)
+    return trace, _current_trace.set(trace)
+
+
+def end_trace(token):
+    _current_trace.reset(token)
+
+
+def current_trace():
+    return _current_trace.get()
+
+
+def _caller():
+    """FirebaseClient methods on the stack, outermost first, e.g. 'get_floor > get_floors'"""
+    names = []
+    frame = sys._getframe(2)
+    while frame is not None:
+        if frame.f_code.co_filename.endswith(_CLIENT_FILE):
+            names.append(frame.f_code.co_name)
+        frame = frame.f_back
+    return ' > '.join(reversed(names)) or None
+
+
+def record_read(path, seconds, size, error=False):
+    """Attach one Firebase read to the current request's trace, if any"""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add_call(path, seconds, size, _caller(), error)
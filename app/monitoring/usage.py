@@ -0,0 +1,161 @@
+from collections import OrderedDict
+from datetime import datetime, timezone
+import logging
+import threading
+import time
+
+from flask import has_request_context, request
+
+logger = logging.getLogger(__name__)
+
+
+def _today():
+    return datetime.now(timezone.utc).date().isoformat()
+
+
+def _add(table, key, size):
+    entry = table.get(key)
+    if entry is None:
+        entry = table[key] = [0, 0]
+    entry[0] += 1
+    entry[1] += size
+
+
+def _rows(table):
+    return sorted(({'key': key, 'reads': reads, 'bytes': size} for key, (reads, size) in table.items()),
+                  key=lambda row: row['bytes'], reverse=True)
+
+
+class UsageLedger:
+    """Firebase reads and bytes downloaded by this process, per UTC day, broken
+    down by path (ids collapsed) and by the endpoint that caused them.
+
+    With a daily byte or read budget, once `soft_limit` of either is used the
+    heaviest paths (those making up `heavy_share` of today's bytes) get a cache
+    TTL of `budget_ttl` seconds, doubling for every further 10% of the budget
+    up to `max_ttl`. Pressure handlers receive {path label: ttl} whenever that
+    changes; they are re-evaluated at most every `evaluate_interval` seconds.
+    """
+
+    def __init__(self, days=7):
+        self.days = days
+        self.byte_budget = 0
+        self.read_budget = 0
+        self.soft_limit = 0.8
+        self.budget_ttl = 60.0
+        self.max_ttl = 900.0
+        self.heavy_share = 0.8
+        self.evaluate_interval = 10.0
+        self.ttl_overrides = {}
+        self._lock = threading.Lock()
+        self._days = OrderedDict()          # date -> {'paths': {label: [reads, bytes]}, 'endpoints': {...}}
+        self._handlers = []
+        self._evaluated_at = 0.0
+
+    def configure(self, byte_budget=None, read_budget=None, soft_limit=None, budget_ttl=None, max_ttl=None):
+        if byte_budget is not None:
+            self.byte_budget = byte_budget
+        if read_budget is not None:
+            self.read_budget = read_budget
+        if soft_limit is not None:
+            self.soft_limit = soft_limit
+        if budget_ttl is not None:
+            self.budget_ttl = budget_ttl
+        if max_ttl is not None:
+            self.max_ttl = max_ttl
+
+    def add_pressure_handler(self, handler):
+        """handler({path label: ttl}) is called when the budget TTLs change"""
+        if handler not in self._handlers:
+            self._handlers.append(handler)
+
+    def record(self, label, size, endpoint=None):
+        """Count one read of `size` bytes at a path label; the endpoint defaults to
+        the current request's"""
+        if endpoint is None:
+            endpoint = (request.endpoint or 'unmatched') if has_request_context() else 'background'
+        date = _today()
+        with self._lock:
+            day = self._days.get(date)
+            if day is None:
+                day = self._days[date] = {'paths': {}, 'endpoints': {}}
+                while len(self._days) > self.days:
+                    self._days.popitem(last=False)
+            _add(day['paths'], label, size)
+            _add(day['endpoints'], endpoint, size)
+        if (self.byte_budget or self.read_budget) and \
+                time.monotonic() - self._evaluated_at >= self.evaluate_interval:
+            self.evaluate()
+
+    def totals(self, date=None):
+        """(reads, bytes) for one day, today by default"""
+        with self._lock:
+            day = self._days.get(date or _today())
+            if day is None:
+                return 0, 0
+            return (sum(reads for reads, _ in day['paths'].values()),
+                    sum(size for _, size in day['paths'].values()))
+
+    def pressure(self):
+        """Share of today's budget used: the larger of bytes and reads, 0 without a budget"""
+        reads, size = self.totals()
+        return max(size / self.byte_budget if self.byte_budget else 0.0,
+                   reads / self.read_budget if self.read_budget else 0.0)
+
+    def heaviest(self, date=None):
+        """Path labels making up `heavy_share` of a day's bytes, heaviest first"""
+        with self._lock:
+            day = self._days.get(date or _today())
+            paths = sorted(day['paths'].items(), key=lambda item: item[1][1], reverse=True) if day else []
+        total = sum(size for _, (_, size) in paths)
+        heavy, covered = [], 0
+        for label, (_, size) in paths:
+            if covered >= total * self.heavy_share or not size:
+                break
+            heavy.append(label)
+            covered += size
+        return heavy
+
+    def evaluate(self):
+        """Recompute the budget TTLs and notify the pressure handlers of any change"""
+        self._evaluated_at = time.monotonic()
+        pressure = self.pressure()
+        overrides = {}
+        if pressure >= self.soft_limit and (self.byte_budget or self.read_budget):
+            steps = int((pressure - self.soft_limit) * 10 + 1e-9)
+            ttl = min(self.max_ttl, self.budget_ttl * 2 ** steps)
+            overrides = {label: ttl for label in self.heaviest()}
+        if overrides == self.ttl_overrides:
+            return overrides
+        if overrides:
+            logger.warning("Firebase budget %.0f%% used; caching %s for %g s",
+                           pressure * 100, ', '.join(overrides), next(iter(overrides.values())))
+        else:
+            logger.info("Firebase budget pressure cleared")
+        self.ttl_overrides = overrides
+        for handler in self._handlers:
+            try:
+                handler(dict(overrides))
+            except Exception as e:
+                logger.exception("Error applying budget TTLs: %s", e)
+        return overrides
+
+    def report(self, days=1):
+        """Per-day totals and breakdowns, newest first"""
+        with self._lock:
+            dates = list(self._days)[-days:][::-1]
+            report = [{'date': date,
+                       'reads': sum(reads for reads, _ in self._days[date]['paths'].values()),
+                       'bytes': sum(size for _, size in self._days[date]['paths'].values()),
+                       'paths': _rows(self._days[date]['paths']),
+                       'endpoints': _rows(self._days[date]['endpoints'])}
+                      for date in dates]
+        return report
+
+    def budget(self):
+        return {'bytes_per_day': self.byte_budget, 'reads_per_day': self.read_budget,
+                'used': round(self.pressure(), 4), 'soft_limit': self.soft_limit,
+                'ttl_overrides': dict(self.ttl_overrides)}
+
+
+usage_ledger = UsageLedger()
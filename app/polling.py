@@ -0,0 +1,104 @@
+from collections import OrderedDict
+import threading
+import time
+import zlib
+
+from app.admission import concurrency_limiter
+from app.monitoring.usage import usage_ledger
+
+
+class _Series:
+    __slots__ = ('crc', 'first_seen', 'last_change', 'mean_gap')
+
+    def __init__(self, crc, now):
+        self.crc = crc
+        self.first_seen = now
+        self.last_change = now
+        self.mean_gap = None
+
+
+class PollAdvisor:
+    """Recommends how long a client should wait before polling an API URL again.
+
+    Each response body is checksummed; the advisor keeps a moving average of
+    the time between changes per URL and suggests half of it (or half the
+    time since the last change, if that is longer), so quiet data is polled
+    rarely. URLs it has never seen change get at least `default` seconds.
+    The suggestion is stretched while the server is busy or the Firebase
+    budget is running out; see load_factor().
+    """
+
+    def __init__(self, default=30.0, minimum=30.0, maximum=300.0, smoothing=0.3, max_urls=2000):
+        self.default = default
+        self.minimum = minimum
+        self.maximum = maximum
+        self.smoothing = smoothing
+        self.max_urls = max_urls
+        self._lock = threading.Lock()
+        self._series = OrderedDict()
+
+    def configure(self, default=None, minimum=None, maximum=None):
+        if default is not None:
+            self.default = default
+        if minimum is not None:
+            self.minimum = minimum
+        if maximum is not None:
+            self.maximum = maximum
+
+    def observe(self, url, body):
+        """Record the body served for url; returns the recommended interval in seconds"""
+        crc = zlib.crc32(body)
+        now = time.monotonic()
+        with self._lock:
+            series = self._series.get(url)
+            if series is None:
+                series = self._series[url] = _Series(crc, now)
+                if len(self._series) > self.max_urls:
+                    self._series.popitem(last=False)
+            else:
+                self._series.move_to_end(url)
+                if crc != series.crc:
+                    gap = now - series.last_change
+                    series.mean_gap = gap if series.mean_gap is None else \
+                        self.smoothing * gap + (1 - self.smoothing) * series.mean_gap
+                    series.crc = crc
+                    series.last_change = now
+            quiet = now - series.last_change
+            if series.mean_gap is None:
+                interval = max(self.default, quiet / 2)
+            else:
+                interval = max(series.mean_gap, quiet) / 2
+        return min(self.maximum, max(self.minimum, interval * self.load_factor()))
+
+    @staticmethod
+    def utilization():
+        """Share of the API concurrency limit in use (0 when unlimited)"""
+        info = concurrency_limiter.info()
+        if not info['limit']:
+            return 0.0
+        return (info['active'] + info['waiting']) / info['limit']
+
+    def load_factor(self):
+        """1 when idle, up to 4 as the API concurrency limit fills; doubled once
+        the Firebase budget passes its soft limit"""
+        factor = 1 + 3 * min(1.0, self.utilization())
+        if (usage_ledger.byte_budget or usage_ledger.read_budget) and \
+                usage_ledger.pressure() >= usage_ledger.soft_limit:
+            factor *= 2
+        return factor
+
+    def __len__(self):
+        with self._lock:
+            return len(self._series)
+
+
+poll_advisor = PollAdvisor()
+
+
+def add_poll_headers(response, url, busy_threshold=0.75):
+    """X-Poll-Interval on a successful JSON response, plus Retry-After while the server is busy"""
+    seconds = str(max(1, int(round(poll_advisor.observe(url, response.get_data())))))
+    response.headers['X-Poll-Interval'] = seconds
+    if poll_advisor.utilization() >= busy_threshold:
+        response.headers['Retry-After'] = seconds
+    return response
@@ -1,7 +1,20 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint, Response, jsonify, request
+import logging
 from app.firebase.firebase_client import FirebaseClient
+from app.firebase.appliance_commands import appliance_commands
+from app.firebase.change_feed import change_feed, format_event
+from app.polling import add_poll_headers
 
 api = Blueprint('api', __name__)
+logger = logging.getLogger(__name__)
+
+@api.after_request
+def advise_polling(response):
+    """Tell polling pages when to come back: X-Poll-Interval, and Retry-After when busy"""
+    if request.method == 'GET' and response.status_code == 200 and not response.is_streamed \
+            and response.mimetype == 'application/json':
+        add_poll_headers(response, request.full_path)
+    return response
 
 @api.route('/battery')
 def get_battery():
@@ -15,11 +28,41 @@ def get_grid():
     grid_data = FirebaseClient.get_grid_info()
     return jsonify(grid_data)
 
+# Page size bounds for /api/notifications
+NOTIFICATIONS_PAGE_SIZE = 20
+NOTIFICATIONS_MAX_PAGE_SIZE = 100
+
 @api.route('/notifications')
 def get_notifications():
-    """API endpoint for notifications"""
-    notifications = FirebaseClient.get_notifications()
-    return jsonify(notifications)
+    """API endpoint for notifications, paginated newest first via ?limit=&before="""
+    limit = request.args.get('limit', NOTIFICATIONS_PAGE_SIZE, type=int)
+    limit = max(1, min(limit, NOTIFICATIONS_MAX_PAGE_SIZE))
+    before = request.args.get('before') or None
+    
+    notifications, next_before = FirebaseClient.get_notifications(limit=limit, before=before)
+    return jsonify({
+        "notifications": notifications,
+        "next_before": next_before,
+        "unread_count": FirebaseClient.get_unread_count()
+    })
+
+@api.route('/notifications/<notification_id>/read', methods=['POST', 'DELETE'])
+def mark_notification_read(notification_id):
+    """API endpoint to mark a notification read (POST) or unread (DELETE)"""
+    read = request.method == 'POST'
+    if not FirebaseClient.mark_notification_read(notification_id, read=read):
+        return jsonify({"error": "Notification not found"}), 404
+    return jsonify({
+        "id": notification_id,
+        "read": read,
+        "unread_count": FirebaseClient.get_unread_count()
+    })
+
+@api.route('/building')
+def get_building():
+    """API endpoint for building-wide totals"""
+    building_totals = FirebaseClient.get_building_totals()
+    return jsonify(building_totals)
 
 @api.route('/floors')
 def get_floors():
@@ -27,10 +70,10 @@ def get_floors():
     try:
         # Get floors data from Firebase
         floors_data = FirebaseClient.get_floors()
-        print(f"API returning {len(floors_data)} floors")
+        logger.debug("API returning %d floors", len(floors_data))
         return jsonify(floors_data)
     except Exception as e:
-        print(f"Error in API get_floors: {str(e)}")
+        logger.exception("Error in API get_floors: %s", e)
         # Return mock data as fallback
         all_floors = [
             {"id": "floor1", "name": "First Floor", "consumption": 120, "status": "optimal"},
@@ -45,10 +88,10 @@ def get_floor(floor_id):
     try:
         # Get floor data from Firebase
         floor_data = FirebaseClient.get_floor(floor_id)
-        print(f"API returning floor data for {floor_id}")
+        logger.debug("API returning floor data for %s", floor_id)
         return jsonify(floor_data)
     except Exception as e:
-        print(f"Error in API get_floor: {str(e)}")
+        logger.exception("Error in API get_floor: %s", e)
         # Determine status based on floor_id as fallback
         status = "optimal"
         if floor_id == "floor2":
@@ -70,8 +113,95 @@ def get_floor(floor_id):
         }
         return jsonify(floor_data)
 
+@api.route('/room/<room_id>')
+def get_room(room_id):
+    """API endpoint for one room and its appliances; ?floor= disambiguates room ids"""
+    room_data = FirebaseClient.get_room(room_id, request.args.get('floor'))
+    if room_data is None:
+        return jsonify({"error": "Room not found"}), 404
+    return jsonify(room_data)
+
+APPLIANCE_STATES = ('on', 'off')
+
+@api.route('/toggle-appliance', methods=['POST'])
+def toggle_appliance():
+    """API endpoint to switch one appliance on or off; acknowledged asynchronously"""
+    payload = request.get_json(silent=True) or {}
+    appliance_id = payload.get('appliance_id')
+    state = str(payload.get('state', '')).lower()
+    if not appliance_id or state not in APPLIANCE_STATES:
+        return jsonify({"error": "appliance_id and state ('on' or 'off') are required"}), 400
+    
+    ack = FirebaseClient.set_appliance_state(appliance_id, state,
+                                             room_id=payload.get('room_id'),
+                                             floor_id=payload.get('floor_id'))
+    if ack is None:
+        return jsonify({"error": "Appliance not found"}), 404
+    return jsonify(ack), 202
+
+@api.route('/floor/<floor_id>/appliances', methods=['POST'])
+def set_floor_appliances(floor_id):
+    """API endpoint to switch every (matching) appliance on a floor in one write"""
+    payload = request.get_json(silent=True) or {}
+    state = str(payload.get('state', '')).lower()
+    if state not in APPLIANCE_STATES:
+        return jsonify({"error": "state ('on' or 'off') is required"}), 400
+    
+    acks = FirebaseClient.set_floor_appliances(floor_id, state, name=payload.get('name'))
+    return jsonify({
+        "floor_id": floor_id,
+        "state": state,
+        "commands": [ack['id'] for ack in acks]
+    }), 202
+
+@api.route('/commands/<command_id>')
+def get_command(command_id):
+    """API endpoint to poll the acknowledgement of a queued appliance command.
+
+    Acks are held by the worker that queued the command (for the last 1000
+    commands), so with several workers this answers 404 when the poll lands
+    on another one; clients should treat that as "unknown", not "failed".
+    """
+    ack = appliance_commands.status(command_id)
+    if ack is None:
+        return jsonify({"error": "Unknown command (acks are kept by the worker that queued it)"}), 404
+    return jsonify(ack)
+
 @api.route('/visitors')
 def get_visitors():
     """API endpoint for visitors information"""
     visitors_data = FirebaseClient.get_visitors()
     return jsonify(visitors_data)
+
+@api.route('/occupancy')
+def get_occupancy():
+    """API endpoint for the number of people in each room"""
+    location_dict = FirebaseClient.get_people_by_location()
+    return jsonify({
+        'rooms': {loc: len(users) for loc, users in location_dict.items()},
+        'total': sum(len(users) for users in location_dict.values())
+    })
+
+# Seconds between keepalive comments on idle event streams
+STREAM_KEEPALIVE = 15
+
+@api.route('/stream')
+def stream():
+    """Server-sent events, one per mirror change; under a threaded server each
+    open stream holds a thread (asgi.py serves this natively instead)"""
+    if not request.environ.get('wsgi.multithread'):
+        # On a single-threaded worker one open stream would block every other request
+        return jsonify({"error": "Streaming needs a threaded server; poll instead"}), 503
+    subscription = change_feed.subscribe()
+
+    def events():
+        try:
+            yield 'retry: 5000\n\n'
+            while True:
+                event = subscription.get(timeout=STREAM_KEEPALIVE)
+                yield format_event(event) if event else ': keepalive\n\n'
+        finally:
+            subscription.close()
+
+    return Response(events(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
@@ -1,8 +1,9 @@
 from flask import Blueprint, render_template
-import traceback
+import logging
 from app.firebase.firebase_client import FirebaseClient
 
 battery = Blueprint('battery', __name__)
+logger = logging.getLogger(__name__)
 
 @battery.route('/info')
 def info():
@@ -15,8 +16,7 @@ def info():
                               back_url="/",
                               battery=battery_data)
     except Exception as e:
-        print(f"Error in battery info route: {e}")
-        traceback.print_exc()
+        logger.exception("Error in battery info route: %s", e)
         return render_template('error.html',
                               page_title="Error",
                               error_message=str(e),
@@ -50,8 +50,7 @@ def grid():
                               back_url="/battery/info",
                               grid=grid_data)
     except Exception as e:
-        print(f"Error in grid route: {e}")
-        traceback.print_exc()
+        logger.exception("Error in grid route: %s", e)
         return render_template('error.html',
                               page_title="Error",
                               error_message=str(e),
@@ -1,17 +1,24 @@
 from flask import Blueprint, render_template, jsonify, make_response
-import traceback
+import logging
 import json
 from app.firebase.firebase_client import FirebaseClient
+from app.images import serve_variant
 
 main = Blueprint('main', __name__)
+logger = logging.getLogger(__name__)
 
-from flask import redirect, url_for
+from flask import redirect, url_for, request
 
 @main.route('/grid')
 def grid_redirect():
     """Redirect /grid to /battery/grid for compatibility with back button and direct URL."""
     return redirect(url_for('battery.grid'))
 
+@main.route('/img/<int:width>/<path:filename>')
+def image_variant(width, filename):
+    """A static image (floor plans, building section) as WebP, resized to a width bucket"""
+    return serve_variant(width, filename)
+
 @main.route('/debug')
 def debug():
     """Debug route to show raw data"""
@@ -47,8 +54,7 @@ def ajax_index():
         
         return response
     except Exception as e:
-        print(f"Error in AJAX index route: {e}")
-        traceback.print_exc()
+        logger.exception("Error in AJAX index route: %s", e)
         return jsonify({"error": str(e)})
 
 @main.route('/simple')
@@ -63,9 +69,7 @@ def simple_index():
             'total': sum(len(users) for users in location_dict.values())
         }
         
-        # Print debug info
-        print("\nSimple Index - Battery Info:")
-        print(battery_info)
+        logger.debug("Simple index battery info: %s", battery_info)
         
         # Ensure we have all required fields with default values
         if 'percentage' not in battery_info:
@@ -89,8 +93,7 @@ def simple_index():
         
         return response
     except Exception as e:
-        print(f"Error in simple index route: {e}")
-        traceback.print_exc()
+        logger.exception("Error in simple index route: %s", e)
         return jsonify({"error": str(e)})
 
 @main.route('/data')
@@ -131,78 +134,27 @@ def index():
             'total': sum(len(users) for users in location_dict.values())
         }
         
-        # Debug logging
-        print("\nBattery Info in index route:")
-        print(f"Type: {type(battery_info)}")
-        print(f"Content: {battery_info}")
-        print(f"Keys: {battery_info.keys() if isinstance(battery_info, dict) else 'Not a dict'}")
-        
         # Add fallback values if needed
         if isinstance(battery_info, dict) and 'percentage' not in battery_info:
-            print("Adding percentage to battery_info")
             battery_info['percentage'] = 75
         
         if isinstance(battery_info, dict) and 'current_power' not in battery_info:
-            print("Adding current_power to battery_info")
             battery_info['current_power'] = 3.2
             
         if isinstance(battery_info, dict) and 'charging_rate' not in battery_info:
-            print("Adding charging_rate to battery_info")
             battery_info['charging_rate'] = 2.5
             
         if isinstance(battery_info, dict) and 'discharging_rate' not in battery_info:
-            print("Adding discharging_rate to battery_info")
             battery_info['discharging_rate'] = 1.8
         
-        print("\nUpdated Battery Info:")
-        print(battery_info)
-        
-        print("\nVisitors Info in index route:")
-        print(visitors_info)
-        
-        # Add console logging for debugging
-        print("\nRendering index.html with the following data:")
-        print(f"Battery: {battery_info}")
-        print(f"Visitors: {visitors_info}")
-        
-        # Get floor data from API
-        import requests
-        try:
-            # Make a request to our own API endpoint
-            api_response = requests.get('http://localhost:5004/api/floors')
-            if api_response.status_code == 200:
-                all_floors = api_response.json()
-            else:
-                # Fallback to default data if API request fails
-                print(f"API request failed with status code: {api_response.status_code}")
-                all_floors = [
-                    {"id": "floor1", "name": "First Floor", "consumption": 12, "status": "optimal"},
-                    {"id": "floor2", "name": "Second Floor", "consumption": 15, "status": "sub-optimal"},
-                    {"id": "floor3", "name": "Third Floor", "consumption": 2.2, "status": "critical"}
-                ]
-        except Exception as api_error:
-            print(f"Error fetching floor data from API: {api_error}")
-            # Fallback to default data
-            all_floors = [
-                {"id": "floor1", "name": "First Floor", "consumption": 12, "status": "optimal"},
-                {"id": "floor2", "name": "Second Floor", "consumption": 15, "status": "sub-optimal"},
-                {"id": "floor3", "name": "Third Floor", "consumption": 2.2, "status": "critical"}
-            ]
+        logger.debug("Index battery: %s, visitors: %s", battery_info, visitors_info)
         
-        # Count floors by status
-        floor_status_counts = {
-            "optimal": 0,
-            "sub-optimal": 0,
-            "critical": 0
-        }
-        
-        for floor in all_floors:
-            if floor["status"] in floor_status_counts:
-                floor_status_counts[floor["status"]] += 1
+        # Floors list plus building totals maintained by the data layer
+        all_floors = FirebaseClient.get_floors()
+        building_totals = FirebaseClient.get_building_totals(floors=all_floors, locations=location_dict)
+        floor_status_counts = building_totals['floor_status_counts']
                 
-        print("\nFloor data:")
-        print(f"Floors: {all_floors}")
-        print(f"Status counts: {floor_status_counts}")
+        logger.debug("Index floors: %s, status counts: %s", all_floors, floor_status_counts)
         
         # Force the browser to not cache this page
         from flask import make_response
@@ -211,7 +163,8 @@ def index():
                               battery=battery_info,
                               visitors=visitors_info,
                               floors=all_floors,
-                              floor_status_counts=floor_status_counts))
+                              floor_status_counts=floor_status_counts,
+                              building_totals=building_totals))
         
         # Add no-cache headers to prevent caching
         response.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate, max-age=0'
@@ -220,8 +173,7 @@ def index():
         
         return response
     except Exception as e:
-        print(f"Error in index route: {e}")
-        traceback.print_exc()
+        logger.exception("Error in index route: %s", e)
         return render_template('error.html',
                               page_title="Error",
                               error_message=str(e),
@@ -266,8 +218,7 @@ def notifications():
                               back_url="/",
                               notifications=notifications_data)
     except Exception as e:
-        print(f"Error in notifications route: {e}")
-        traceback.print_exc()
+        logger.exception("Error in notifications route: %s", e)
         return render_template('error.html',
                               page_title="Error",
                               error_message=str(e),
@@ -277,37 +228,14 @@ def notifications():
 def floors():
     """All floors overview page"""
     try:
-        # Fetch floor data from API
-        import requests
-        try:
-            # Make a request to our own API endpoint
-            response = requests.get('http://localhost:5004/api/floors')
-            if response.status_code == 200:
-                all_floors = response.json()
-            else:
-                # Fallback to default data if API request fails
-                print(f"API request failed with status code: {response.status_code}")
-                all_floors = [
-                    {"id": "floor1", "name": "First Floor", "consumption": 12, "status": "optimal"},
-                    {"id": "floor2", "name": "Second Floor", "consumption": 15, "status": "sub-optimal"},
-                    {"id": "floor3", "name": "Third Floor", "consumption": 2.2, "status": "critical"}
-                ]
-        except Exception as api_error:
-            print(f"Error fetching floor data from API: {api_error}")
-            # Fallback to default data
-            all_floors = [
-                {"id": "floor1", "name": "First Floor", "consumption": 12, "status": "optimal"},
-                {"id": "floor2", "name": "Second Floor", "consumption": 15, "status": "sub-optimal"},
-                {"id": "floor3", "name": "Third Floor", "consumption": 2.2, "status": "critical"}
-            ]
+        all_floors = FirebaseClient.get_floors()
         
         return render_template('floors.html',
                               page_title="Floors",
                               back_url="/",
                               floors=all_floors)
     except Exception as e:
-        print(f"Error in floors route: {e}")
-        traceback.print_exc()
+        logger.exception("Error in floors route: %s", e)
         return render_template('error.html',
                               page_title="Error",
                               error_message=str(e),
@@ -317,55 +245,7 @@ def floors():
 def floor_detail(floor_id):
     """Floor detail page"""
     try:
-        # Fetch floor data from API
-        import requests
-        try:
-            # Make a request to our own API endpoint
-            response = requests.get(f'http://localhost:5004/api/floor/{floor_id}')
-            rooms = floor_data.get('rooms', [])
-            if response.status_code == 200:
-                floor_data = response.json()
-            else:
-                # Fallback to default data if API request fails
-                print(f"API request failed with status code: {response.status_code}")
-                # Determine status based on floor_id
-                status = "optimal"
-                if floor_id == "floor2":
-                    status = "sub-optimal"
-                elif floor_id == "floor3":
-                    status = "critical"
-                
-                floor_data = {
-                    "id": floor_id,
-                    "name": f"Floor {floor_id.replace('floor', '')}",
-                    "consumption": 12,
-                    "status": status,
-                    "rooms": [
-                        {"id": "room1", "name": "Living Room", "consumption": 2125, "status": "optimal"},
-                        {"id": "room2", "name": "Kitchen", "consumption": 3000, "status": "sub-optimal"},
-                        {"id": "room3", "name": "Office", "consumption": 2000, "status": "critical"}
-                    ]
-                }
-        except Exception as api_error:
-            print(f"Error fetching floor data from API: {api_error}")
-            # Fallback to default data
-            status = "optimal"
-            if floor_id == "floor2":
-                status = "sub-optimal"
-            elif floor_id == "floor3":
-                status = "critical"
-            
-            floor_data = {
-                "id": floor_id,
-                "name": f"Floor {floor_id.replace('floor', '')}",
-                "consumption": 12,
-                "status": status,
-                "rooms": [
-                    {"id": "room1", "name": "Living Room", "consumption": 2125, "status": "optimal"},
-                    {"id": "room2", "name": "Kitchen", "consumption": 3000, "status": "sub-optimal"},
-                    {"id": "room3", "name": "Office", "consumption": 2000, "status": "critical"}
-                ]
-            }
+        floor_data = FirebaseClient.get_floor(floor_id)
         
         rooms = floor_data.get('rooms', [])
         return render_template('floor_detail.html',
@@ -375,8 +255,7 @@ def floor_detail(floor_id):
                             rooms=rooms,
                             floor_plan_image=f"images/floor_{floor_data['id']}_plan.png")
     except Exception as e:
-        print(f"Error in floor_detail route: {e}")
-        traceback.print_exc()
+        logger.exception("Error in floor_detail route: %s", e)
         return render_template('error.html',
                             page_title="Error",
                             error_message=str(e),
@@ -384,64 +263,45 @@ def floor_detail(floor_id):
 
 @main.route('/room/<room_id>')
 def room_detail(room_id):
-    # Example: static room data (replace with DB or session lookup as needed)
-    all_rooms = [
-        {"id": "room1", "name": "Living Room", "consumption": 2125, "status": "optimal"},
-        {"id": "room2", "name": "Kitchen", "consumption": 3000, "status": "sub-optimal"},
-        {"id": "room3", "name": "Office", "consumption": 2000, "status": "critical"}
-    ]
-    room = next((r for r in all_rooms if r["id"] == room_id), None)
-    if not room:
-        return render_template('error.html', error_message="Room not found", back_url="/floors")
-    return render_template('room_detail.html', room=room)
+    """Room detail page"""
+    try:
+        room_data = FirebaseClient.get_room(room_id, request.args.get('floor'))
+        if not room_data:
+            return render_template('error.html', error_message="Room not found", back_url="/floors")
+        
+        room = room_data['room']
+        back_url = f"/floor/{room['floor_id']}" if room.get('floor_id') else "/floors"
+        return render_template('room_detail.html',
+                              page_title=room['name'],
+                              back_url=back_url,
+                              room=room,
+                              appliances=room_data['appliances'])
+    except Exception as e:
+        logger.exception("Error in room_detail route: %s", e)
+        return render_template('error.html',
+                              page_title="Error",
+                              error_message=str(e),
+                              back_url="/floors")
 
 @main.route('/rooms')
 def rooms():
     """All rooms overview page"""
     try:
-        # Collect all rooms from all floors via the API
-        import requests
-        try:
-            # First get all floors
-            response = requests.get('http://localhost:5004/api/floors')
-            if response.status_code == 200:
-                all_floors = response.json()
-                
-                # Now get rooms from each floor
-                all_rooms = []
-                for floor in all_floors:
-                    floor_response = requests.get(f'http://localhost:5004/api/floor/{floor["id"]}')
-                    if floor_response.status_code == 200:
-                        floor_data = floor_response.json()
-                        if 'rooms' in floor_data:
-                            # Add floor info to each room
-                            for room in floor_data['rooms']:
-                                room['floor_id'] = floor['id']
-                                room['floor_name'] = floor['name']
-                                all_rooms.append(room)
-            else:
-                # Fallback to default data if API request fails
-                all_rooms = [
-                    {"id": "room1", "name": "Living Room", "consumption": 2125, "status": "optimal", "floor_id": "floor1", "floor_name": "First Floor"},
-                    {"id": "room2", "name": "Kitchen", "consumption": 3000, "status": "sub-optimal", "floor_id": "floor1", "floor_name": "First Floor"},
-                    {"id": "room3", "name": "Office", "consumption": 2000, "status": "critical", "floor_id": "floor2", "floor_name": "Second Floor"}
-                ]
-        except Exception as api_error:
-            print(f"Error fetching room data from API: {api_error}")
-            # Fallback to default data
-            all_rooms = [
-                {"id": "room1", "name": "Living Room", "consumption": 2125, "status": "optimal", "floor_id": "floor1", "floor_name": "First Floor"},
-                {"id": "room2", "name": "Kitchen", "consumption": 3000, "status": "sub-optimal", "floor_id": "floor1", "floor_name": "First Floor"},
-                {"id": "room3", "name": "Office", "consumption": 2000, "status": "critical", "floor_id": "floor2", "floor_name": "Second Floor"}
-            ]
+        # Collect all rooms from all floors
+        all_rooms = []
+        for floor in FirebaseClient.get_floors():
+            floor_data = FirebaseClient.get_floor(floor['id'])
+            for room in floor_data.get('rooms', []):
+                room['floor_id'] = floor['id']
+                room['floor_name'] = floor['name']
+                all_rooms.append(room)
         
         return render_template('rooms.html',
                               page_title="Rooms",
                               back_url="/",
                               rooms=all_rooms)
     except Exception as e:
-        print(f"Error in rooms route: {e}")
-        traceback.print_exc()
+        logger.exception("Error in rooms route: %s", e)
         return render_template('error.html',
                               page_title="Error",
                               error_message=str(e),
@@ -0,0 +1,141 @@
+from flask import Blueprint, Response, abort, current_app, jsonify, request
+from functools import wraps
+import hmac
+from app.admission import concurrency_limiter
+from app.firebase import FirebaseStatus, firebase_status
+from app.firebase.leader import listener_election
+from app.firebase.listeners import mirrors
+from app.firebase.resilience import read_guard
+from app.firebase.shared_snapshot import shared_reader
+from app.firebase.snapshot import snapshot_cache
+from app.monitoring import metrics, tracing
+from app.monitoring.startup import startup_timer
+from app.monitoring.profiler import request_profiler
+from app.monitoring.memory import memory_tracker, model_sizes
+from app.monitoring.usage import usage_ledger
+
+monitoring = Blueprint('monitoring', __name__)
+
+def debug_access_required(view):
+    """Allow a /debug view with a matching DEBUG_TOKEN (X-Debug-Token header or
+    ?token=), or freely in debug mode when no token is configured"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        token = current_app.config.get('DEBUG_TOKEN')
+        if token:
+            supplied = request.headers.get('X-Debug-Token') or request.args.get('token') or ''
+            if not hmac.compare_digest(supplied.encode(), token.encode()):
+                abort(404)
+        elif not current_app.debug:
+            abort(404)
+        return view(*args, **kwargs)
+    return wrapper
+
+@monitoring.route('/ready')
+def readiness():
+    """Readiness probe: 503 until Firebase initialization has settled, plus startup timing"""
+    status = firebase_status.to_dict()
+    body = {
+        "firebase": status,
+        "mirrors": {name: mirror.ready for name, mirror in mirrors.items()},
+        "snapshot": snapshot_cache.info(),
+        "circuit": read_guard.breaker.to_dict(),
+        "shared_snapshot": shared_reader.info(),
+        "listener_leader": listener_election.info(),
+        "api_concurrency": concurrency_limiter.info(),
+        "startup_ms": startup_timer.report()
+    }
+    if status['state'] not in FirebaseStatus.SETTLED:
+        response = jsonify(dict(body, ready=False))
+        response.status_code = 503
+        response.headers['Retry-After'] = '1'
+        return response
+    return jsonify(dict(body, ready=True))
+
+@monitoring.route('/metrics')
+def prometheus_metrics():
+    """Prometheus scrape endpoint (text exposition format)"""
+    if not current_app.config.get('METRICS_ENABLED', True):
+        abort(404)
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+@monitoring.route('/debug/traces')
+@debug_access_required
+def recent_traces():
+    """Summaries of the most recent request traces, newest first"""
+    limit = max(1, min(request.args.get('limit', 50, type=int), tracing.trace_store.size))
+    return jsonify([
+        {key: value for key, value in trace.to_dict().items() if key not in ('calls', 'by_path')}
+        for trace in tracing.trace_store.recent(limit)
+    ])
+
+@monitoring.route('/debug/trace/<request_id>')
+@debug_access_required
+def request_trace(request_id):
+    """Every Firebase read made while serving one request (see its X-Request-ID header)"""
+    trace = tracing.trace_store.get(request_id)
+    if trace is None:
+        return jsonify({"error": "Unknown or expired request id"}), 404
+    return jsonify(trace.to_dict())
+
+@monitoring.route('/debug/profiles')
+@debug_access_required
+def recent_profiles():
+    """Summaries of the most recent request profiles, newest first"""
+    return jsonify([profile.summary() for profile in request_profiler.recent()])
+
+@monitoring.route('/debug/profiles/collapsed')
+@debug_access_required
+def all_profiles_collapsed():
+    """Every retained profile merged into one collapsed-stack flamegraph input"""
+    stacks = {}
+    for profile in request_profiler.recent():
+        for stack, count in profile.stacks.items():
+            stacks[stack] = stacks.get(stack, 0) + count
+    lines = '\n'.join(f"{stack} {count}" for stack, count in sorted(stacks.items(), key=lambda item: -item[1]))
+    return Response(lines + '\n', mimetype='text/plain')
+
+@monitoring.route('/debug/profile/<profile_id>')
+@debug_access_required
+def request_profile(profile_id):
+    """One request profile; ?format=collapsed returns flamegraph-ready stacks"""
+    profile = request_profiler.get(profile_id)
+    if profile is None:
+        return jsonify({"error": "Unknown or expired profile id"}), 404
+    if request.args.get('format') == 'collapsed':
+        return Response(profile.collapsed() + '\n', mimetype='text/plain')
+    return jsonify(dict(profile.summary(), stacks=dict(profile.stacks.most_common())))
+
+@monitoring.route('/debug/usage')
+@debug_access_required
+def firebase_usage():
+    """Firebase reads and bytes per day by path and endpoint (?days=, up to a week), and the budget"""
+    days = max(1, min(request.args.get('days', 1, type=int), usage_ledger.days))
+    return jsonify({"budget": usage_ledger.budget(), "days": usage_ledger.report(days)})
+
+# Longest /debug/memory/allocations window, in seconds
+MAX_ALLOCATION_WINDOW = 60
+
+@monitoring.route('/debug/memory')
+@debug_access_required
+def memory_report():
+    """Retained bytes per mirror/cache and model type, with growth since earlier samples"""
+    memory_tracker.ensure_sampling()
+    current = memory_tracker.sample()
+    return jsonify({
+        "current": current,
+        "models": model_sizes(),
+        "growth": memory_tracker.growth(),
+        "sample_interval": memory_tracker.interval
+    })
+
+@monitoring.route('/debug/memory/allocations')
+@debug_access_required
+def memory_allocations():
+    """Top allocation sites over a ?seconds= window of live traffic (tracemalloc)"""
+    seconds = max(0.1, min(request.args.get('seconds', 5, type=float), MAX_ALLOCATION_WINDOW))
+    limit = max(1, min(request.args.get('limit', 20, type=int), 200))
+    sites = memory_tracker.allocation_window(seconds, limit)
+    if sites is None:
+        return jsonify({"error": "Another allocation window is already running"}), 409
+    return jsonify({"seconds": seconds, "sites": sites})
@@ -13,11 +13,8 @@ document.addEventListener('DOMContentLoaded', function() {
 
 // Function to periodically update battery information
 function setupBatteryUpdates() {
-    // First update
-    updateBatteryInfo();
-    
-    // Then set interval for future updates (every 30 seconds)
-    setInterval(updateBatteryInfo, 30000);
+    // Update now, then as often as the server recommends (every 30 seconds until it says)
+    schedulePoll(updateBatteryInfo, 'battery', 30000);
 }
 
 // Function to fetch and update battery information
@@ -31,11 +31,8 @@ function getFloorIdFromUrl() {
 
 // Function to periodically update floor detail information
 function setupFloorDetailUpdates(floorId) {
-    // First update
-    updateFloorDetail(floorId);
-    
-    // Then set interval for future updates (every 30 seconds)
-    setInterval(() => updateFloorDetail(floorId), 30000);
+    // Update now, then as often as the server recommends (every 30 seconds until it says)
+    schedulePoll(() => updateFloorDetail(floorId), `floor/${floorId}`, 30000);
 }
 
 // Function to fetch and update floor detail information
@@ -7,11 +7,8 @@ document.addEventListener('DOMContentLoaded', function() {
 
 // Function to periodically update floors information
 function setupFloorsUpdates() {
-    // First update
-    updateFloorsInfo();
-    
-    // Then set interval for future updates (every 60 seconds)
-    setInterval(updateFloorsInfo, 60000);
+    // Update now, then as often as the server recommends (every 60 seconds until it says)
+    schedulePoll(updateFloorsInfo, 'floors', 60000);
 }
 
 // Function to fetch and update floors information
@@ -1,9 +1,29 @@
 // Main JavaScript functionality
 
+// Polling advice from the last response per endpoint (path without query string):
+// the server's X-Poll-Interval and Retry-After, in milliseconds
+const pollHints = {};
+
+// Longest wait between polls after repeated failures
+const MAX_POLL_BACKOFF = 10 * 60 * 1000;
+
+function recordPollHint(endpoint, response) {
+    const seconds = (name) => {
+        const value = parseFloat(response ? response.headers.get(name) : '');
+        return value > 0 ? value * 1000 : null;
+    };
+    pollHints[endpoint.split('?')[0]] = {
+        interval: seconds('X-Poll-Interval'),
+        retryAfter: seconds('Retry-After'),
+        failed: !response || !response.ok
+    };
+}
+
 // Helper function for making API requests
 async function fetchAPI(endpoint, options = {}) {
+    let response = null;
     try {
-        const response = await fetch(`/api/${endpoint}`, {
+        response = await fetch(`/api/${endpoint}`, {
             headers: {
                 'Content-Type': 'application/json',
                 'Accept': 'application/json'
@@ -19,9 +39,58 @@ async function fetchAPI(endpoint, options = {}) {
     } catch (error) {
         console.error(`Error fetching ${endpoint}:`, error);
         return { error: error.message };
+    } finally {
+        recordPollHint(endpoint, response);
     }
 }
 
+// Run update() now, then again whenever the server says `endpoint` is worth polling
+// (defaultMs until it has said). Failures back off exponentially, and polling pauses
+// while the tab is hidden, catching up as soon as it is visible again.
+function schedulePoll(update, endpoint, defaultMs) {
+    let timer = null;
+    let running = false;
+    let dueAt = 0;
+    let failures = 0;
+
+    async function run() {
+        timer = null;
+        if (document.hidden) {
+            return;
+        }
+        running = true;
+        try {
+            await update();
+        } finally {
+            running = false;
+        }
+
+        const hint = pollHints[endpoint.split('?')[0]] || {};
+        failures = hint.failed ? failures + 1 : 0;
+        let delay = Math.max(hint.interval || defaultMs, hint.retryAfter || 0);
+        if (failures) {
+            delay = Math.min(delay * 2 ** failures, MAX_POLL_BACKOFF);
+        }
+        // Spread kiosks that loaded together
+        delay *= 0.9 + Math.random() * 0.2;
+        dueAt = Date.now() + delay;
+        if (!document.hidden) {
+            timer = setTimeout(run, delay);
+        }
+    }
+
+    document.addEventListener('visibilitychange', () => {
+        if (document.hidden) {
+            clearTimeout(timer);
+            timer = null;
+        } else if (timer === null && !running) {
+            timer = setTimeout(run, Math.max(0, dueAt - Date.now()));
+        }
+    });
+
+    run();
+}
+
 // Format number with comma separators
 function formatNumber(num) {
     return num.toString().replace(/\B(?=(\d{3})+(?!\d))/g, ",");
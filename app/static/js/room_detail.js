@@ -31,17 +31,17 @@ function getRoomIdFromUrl() {
 
 // Function to periodically update room detail information
 function setupRoomDetailUpdates(roomId) {
-    // First update
-    updateRoomDetail(roomId);
-    
-    // Then set interval for future updates (every 30 seconds)
-    setInterval(() => updateRoomDetail(roomId), 30000);
+    // Update now, then as often as the server recommends (every 30 seconds until it says)
+    schedulePoll(() => updateRoomDetail(roomId), `room/${roomId}`, 30000);
 }
 
 // Function to fetch and update room detail information
 async function updateRoomDetail(roomId) {
     try {
-        const roomData = await fetchAPI(`room/${roomId}`);
+        // Room ids repeat across floors, so pass the floor along when we know it
+        const floorId = new URLSearchParams(window.location.search).get('floor');
+        const query = floorId ? `?floor=${encodeURIComponent(floorId)}` : '';
+        const roomData = await fetchAPI(`room/${roomId}${query}`);
         
         if (roomData.error) {
             console.error('Error fetching room data:', roomData.error);
@@ -155,11 +155,13 @@ function setupApplianceToggles() {
             const currentState = this.getAttribute('data-state');
             const newState = currentState === 'on' ? 'off' : 'on';
             
-            // Call API to toggle state
+            // Call API to toggle state; room and floor pin down which appliance
             fetchAPI('toggle-appliance', {
                 method: 'POST',
                 body: JSON.stringify({
                     appliance_id: id,
+                    room_id: getRoomIdFromUrl(),
+                    floor_id: new URLSearchParams(window.location.search).get('floor'),
                     state: newState
                 })
             }).then(data => {
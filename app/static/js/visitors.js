@@ -7,11 +7,8 @@ document.addEventListener('DOMContentLoaded', function() {
 
 // Function to periodically update visitor information
 function setupVisitorsUpdates() {
-    // First update
-    updateVisitorsInfo();
-    
-    // Then set interval for future updates (every 30 seconds)
-    setInterval(updateVisitorsInfo, 30000);
+    // Update now, then as often as the server recommends (every 30 seconds until it says)
+    schedulePoll(updateVisitorsInfo, 'visitors', 30000);
 }
 
 // Function to fetch and update visitor information
@@ -0,0 +1,6 @@
+# ASGI entry point: `uvicorn asgi:app`, or `gunicorn -k uvicorn.workers.UvicornWorker asgi:app`.
+# Push streams (/api/stream) run on the event loop; every other route is the Flask app from run.py.
+from app.asgi import create_asgi_app
+from run import app as flask_app
+
+app = create_asgi_app(flask_app)
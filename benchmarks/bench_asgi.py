@@ -0,0 +1,218 @@
+"""Compare the threaded WSGI server with ASGI mode while push streams are open.
+
+For each mode a server process is started on FakeDatabase with listener-fed
+mirrors, and a ticker changes the battery percentage every --tick seconds so
+every open /api/stream receives events. With N idle streams connected, the
+report shows /api/battery latency, events delivered per second (across all
+streams), and the server's thread count and resident memory.
+
+    python -m benchmarks.bench_asgi --streams 0,100,500
+    python -m benchmarks.bench_asgi --modes asgi --streams 2000 --requests 500
+
+ASGI mode needs uvicorn (in requirements.txt).
+"""
+import argparse
+from contextlib import redirect_stderr, redirect_stdout
+import json
+import logging
+import os
+import selectors
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+
+from benchmarks.bench_routes import create_benchmark_app, percentile
+from benchmarks.fake_firebase import FakeDatabase
+from benchmarks.synthetic_building import generate_building
+
+MODES = ('threaded', 'asgi')
+
+
+def serve(mode, port, tick):
+    """Server process: the app on FakeDatabase, with the battery changing every `tick` seconds"""
+    fake = FakeDatabase(generate_building(floors=3, rooms_per_floor=4, people=20, notifications=50))
+    with fake.installed():
+        app = create_benchmark_app(fake, live=True)
+        app.config['TESTING'] = False
+
+        def ticker():
+            reference = fake.reference('/energy_dashboard/battery/percentage')
+            while True:
+                time.sleep(tick)
+                reference.set((reference.get() + 1) % 100)
+
+        threading.Thread(target=ticker, name='bench-ticker', daemon=True).start()
+        with open(os.devnull, 'w') as devnull, redirect_stdout(devnull), redirect_stderr(devnull):
+            if mode == 'asgi':
+                import uvicorn
+                from app.asgi import create_asgi_app
+                uvicorn.run(create_asgi_app(app), host='127.0.0.1', port=port, log_level='error',
+                            lifespan='on', timeout_keep_alive=60)
+            else:
+                from werkzeug.serving import make_server
+                logging.getLogger('werkzeug').setLevel(logging.ERROR)
+                make_server('127.0.0.1', port, app, threaded=True).serve_forever()
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def process_stats(pid):
+    """(threads, resident MiB) of a process, from /proc"""
+    threads = rss = 0
+    with open(f'/proc/{pid}/status') as f:
+        for line in f:
+            if line.startswith('Threads:'):
+                threads = int(line.split()[1])
+            elif line.startswith('VmRSS:'):
+                rss = int(line.split()[1]) / 1024.0
+    return threads, rss
+
+
+def wait_ready(base_url, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f'{base_url}/api/battery', timeout=2) as response:
+                response.read()
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"server at {base_url} did not come up")
+
+
+class StreamClients:
+    """N raw /api/stream connections drained by one selector thread, counting events"""
+
+    def __init__(self, port, count):
+        self.events = 0
+        self.sockets = []
+        self.selector = selectors.DefaultSelector()
+        self._stop = False
+        request = f'GET /api/stream HTTP/1.1\r\nHost: 127.0.0.1:{port}\r\nAccept: text/event-stream\r\n\r\n'.encode()
+        for _ in range(count):
+            sock = socket.create_connection(('127.0.0.1', port))
+            sock.sendall(request)
+            sock.setblocking(False)
+            self.selector.register(sock, selectors.EVENT_READ)
+            self.sockets.append(sock)
+        self._thread = threading.Thread(target=self._drain, name='bench-streams', daemon=True)
+        self._thread.start()
+
+    def _drain(self):
+        while not self._stop:
+            for key, _ in self.selector.select(timeout=0.2):
+                try:
+                    data = key.fileobj.recv(65536)
+                except BlockingIOError:
+                    continue
+                except OSError:
+                    data = b''
+                if not data:
+                    self.selector.unregister(key.fileobj)
+                    continue
+                self.events += data.count(b'\nevent: ') + data.startswith(b'event: ')
+
+    def close(self):
+        self._stop = True
+        self._thread.join()
+        for sock in self.sockets:
+            sock.close()
+
+
+def measure(mode, streams, requests, tick):
+    port = free_port()
+    server = subprocess.Popen([sys.executable, '-m', 'benchmarks.bench_asgi', '--serve', mode,
+                               '--port', str(port), '--tick', str(tick)])
+    base_url = f'http://127.0.0.1:{port}'
+    clients = None
+    try:
+        wait_ready(base_url)
+        clients = StreamClients(port, streams)
+        events_before, start = clients.events, time.monotonic()
+        time.sleep(max(2.0, tick * 4))       # events flowing to every stream
+        threads, rss = process_stats(server.pid)
+
+        latencies, errors = [], 0
+        for _ in range(requests):
+            started = time.perf_counter()
+            try:
+                with urllib.request.urlopen(f'{base_url}/api/battery', timeout=10) as response:
+                    response.read()
+            except OSError:
+                errors += 1
+            latencies.append((time.perf_counter() - started) * 1000)
+        elapsed = time.monotonic() - start
+        events = clients.events - events_before
+    finally:
+        if clients is not None:
+            clients.close()
+        server.terminate()
+        server.wait(timeout=10)
+
+    return {
+        'mode': mode,
+        'streams': streams,
+        'server_threads': threads,
+        'server_rss_mib': round(rss, 1),
+        'p50_ms': round(percentile(latencies, 50), 2),
+        'p95_ms': round(percentile(latencies, 95), 2),
+        'errors': errors,
+        'events_per_second': round(events / elapsed, 1) if elapsed else 0.0,
+    }
+
+
+def print_report(results):
+    header = (f"{'mode':>9} {'streams':>8} {'threads':>8} {'RSS MiB':>8} "
+              f"{'p50 ms':>8} {'p95 ms':>8} {'errors':>7} {'events/s':>9}")
+    print(header)
+    print('-' * len(header))
+    for result in results:
+        print(f"{result['mode']:>9} {result['streams']:>8} {result['server_threads']:>8} "
+              f"{result['server_rss_mib']:>8.1f} {result['p50_ms']:>8.2f} {result['p95_ms']:>8.2f} "
+              f"{result['errors']:>7} {result['events_per_second']:>9.1f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--modes', default=','.join(MODES), help='comma-separated: threaded, asgi')
+    parser.add_argument('--streams', default='0,100,500', help='comma-separated counts of open event streams')
+    parser.add_argument('--requests', type=int, default=200, help='/api/battery requests per measurement')
+    parser.add_argument('--tick', type=float, default=0.5, help='seconds between battery changes')
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    parser.add_argument('--serve', choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument('--port', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.serve:
+        serve(args.serve, args.port, args.tick)
+        return 0
+
+    modes = args.modes.split(',')
+    if 'asgi' in modes:
+        try:
+            import uvicorn  # noqa: F401
+        except ImportError:
+            print("ASGI mode needs uvicorn: pip install uvicorn", file=sys.stderr)
+            return 1
+
+    results = []
+    for streams in (int(count) for count in args.streams.split(',')):
+        for mode in modes:
+            results.append(measure(mode, streams, args.requests, args.tick))
+            print(f"measured {mode} with {streams} streams", file=sys.stderr)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_report(results)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
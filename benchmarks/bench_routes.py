@@ -0,0 +1,201 @@
+"""Route-level benchmark for the dashboard app, backed by FakeDatabase.
+
+Drives every page and /api route through Flask's test client and reports
+p50/p95/p99 latency, Firebase calls and bytes per request, and response size.
+
+    python -m benchmarks.bench_routes                    # report
+    python -m benchmarks.bench_routes --save-baseline    # record baselines
+    python -m benchmarks.bench_routes --check            # exit 1 on regression
+"""
+import argparse
+from contextlib import redirect_stderr, redirect_stdout
+import json
+import os
+import sys
+import time
+
+from benchmarks.fake_firebase import FakeDatabase
+from benchmarks.synthetic_building import generate_building
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'baselines', 'routes.json')
+
+ROUTES = [
+    '/',
+    '/floors',
+    '/floor/floor1',
+    '/room/room1?floor=floor1',
+    '/visitors',
+    '/notifications',
+    '/battery/info',
+    '/battery/grid',
+    '/api/battery',
+    '/api/grid',
+    '/api/building',
+    '/api/floors',
+    '/api/floor/floor1',
+    '/api/room/room1?floor=floor1',
+    '/api/notifications',
+    '/api/visitors',
+]
+
+
+def sample_tree():
+    """A small building shaped like production data"""
+    return generate_building(floors=3, rooms_per_floor=4, appliances_per_room=2, people=20, notifications=50)
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    rank = max(1, int(round(pct / 100.0 * len(ordered) + 0.5)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def create_benchmark_app(fake, live=False):
+    """Build the app from run.py with Firebase routed to `fake`"""
+    # Keep the app's logs (mock-mode warnings etc.) out of benchmark output
+    os.environ.setdefault('LOG_LEVEL', 'ERROR')
+    # Measure the fake, not a snapshot left behind by an earlier run
+    os.environ.setdefault('SNAPSHOT_PATH', '')
+    # ...and the app, not admission control turning away a fleet that shares one address
+    os.environ.setdefault('API_RATE_LIMIT', '0')
+    os.environ.setdefault('API_MAX_CONCURRENCY', '0')
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull), redirect_stderr(devnull):
+        from run import create_app
+        app = create_app()
+        if live:
+            # Serve from listener-fed mirrors, as production does once synced
+            from app.firebase.listeners import start_listeners
+            start_listeners()
+    app.config['TESTING'] = True
+    return app
+
+
+def measure_route(client, fake, route, iterations, warmup):
+    """Time one route; returns a result dict"""
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull), redirect_stderr(devnull):
+        for _ in range(warmup):
+            client.get(route)
+
+        fake.reset_stats()
+        latencies = []
+        response_bytes = 0
+        statuses = set()
+        for _ in range(iterations):
+            start = time.perf_counter()
+            response = client.get(route)
+            latencies.append((time.perf_counter() - start) * 1000)
+            response_bytes += len(response.get_data())
+            statuses.add(response.status_code)
+
+    stats = fake.stats()
+    return {
+        'route': route,
+        'status': sorted(statuses),
+        'p50_ms': round(percentile(latencies, 50), 3),
+        'p95_ms': round(percentile(latencies, 95), 3),
+        'p99_ms': round(percentile(latencies, 99), 3),
+        'firebase_calls': round(stats['calls'] / iterations, 2),
+        'firebase_bytes': round(stats['bytes_down'] / iterations),
+        'response_bytes': round(response_bytes / iterations),
+        'reads_by_path': {path: round(count / iterations, 2) for path, count in stats['reads_by_path'].items()},
+    }
+
+
+def run_benchmark(routes=ROUTES, iterations=50, warmup=5, latency_ms=0.0, live=False, tree=None):
+    fake = FakeDatabase(tree if tree is not None else sample_tree(), latency=latency_ms / 1000.0)
+    with fake.installed():
+        app = create_benchmark_app(fake, live=live)
+        client = app.test_client()
+        return [measure_route(client, fake, route, iterations, warmup) for route in routes]
+
+
+def print_report(results):
+    header = f"{'route':<32} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'fb calls':>9} {'fb bytes':>9} {'resp bytes':>10}"
+    print(header)
+    print('-' * len(header))
+    for result in results:
+        print(f"{result['route']:<32} {result['p50_ms']:>8.2f} {result['p95_ms']:>8.2f} {result['p99_ms']:>8.2f} "
+              f"{result['firebase_calls']:>9.2f} {result['firebase_bytes']:>9} {result['response_bytes']:>10}")
+
+
+def check_regressions(results, baseline, tolerance, slack_ms):
+    """Compare against a saved baseline; returns a list of failure messages"""
+    failures = []
+    for result in results:
+        before = baseline.get(result['route'])
+        if not before:
+            continue
+        allowed = before['p95_ms'] * tolerance + slack_ms
+        if result['p95_ms'] > allowed:
+            failures.append(f"{result['route']}: p95 {result['p95_ms']:.2f} ms > {allowed:.2f} ms "
+                            f"(baseline {before['p95_ms']:.2f} ms)")
+        if result['firebase_calls'] > before['firebase_calls']:
+            failures.append(f"{result['route']}: {result['firebase_calls']} Firebase calls per request "
+                            f"(baseline {before['firebase_calls']})")
+        if result['firebase_bytes'] > before['firebase_bytes'] * 1.1 + 64:
+            failures.append(f"{result['route']}: {result['firebase_bytes']} Firebase bytes per request "
+                            f"(baseline {before['firebase_bytes']})")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--warmup', type=int, default=5)
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='simulated Firebase latency per call')
+    parser.add_argument('--live', action='store_true', help='serve from listener-fed mirrors')
+    parser.add_argument('--route', action='append', help='only benchmark these routes')
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--check', action='store_true', help='fail if results regress against the baseline')
+    parser.add_argument('--tolerance', type=float, default=1.5, help='allowed p95 ratio against baseline')
+    parser.add_argument('--slack-ms', type=float, default=1.0, help='absolute p95 slack for tiny routes')
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args(argv)
+
+    results = run_benchmark(args.route or ROUTES, args.iterations, args.warmup, args.latency_ms, args.live)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_report(results)
+
+    mode = 'live' if args.live else 'direct'
+    key = f"{mode}@{args.latency_ms:g}ms"
+
+    if args.save_baseline:
+        baselines = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baselines = json.load(f)
+        baselines[key] = {result['route']: {k: result[k] for k in ('p95_ms', 'firebase_calls', 'firebase_bytes')}
+                          for result in results}
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, 'w') as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+        print(f"\nSaved baseline '{key}' to {args.baseline}")
+
+    if args.check:
+        if not os.path.exists(args.baseline):
+            print(f"\nNo baseline at {args.baseline}; run with --save-baseline first")
+            return 2
+        with open(args.baseline) as f:
+            baseline = json.load(f).get(key)
+        if not baseline:
+            print(f"\nNo baseline recorded for '{key}'")
+            return 2
+        failures = check_regressions(results, baseline, args.tolerance, args.slack_ms)
+        if failures:
+            print("\nREGRESSIONS:")
+            for failure in failures:
+                print(f"  ! {failure}")
+            return 1
+        print("\nNo regressions against baseline")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,194 @@
+"""How route latency and FirebaseClient cost grow with building size.
+
+For each scale factor s the building has base_floors*s floors, base_people*s
+people and base_notifications*s notifications. Each route and each
+FirebaseClient function is measured at every size. The growth exponent is
+the log-log slope from the smallest to the largest size: about 0 means the
+cost per request does not depend on building size, about 1 means it is O(n).
+FakeDatabase evaluates queries in-process, so server-side work such as
+ordering notifications shows up in the numbers as well.
+
+    python -m benchmarks.bench_scaling --sizes 1,4,16,64
+    python -m benchmarks.bench_scaling --live --csv scaling.csv --plot scaling.png
+"""
+import argparse
+from contextlib import redirect_stderr, redirect_stdout
+import csv
+import math
+import os
+import sys
+import time
+import tracemalloc
+
+from benchmarks.bench_routes import create_benchmark_app, percentile
+from benchmarks.fake_firebase import FakeDatabase
+from benchmarks.synthetic_building import generate_building
+
+ROUTES = ['/', '/floors', '/floor/floor1', '/room/room1?floor=floor1', '/visitors',
+          '/api/building', '/api/floors', '/api/floor/floor1', '/api/room/room1?floor=floor1',
+          '/api/notifications']
+
+
+def client_functions():
+    from app.firebase.firebase_client import FirebaseClient
+    return {
+        'get_battery_info': FirebaseClient.get_battery_info,
+        'get_grid_info': FirebaseClient.get_grid_info,
+        'get_visitors': FirebaseClient.get_visitors,
+        'get_people_by_location': FirebaseClient.get_people_by_location,
+        'get_notifications': FirebaseClient.get_notifications,
+        'get_floors': FirebaseClient.get_floors,
+        'get_floor': lambda: FirebaseClient.get_floor('floor1'),
+        'get_room': lambda: FirebaseClient.get_room('room1', 'floor1'),
+        'get_building_totals': FirebaseClient.get_building_totals,
+    }
+
+
+def measure(fn, iterations):
+    """(p50 ms, peak KiB allocated) for calling fn"""
+    latencies = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return percentile(latencies, 50), peak / 1024.0
+
+
+def load_tree(fake, tree, live):
+    from app.firebase.invalidation import invalidator
+    from app.firebase.listeners import start_listeners, stop_listeners
+    if live:
+        stop_listeners()
+    fake.data = tree
+    # As a write would, so indexes built from one-off reads are rebuilt for this size
+    invalidator.changed(['/'])
+    if live:
+        start_listeners()
+    fake.reset_stats()
+
+
+def run_scaling(sizes, iterations, live, base_floors, rooms_per_floor, base_people, base_notifications):
+    rows = []
+    fake = FakeDatabase({})
+    with fake.installed():
+        app = create_benchmark_app(fake, live=live)
+        client = app.test_client()
+        functions = client_functions()
+
+        for size in sizes:
+            tree = generate_building(floors=base_floors * size, rooms_per_floor=rooms_per_floor,
+                                     people=base_people * size, notifications=base_notifications * size)
+            with open(os.devnull, 'w') as devnull, redirect_stdout(devnull), redirect_stderr(devnull):
+                load_tree(fake, tree, live)
+                for route in ROUTES:
+                    client.get(route)
+                    fake.reset_stats()
+                    fn = lambda: client.get(route)
+                    p50, peak = measure(fn, iterations)
+                    reads = fake.stats()['reads'] / (iterations + 1)
+                    rows.append({'size': size, 'kind': 'route', 'name': route, 'p50_ms': p50,
+                                 'peak_kib': peak, 'firebase_reads': reads})
+                for name, fn in functions.items():
+                    fn()
+                    fake.reset_stats()
+                    p50, peak = measure(fn, iterations)
+                    reads = fake.stats()['reads'] / (iterations + 1)
+                    rows.append({'size': size, 'kind': 'function', 'name': name, 'p50_ms': p50,
+                                 'peak_kib': peak, 'firebase_reads': reads})
+            print(f"measured size {size} ({base_floors * size} floors, "
+                  f"{base_floors * size * rooms_per_floor} rooms)", file=sys.stderr)
+    return rows
+
+
+def growth_exponent(points):
+    """Log-log slope between the smallest and largest size"""
+    (x0, y0), (x1, y1) = points[0], points[-1]
+    if x0 == x1 or y0 <= 0 or y1 <= 0:
+        return 0.0
+    return math.log(y1 / y0) / math.log(x1 / x0)
+
+
+def print_report(rows, sizes):
+    names = []
+    for row in rows:
+        if (row['kind'], row['name']) not in names:
+            names.append((row['kind'], row['name']))
+
+    header = f"{'name':<30}" + ''.join(f"{'x' + str(size):>10}" for size in sizes) + f"{'growth':>8}{'peak KiB':>10}"
+    print(f"p50 latency (ms) by scale factor\n{header}\n{'-' * len(header)}")
+    for kind, name in names:
+        series = [row for row in rows if row['kind'] == kind and row['name'] == name]
+        exponent = growth_exponent([(row['size'], row['p50_ms']) for row in series])
+        flag = '  O(n)?' if exponent > 0.5 else ''
+        print(f"{name:<30}" + ''.join(f"{row['p50_ms']:>10.2f}" for row in series)
+              + f"{exponent:>8.2f}{series[-1]['peak_kib']:>10.0f}{flag}")
+
+
+def write_csv(rows, path):
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=['size', 'kind', 'name', 'p50_ms', 'peak_kib', 'firebase_reads'])
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def plot(rows, path):
+    try:
+        import matplotlib
+        matplotlib.use('Agg')
+        import matplotlib.pyplot as plt
+    except ImportError:
+        print("matplotlib is not installed; skipping plot", file=sys.stderr)
+        return
+
+    figure, (latency_axis, memory_axis) = plt.subplots(1, 2, figsize=(14, 6))
+    for kind, name in sorted({(row['kind'], row['name']) for row in rows}):
+        series = [row for row in rows if row['kind'] == kind and row['name'] == name]
+        sizes = [row['size'] for row in series]
+        style = '-' if kind == 'route' else '--'
+        latency_axis.plot(sizes, [row['p50_ms'] for row in series], style, marker='o', label=name)
+        if kind == 'function':
+            memory_axis.plot(sizes, [row['peak_kib'] for row in series], style, marker='o', label=name)
+    for axis, title, unit in ((latency_axis, 'p50 latency', 'ms'), (memory_axis, 'FirebaseClient peak memory', 'KiB')):
+        axis.set_xscale('log')
+        axis.set_yscale('log')
+        axis.set_xlabel('building scale factor')
+        axis.set_ylabel(unit)
+        axis.set_title(title)
+        axis.legend(fontsize='x-small')
+    figure.tight_layout()
+    figure.savefig(path)
+    print(f"Saved plot to {path}", file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='1,4,16,64', help='comma-separated scale factors')
+    parser.add_argument('--iterations', type=int, default=10)
+    parser.add_argument('--floors', type=int, default=3, help='floors at scale 1')
+    parser.add_argument('--rooms-per-floor', type=int, default=10)
+    parser.add_argument('--people', type=int, default=50, help='people at scale 1')
+    parser.add_argument('--notifications', type=int, default=100, help='notifications at scale 1')
+    parser.add_argument('--live', action='store_true', help='serve from listener-fed mirrors')
+    parser.add_argument('--csv', help='write raw measurements to this CSV file')
+    parser.add_argument('--plot', help='write a latency/memory plot to this image (needs matplotlib)')
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes.split(',')]
+    rows = run_scaling(sizes, args.iterations, args.live, args.floors, args.rooms_per_floor,
+                       args.people, args.notifications)
+    print_report(rows, sizes)
+    if args.csv:
+        write_csv(rows, args.csv)
+    if args.plot:
+        plot(rows, args.plot)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
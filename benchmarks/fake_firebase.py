@@ -0,0 +1,332 @@
+"""In-memory stand-in for firebase_admin.db, for benchmarks and load tests.
+
+    fake = FakeDatabase(tree, latency=0.02)
+    with fake.installed():
+        ...  # every db.reference(...) in the app now hits `fake`
+
+Each network-shaped call (get, set, update, push, delete, transaction)
+sleeps for `latency` seconds and is counted, together with the bytes it
+would have moved, so callers can report Firebase reads per request.
+"""
+from collections import OrderedDict
+from contextlib import contextmanager
+import copy
+import itertools
+import json
+import threading
+import time
+
+import firebase_admin.db
+
+
+def _parts(path):
+    return [part for part in (path or '').split('/') if part]
+
+
+def _join(parts):
+    return '/' + '/'.join(parts)
+
+
+def _size(value):
+    return len(json.dumps(value, separators=(',', ':'))) if value is not None else 0
+
+
+def _key_order(key):
+    # Realtime Database sorts integer-like keys numerically, before other keys
+    try:
+        return (0, int(key), '')
+    except ValueError:
+        return (1, 0, key)
+
+
+def _value_order(value):
+    if value is None:
+        return (0, 0, '')
+    if isinstance(value, bool):
+        return (1, int(value), '')
+    if isinstance(value, (int, float)):
+        return (2, value, '')
+    if isinstance(value, str):
+        return (3, 0, value)
+    return (4, 0, '')
+
+
+class FakeEvent:
+    def __init__(self, event_type, path, data):
+        self.event_type = event_type
+        self.path = path
+        self.data = data
+
+
+class FakeListenerRegistration:
+    def __init__(self, database, listener):
+        self._database = database
+        self._listener = listener
+
+    def close(self):
+        self._database._remove_listener(self._listener)
+
+
+class FakeQuery:
+    def __init__(self, reference, order):
+        self._reference = reference
+        self._order = order
+        self._start = None
+        self._end = None
+        self._equal = None
+        self._first = None
+        self._last = None
+
+    def start_at(self, value):
+        self._start = value
+        return self
+
+    def end_at(self, value):
+        self._end = value
+        return self
+
+    def equal_to(self, value):
+        self._equal = value
+        return self
+
+    def limit_to_first(self, limit):
+        self._first = limit
+        return self
+
+    def limit_to_last(self, limit):
+        self._last = limit
+        return self
+
+    def _sort_value(self, key, value):
+        if self._order == '$key':
+            return _key_order(key)
+        if self._order == '$value':
+            return _value_order(value)
+        child = value.get(self._order) if isinstance(value, dict) else None
+        return _value_order(child)
+
+    def _bound(self, value):
+        return _key_order(str(value)) if self._order == '$key' else _value_order(value)
+
+    def get(self):
+        database = self._reference._database
+        node = database._read(self._reference.path)
+        if isinstance(node, list):
+            node = {str(i): item for i, item in enumerate(node) if item is not None}
+        if not isinstance(node, dict):
+            result = None
+        else:
+            items = sorted(node.items(), key=lambda item: self._sort_value(*item))
+            if self._start is not None:
+                items = [item for item in items if self._sort_value(*item) >= self._bound(self._start)]
+            if self._end is not None:
+                items = [item for item in items if self._sort_value(*item) <= self._bound(self._end)]
+            if self._equal is not None:
+                items = [item for item in items if self._sort_value(*item) == self._bound(self._equal)]
+            if self._first is not None:
+                items = items[:self._first]
+            if self._last is not None:
+                items = items[-self._last:]
+            result = OrderedDict(items)
+        return database._download(self._reference.path, result)
+
+
+class FakeReference:
+    def __init__(self, database, path):
+        self._database = database
+        self.path = _join(_parts(path))
+
+    @property
+    def key(self):
+        parts = _parts(self.path)
+        return parts[-1] if parts else None
+
+    @property
+    def parent(self):
+        parts = _parts(self.path)
+        return FakeReference(self._database, _join(parts[:-1])) if parts else None
+
+    def child(self, path):
+        return FakeReference(self._database, self.path + '/' + path)
+
+    def get(self, etag=False, shallow=False):
+        value = self._database._read(self.path)
+        if shallow and isinstance(value, dict):
+            value = {key: True for key in value}
+        result = self._database._download(self.path, value)
+        return (result, 'fake-etag') if etag else result
+
+    def set(self, value):
+        self._database._write(self.path, value, 'put')
+
+    def update(self, value):
+        self._database._write(self.path, value, 'patch')
+
+    def delete(self):
+        self._database._write(self.path, None, 'put')
+
+    def push(self, value=''):
+        key = self._database._next_push_id()
+        child = self.child(key)
+        child.set(value)
+        return child
+
+    def transaction(self, transaction_update):
+        with self._database._transaction_lock:
+            current = self._database._download(self.path, self._database._read(self.path))
+            new_value = transaction_update(current)
+            self.set(new_value)
+            return new_value
+
+    def order_by_key(self):
+        return FakeQuery(self, '$key')
+
+    def order_by_value(self):
+        return FakeQuery(self, '$value')
+
+    def order_by_child(self, path):
+        return FakeQuery(self, path)
+
+    def listen(self, callback):
+        return self._database._add_listener(self.path, callback)
+
+
+class FakeDatabase:
+    def __init__(self, data=None, latency=0.0):
+        self.data = copy.deepcopy(data) if data is not None else {}
+        self.latency = latency
+        self._lock = threading.RLock()
+        self._transaction_lock = threading.Lock()
+        self._listeners = []
+        self._push_ids = itertools.count(1)
+        self.reset_stats()
+
+    # Stats
+
+    def reset_stats(self):
+        with self._lock:
+            self.calls = 0
+            self.reads = 0
+            self.writes = 0
+            self.bytes_down = 0
+            self.bytes_up = 0
+            self.reads_by_path = {}
+
+    def stats(self):
+        """Counters since the last reset_stats(), as a plain dict"""
+        with self._lock:
+            return {
+                'calls': self.calls,
+                'reads': self.reads,
+                'writes': self.writes,
+                'bytes_down': self.bytes_down,
+                'bytes_up': self.bytes_up,
+                'reads_by_path': dict(self.reads_by_path),
+            }
+
+    # Installing
+
+    def reference(self, path='/', app=None, url=None):
+        return FakeReference(self, path)
+
+    @contextmanager
+    def installed(self):
+        """Route firebase_admin.db.reference() to this fake for the duration"""
+        original = firebase_admin.db.reference
+        firebase_admin.db.reference = self.reference
+        try:
+            yield self
+        finally:
+            firebase_admin.db.reference = original
+
+    # Internals used by references
+
+    def _network(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _read(self, path):
+        with self._lock:
+            node = self.data
+            for part in _parts(path):
+                if isinstance(node, list):
+                    node = node[int(part)] if part.isdigit() and int(part) < len(node) else None
+                elif isinstance(node, dict):
+                    node = node.get(part)
+                else:
+                    return None
+            return node
+
+    def _download(self, path, value):
+        """Account one read and hand back a private copy, as the wire would"""
+        self._network()
+        encoded = json.dumps(value, separators=(',', ':')) if value is not None else None
+        with self._lock:
+            self.calls += 1
+            self.reads += 1
+            self.bytes_down += len(encoded) if encoded else 0
+            self.reads_by_path[path] = self.reads_by_path.get(path, 0) + 1
+        return json.loads(encoded, object_pairs_hook=OrderedDict if isinstance(value, OrderedDict) else dict) \
+            if encoded else None
+
+    def _write(self, path, value, event_type):
+        self._network()
+        value = json.loads(json.dumps(value)) if value is not None else None
+        with self._lock:
+            self.calls += 1
+            self.writes += 1
+            self.bytes_up += _size(value)
+            if event_type == 'patch' and isinstance(value, dict):
+                for key, item in value.items():
+                    self._store(_parts(path) + _parts(key), item)
+            else:
+                self._store(_parts(path), value)
+            listeners = list(self._listeners)
+        self._notify(listeners, path, value, event_type)
+
+    def _store(self, parts, value):
+        if not parts:
+            self.data = value if value is not None else {}
+            return
+        node = self.data
+        for part in parts[:-1]:
+            child = node.get(part) if isinstance(node, dict) else None
+            if not isinstance(child, dict):
+                if value is None:
+                    return
+                child = {}
+                node[part] = child
+            node = child
+        if value is None:
+            node.pop(parts[-1], None)
+        else:
+            node[parts[-1]] = value
+
+    def _next_push_id(self):
+        # Push ids sort chronologically, like the real ones
+        return f"-F{int(time.time() * 1000):013d}{next(self._push_ids):06d}"
+
+    # Listeners
+
+    def _add_listener(self, path, callback):
+        listener = (_parts(path), callback)
+        with self._lock:
+            self._listeners.append(listener)
+            snapshot = copy.deepcopy(self._read(path))
+        callback(FakeEvent('put', '/', snapshot))
+        return FakeListenerRegistration(self, listener)
+
+    def _remove_listener(self, listener):
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def _notify(self, listeners, path, value, event_type):
+        written = _parts(path)
+        for listened, callback in listeners:
+            if written[:len(listened)] == listened:
+                relative = _join(written[len(listened):])
+                callback(FakeEvent(event_type, relative, copy.deepcopy(value)))
+            elif listened[:len(written)] == written:
+                # Write above the listener: it sees its whole subtree replaced
+                callback(FakeEvent('put', '/', copy.deepcopy(self._read(_join(listened)))))
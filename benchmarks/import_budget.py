@@ -0,0 +1,81 @@
+"""Check what `import run` costs on a cold start.
+
+Runs `python -X importtime -c "import run"` in a fresh interpreter with the
+Firebase credential variables unset, then fails (exit 1) if a heavy
+dependency was imported eagerly or the total import time is over budget.
+firebase_admin, google-auth and requests are only needed once Firebase
+initialization runs in the background, so they must not load at import.
+
+    python -m benchmarks.import_budget
+    python -m benchmarks.import_budget --budget-ms 400 --top 25
+
+tests/test_import_budget.py runs the same check under pytest.
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Packages that must be imported lazily
+DEFERRED = ('firebase_admin', 'google', 'requests')
+
+CREDENTIAL_VARS = ('FIREBASE_CREDENTIALS_JSON', 'FIREBASE_CREDENTIALS_PATH', 'FIREBASE_DATABASE_URL')
+
+
+def measure(module='run'):
+    """[(module, self_us, cumulative_us)] in import order, from -X importtime"""
+    env = {name: value for name, value in os.environ.items() if name not in CREDENTIAL_VARS}
+    env['FIREBASE_INIT_ASYNC'] = '0'
+    env['LOG_LEVEL'] = 'ERROR'
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f"import {module}"],
+                            cwd=ROOT, env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise SystemExit(f"import {module} failed:\n{result.stderr}")
+
+    imports = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        imports.append((name.strip(), int(self_us), int(cumulative_us)))
+    return imports
+
+
+def check(imports, budget_ms=500.0):
+    """Reasons the measured imports fail the budget; empty if they pass"""
+    failures = []
+    eager = sorted({name for name, _, _ in imports if name.split('.')[0] in DEFERRED})
+    if eager:
+        failures.append(f"imported eagerly: {', '.join(eager[:10])}{' ...' if len(eager) > 10 else ''}")
+    total_ms = sum(self_us for _, self_us, _ in imports) / 1000
+    if total_ms > budget_ms:
+        failures.append(f"total {total_ms:.1f} ms is over the {budget_ms:.0f} ms budget")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--module', default='run')
+    parser.add_argument('--budget-ms', type=float, default=500.0,
+                        help='fail if the total import time exceeds this (default 500)')
+    parser.add_argument('--top', type=int, default=15, help='modules to list by cumulative time')
+    args = parser.parse_args()
+
+    imports = measure(args.module)
+    total_ms = sum(self_us for _, self_us, _ in imports) / 1000
+
+    print(f"import {args.module}: {total_ms:.1f} ms across {len(imports)} modules (budget {args.budget_ms:.0f} ms)")
+    print(f"{'cumulative ms':>14}  {'self ms':>8}  module")
+    for name, self_us, cumulative_us in sorted(imports, key=lambda item: -item[2])[:args.top]:
+        print(f"{cumulative_us / 1000:>14.1f}  {self_us / 1000:>8.1f}  {name}")
+
+    failures = check(imports, args.budget_ms)
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
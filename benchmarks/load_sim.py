@@ -0,0 +1,231 @@
+"""Simulate a fleet of dashboard kiosks against a local app instance.
+
+Each simulated client behaves like a browser tab on the dashboard: it loads a
+page, then polls that page's API endpoint on the same timer as the page's
+script (battery.js 30 s, floors.js 60 s, visitors.js 30 s, floor_detail.js and
+room_detail.js 30 s), and after a dwell time navigates to another page.
+Timers are compressed by --speedup so a 60 s poll fires every 60/speedup s.
+
+The app runs behind a real threaded HTTP server, so requests from different
+clients overlap as they would in production. For every fleet size the report
+shows throughput, latency percentiles and Firebase reads per client request
+(read amplification), measured against FakeDatabase.
+
+    python -m benchmarks.load_sim --clients 1,10,50 --duration 20
+    python -m benchmarks.load_sim --clients 100 --live --latency-ms 20
+"""
+import argparse
+from contextlib import redirect_stderr, redirect_stdout
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from benchmarks.bench_routes import create_benchmark_app, percentile
+from benchmarks.fake_firebase import FakeDatabase
+from benchmarks.synthetic_building import generate_building
+
+# page -> (relative weight when navigating, poll interval in seconds, endpoints polled)
+PAGES = {
+    '/': (3, None, []),
+    '/battery/info': (2, 30, ['/api/battery']),
+    '/battery/grid': (1, None, []),
+    '/floors': (2, 60, ['/api/floors']),
+    '/floor/{floor}': (3, 30, ['/api/floor/{floor}']),
+    '/room/{room}?floor={floor}': (2, 30, ['/api/room/{room}?floor={floor}']),
+    '/visitors': (2, 30, ['/api/visitors']),
+    '/notifications': (1, None, []),
+}
+
+
+class Stats:
+    """Latency samples and counts shared by all client threads"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = []
+        self.page_requests = 0
+        self.api_requests = 0
+        self.errors = 0
+
+    def record(self, kind, latency_ms, ok):
+        with self._lock:
+            self.latencies.append(latency_ms)
+            if kind == 'page':
+                self.page_requests += 1
+            else:
+                self.api_requests += 1
+            if not ok:
+                self.errors += 1
+
+
+class Kiosk(threading.Thread):
+    """One dashboard tab: load a page, poll its endpoints, navigate on"""
+
+    def __init__(self, base_url, stats, stop_at, speedup, dwell, floors, rooms_per_floor, seed):
+        super().__init__(daemon=True)
+        self.base_url = base_url
+        self.stats = stats
+        self.stop_at = stop_at
+        self.speedup = speedup
+        self.dwell = dwell
+        self.floors = floors
+        self.rooms_per_floor = rooms_per_floor
+        self.rng = random.Random(seed)
+
+    def fetch(self, path, kind):
+        start = time.perf_counter()
+        ok = True
+        try:
+            with urllib.request.urlopen(self.base_url + path, timeout=30) as response:
+                response.read()
+        except (urllib.error.URLError, OSError):
+            ok = False
+        self.stats.record(kind, (time.perf_counter() - start) * 1000, ok)
+
+    def pick_page(self):
+        pages = list(PAGES)
+        page = self.rng.choices(pages, weights=[PAGES[p][0] for p in pages])[0]
+        floor = f"floor{self.rng.randint(1, self.floors)}"
+        room = f"room{self.rng.randint(1, self.rooms_per_floor)}"
+        return page, {'floor': floor, 'room': room}
+
+    def sleep_until(self, deadline):
+        remaining = min(deadline, self.stop_at) - time.monotonic()
+        if remaining > 0:
+            time.sleep(remaining)
+        return time.monotonic() < self.stop_at
+
+    def run(self):
+        # Kiosks are not switched on in lockstep
+        if not self.sleep_until(time.monotonic() + self.rng.uniform(0, 30) / self.speedup):
+            return
+        while time.monotonic() < self.stop_at:
+            page, params = self.pick_page()
+            _, interval, endpoints = PAGES[page]
+            self.fetch(page.format(**params), 'page')
+
+            leave_at = time.monotonic() + self.rng.expovariate(1.0 / self.dwell) / self.speedup
+            if not interval:
+                if not self.sleep_until(leave_at):
+                    return
+                continue
+            next_poll = time.monotonic() + interval / self.speedup
+            while next_poll < leave_at:
+                if not self.sleep_until(next_poll):
+                    return
+                for endpoint in endpoints:
+                    self.fetch(endpoint.format(**params), 'api')
+                next_poll += interval / self.speedup
+            if not self.sleep_until(leave_at):
+                return
+
+
+def start_server(app):
+    """Serve `app` on an ephemeral localhost port; returns (server, base_url)"""
+    from werkzeug.serving import make_server
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, name='load-sim-server', daemon=True)
+    thread.start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def run_fleet(base_url, fake, clients, duration, speedup, dwell, floors, rooms_per_floor, seed):
+    stats = Stats()
+    stop_at = time.monotonic() + duration
+    fake.reset_stats()
+    kiosks = [Kiosk(base_url, stats, stop_at, speedup, dwell, floors, rooms_per_floor, seed * 100003 + i)
+              for i in range(clients)]
+    start = time.monotonic()
+    for kiosk in kiosks:
+        kiosk.start()
+    for kiosk in kiosks:
+        kiosk.join()
+    elapsed = time.monotonic() - start
+
+    requests = stats.page_requests + stats.api_requests
+    firebase = fake.stats()
+    return {
+        'clients': clients,
+        'requests': requests,
+        'page_requests': stats.page_requests,
+        'api_requests': stats.api_requests,
+        'errors': stats.errors,
+        'throughput_rps': round(requests / elapsed, 2) if elapsed else 0.0,
+        'p50_ms': round(percentile(stats.latencies, 50), 2),
+        'p95_ms': round(percentile(stats.latencies, 95), 2),
+        'p99_ms': round(percentile(stats.latencies, 99), 2),
+        'max_ms': round(max(stats.latencies), 2) if stats.latencies else 0.0,
+        'firebase_reads': firebase['reads'],
+        'reads_per_request': round(firebase['reads'] / requests, 2) if requests else 0.0,
+        'firebase_kib_per_request': round(firebase['bytes_down'] / 1024.0 / requests, 2) if requests else 0.0,
+    }
+
+
+def run_simulation(client_counts, duration=20.0, speedup=30.0, dwell=300.0, latency_ms=0.0, live=False,
+                   floors=3, rooms_per_floor=4, people=20, notifications=50, seed=0):
+    tree = generate_building(floors=floors, rooms_per_floor=rooms_per_floor, people=people,
+                             notifications=notifications, seed=seed)
+    fake = FakeDatabase(tree, latency=latency_ms / 1000.0)
+    results = []
+    with fake.installed():
+        app = create_benchmark_app(fake, live=live)
+        app.config['TESTING'] = False
+        with open(os.devnull, 'w') as devnull, redirect_stdout(devnull), redirect_stderr(devnull):
+            logging.getLogger('werkzeug').setLevel(logging.ERROR)
+            server, base_url = start_server(app)
+            try:
+                for clients in client_counts:
+                    results.append(run_fleet(base_url, fake, clients, duration, speedup, dwell,
+                                             floors, rooms_per_floor, seed))
+                    print(f"measured {clients} clients", file=sys.__stderr__)
+            finally:
+                server.shutdown()
+    return results
+
+
+def print_report(results):
+    header = (f"{'clients':>8} {'requests':>9} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+              f"{'max ms':>8} {'errors':>7} {'fb reads/req':>13} {'fb KiB/req':>11}")
+    print(header)
+    print('-' * len(header))
+    for result in results:
+        print(f"{result['clients']:>8} {result['requests']:>9} {result['throughput_rps']:>8.1f} "
+              f"{result['p50_ms']:>8.2f} {result['p95_ms']:>8.2f} {result['p99_ms']:>8.2f} "
+              f"{result['max_ms']:>8.2f} {result['errors']:>7} {result['reads_per_request']:>13.2f} "
+              f"{result['firebase_kib_per_request']:>11.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', default='1,10,50', help='comma-separated fleet sizes')
+    parser.add_argument('--duration', type=float, default=20.0, help='wall-clock seconds per fleet size')
+    parser.add_argument('--speedup', type=float, default=30.0, help='time compression for poll timers')
+    parser.add_argument('--dwell', type=float, default=300.0, help='mean seconds on a page before navigating')
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='simulated Firebase latency per call')
+    parser.add_argument('--live', action='store_true', help='serve from listener-fed mirrors')
+    parser.add_argument('--floors', type=int, default=3)
+    parser.add_argument('--rooms-per-floor', type=int, default=4)
+    parser.add_argument('--people', type=int, default=20)
+    parser.add_argument('--notifications', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args(argv)
+
+    client_counts = [int(count) for count in args.clients.split(',')]
+    results = run_simulation(client_counts, args.duration, args.speedup, args.dwell, args.latency_ms, args.live,
+                             args.floors, args.rooms_per_floor, args.people, args.notifications, args.seed)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_report(results)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,141 @@
+"""Generate realistic /energy_dashboard and /people trees at any scale.
+
+    python -m benchmarks.synthetic_building --floors 40 --rooms-per-floor 25 \
+        --people 2000 --notifications 5000 --out building.json
+"""
+import argparse
+import json
+import random
+import sys
+
+STATUSES = ['optimal'] * 6 + ['sub-optimal'] * 3 + ['critical']
+ROOM_KINDS = ['Office', 'Meeting Room', 'Kitchen', 'Lab', 'Storage', 'Lounge', 'Server Room', 'Washroom']
+APPLIANCES = [
+    ('Light', 5, 40),
+    ('Air Conditioner', 300, 1500),
+    ('Computer', 50, 250),
+    ('Projector', 150, 350),
+    ('Fridge', 80, 200),
+    ('Fan', 20, 70),
+]
+NOTIFICATIONS = [
+    ('Battery Alert', 'Battery level is low ({n}%)', 'high', '/battery/info'),
+    ('Energy Consumption', 'Floor {n} is showing higher than normal energy usage', 'low', '/floors'),
+    ('Tip', 'Sunny weather expected! Save electricity by using natural light.', 'medium', ''),
+    ('Grid Load', 'Grid load is high ({n}%)', 'medium', '/battery/grid'),
+]
+
+
+def generate_building(floors=3, rooms_per_floor=4, appliances_per_room=2, people=20,
+                      notifications=50, seed=0):
+    """Return a full database tree with the given number of floors, rooms, people and alerts"""
+    rng = random.Random(seed)
+
+    floors_tree = {}
+    room_names = []
+    for f in range(1, floors + 1):
+        rooms = {}
+        for r in range(1, rooms_per_floor + 1):
+            name = f"{rng.choice(ROOM_KINDS)} {f}.{r:02d}"
+            room_names.append(name)
+            appliances = {}
+            for a in range(1, appliances_per_room + 1):
+                kind, low, high = rng.choice(APPLIANCES)
+                state = rng.choice(['on', 'off'])
+                appliances[f"appliance{a}"] = {
+                    'name': kind,
+                    'state': state,
+                    'consumption': rng.randint(low, high) if state == 'on' else 0,
+                }
+            rooms[f"room{r}"] = {
+                'name': name,
+                'consumption': sum(appliance['consumption'] for appliance in appliances.values()),
+                'status': rng.choice(STATUSES),
+                'occupied': rng.random() < 0.4,
+                'avg_consumption': rng.randint(5, 40),
+                'peak_time': f"{rng.randint(8, 18):02d}:00",
+                'efficiency': rng.randint(40, 100),
+                'appliances': appliances,
+            }
+        floors_tree[f"floor{f}"] = {
+            'name': f"Floor {f}",
+            'consumption': round(sum(room['consumption'] for room in rooms.values()) / 1000.0, 2),
+            'status': rng.choice(STATUSES),
+            'rooms': rooms,
+        }
+
+    people_tree = {}
+    for p in range(1, people + 1):
+        present = room_names and rng.random() < 0.7
+        people_tree[f"user{p:05d}"] = {
+            'name': f"Person {p}",
+            'locations': {
+                'current': rng.choice(room_names) if present else '',
+                'previous': rng.choice(room_names) if room_names else '',
+            },
+        }
+
+    notifications_tree = {}
+    for n in range(notifications):
+        title, message, priority, action_url = rng.choice(NOTIFICATIONS)
+        # Push-style keys sort chronologically, like Firebase push ids
+        notifications_tree[f"-N{n:012d}"] = {
+            'title': title,
+            'message': message.format(n=rng.randint(1, 99)),
+            'priority': priority,
+            'timestamp': f"2025-04-{1 + n % 28:02d} {1 + n % 12:02d}:{n % 60:02d} AM",
+            'action': 'View Details' if action_url else '',
+            'action_url': action_url,
+            'read': rng.random() < 0.6,
+        }
+    unread = sum(1 for notification in notifications_tree.values() if not notification['read'])
+
+    return {
+        'energy_dashboard': {
+            'battery': {
+                'percentage': rng.randint(15, 100),
+                'current_power': round(rng.uniform(0.5, 6.0), 1),
+                'charging_rate': round(rng.uniform(0.5, 4.0), 1),
+                'discharging_rate': round(rng.uniform(0.5, 3.0), 1),
+                'capacity': 13.5,
+                'health': rng.randint(80, 100),
+            },
+            'grid': {
+                'status': 'connected',
+                'load': rng.randint(20, 95),
+                'purchased': rng.randint(500, 5000),
+                'sold': rng.randint(100, 2000),
+                'revenue': round(rng.uniform(50, 800), 2),
+            },
+            'visitors': {'count': people, 'trend': rng.choice(['up', 'down'])},
+            'floors': floors_tree,
+            'notifications': notifications_tree,
+            'notifications_meta': {'unread_count': unread},
+        },
+        'people': people_tree,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--floors', type=int, default=3)
+    parser.add_argument('--rooms-per-floor', type=int, default=4)
+    parser.add_argument('--appliances-per-room', type=int, default=2)
+    parser.add_argument('--people', type=int, default=20)
+    parser.add_argument('--notifications', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', help='write JSON here instead of stdout')
+    args = parser.parse_args(argv)
+
+    tree = generate_building(args.floors, args.rooms_per_floor, args.appliances_per_room,
+                             args.people, args.notifications, args.seed)
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(tree, f)
+    else:
+        json.dump(tree, sys.stdout)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
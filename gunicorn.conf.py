@@ -0,0 +1,60 @@
+# Loaded automatically by `gunicorn run:app` (see Procfile) from the working directory
+import os
+import tempfile
+import threading
+import time
+
+# Threads per worker: /api/stream holds one for as long as a client stays connected,
+# which would stall a sync worker's every other request
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 8))
+
+_refresher = None
+
+
+def _build_assets(server):
+    # Once, in the master, before any worker links to them
+    from app.assets import build, is_stale
+    static_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app', 'static')
+    if os.environ.get('ASSET_FINGERPRINTS', '1') == '1' and is_stale(static_folder):
+        try:
+            manifest = build(static_folder)
+            server.log.info("Built %d fingerprinted static assets", len(manifest['assets']))
+        except OSError as e:
+            server.log.warning("Serving unfingerprinted static assets: %s", e)
+
+
+def on_starting(server):
+    """Build fingerprinted static assets, and with SHARED_SNAPSHOT=1 (for several
+    workers) start the process that holds the Firebase listeners for every worker
+    on this host"""
+    global _refresher
+    _build_assets(server)
+    if os.environ.get('SHARED_SNAPSHOT', '0') != '1':
+        return
+    shm = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+    # Workers inherit the master's environment, so they pick this up as readers
+    os.environ.setdefault('SHARED_SNAPSHOT_PATH', os.path.join(shm, 'energy_dashboard.shm'))
+    if os.environ.get('SHARED_SNAPSHOT_ROLE') == 'elect':
+        # The workers elect a listener leader among themselves instead
+        return
+
+    from app.firebase.shared_snapshot import start_refresher
+    _refresher = start_refresher()
+    server.log.info("Started snapshot refresher (pid %s)", _refresher.pid)
+
+    def supervise():
+        # Workers fall back to direct reads while it is down (SHARED_SNAPSHOT_MAX_AGE)
+        global _refresher
+        while True:
+            time.sleep(5)
+            if _refresher.poll() is not None:
+                server.log.warning("Snapshot refresher exited (%s); restarting", _refresher.returncode)
+                _refresher = start_refresher()
+
+    threading.Thread(target=supervise, name='refresher-supervisor', daemon=True).start()
+
+
+def on_exit(server):
+    if _refresher is not None and _refresher.poll() is None:
+        _refresher.terminate()
@@ -1,34 +1,74 @@
 from flask import Flask
+from werkzeug.middleware.proxy_fix import ProxyFix
+from app.admission import init_admission
+from app.assets import init_assets
+from app.images import init_images
 from app.config import Config
 from app.firebase import init_firebase
+from app.monitoring import init_monitoring
+from app.monitoring.logs import init_logging
+from app.monitoring.profiler import ProfilingMiddleware, request_profiler
+from app.monitoring.startup import startup_timer
+from app.polling import poll_advisor
 from app.routes.main_routes import main
 from app.routes.battery_routes import battery
 from app.routes.api_routes import api
+from app.routes.monitoring_routes import monitoring
 
 import os
 
-# Check for FIREBASE_CREDENTIALS_JSON in env (for Railway/production)
-if os.environ.get("FIREBASE_CREDENTIALS_JSON"):
-    firebase_json_path = "/tmp/firebase_adminsdk.json"  # or another safe path
-    with open(firebase_json_path, "w") as f:
-        f.write(os.environ["FIREBASE_CREDENTIALS_JSON"])
-    os.environ["FIREBASE_CREDENTIALS_PATH"] = firebase_json_path
-# else: FIREBASE_CREDENTIALS_PATH should already be set for local dev
+# FIREBASE_CREDENTIALS_JSON (Railway/production) or FIREBASE_CREDENTIALS_PATH (local dev)
+# are read by init_firebase when it runs
 
 def create_app(config_class=Config):
+    startup_timer.mark('imports')
     app = Flask(__name__, 
                 template_folder='app/templates',
                 static_folder='app/static')
     app.config.from_object(config_class)
     
-    # Initialize Firebase
+    # Structured logs, written off the request path by a background thread
+    init_logging(app)
+    
+    # Initialize Firebase (in the background; see FIREBASE_INIT_ASYNC)
     init_firebase(app)
     
+    # Request/template timing for /metrics
+    init_monitoring(app)
+    
+    # Per-client rate limits and a concurrency cap on /api (API_RATE_LIMIT, API_MAX_CONCURRENCY)
+    init_admission(app)
+    
+    # Recommended poll intervals (X-Poll-Interval) on /api responses
+    poll_advisor.configure(default=app.config.get('POLL_DEFAULT_INTERVAL'),
+                           minimum=app.config.get('POLL_MIN_INTERVAL'),
+                           maximum=app.config.get('POLL_MAX_INTERVAL'))
+    
+    # Opt-in stack sampling: X-Profile: <DEBUG_TOKEN> or a PROFILE_SAMPLE_RATE share of requests
+    if app.config.get('DEBUG_TOKEN') or app.config.get('PROFILE_SAMPLE_RATE'):
+        request_profiler.configure(interval=app.config.get('PROFILE_INTERVAL'),
+                                   history=app.config.get('PROFILE_HISTORY'))
+        app.wsgi_app = ProfilingMiddleware(app.wsgi_app,
+                                           token=app.config.get('DEBUG_TOKEN'),
+                                           sample_rate=app.config.get('PROFILE_SAMPLE_RATE', 0.0))
+    
+    # Client addresses from X-Forwarded-For, for PROXY_FIX_X_FOR trusted proxies only
+    if app.config.get('PROXY_FIX_X_FOR'):
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['PROXY_FIX_X_FOR'])
+    
+    # url_for('static', ...) -> content-hashed, precompressed copies (python -m app.assets)
+    init_assets(app)
+    
+    # WebP floor plans and building images per width bucket, for srcset (IMAGE_*)
+    init_images(app)
+    
     # Register blueprints
     app.register_blueprint(main)
     app.register_blueprint(battery, url_prefix='/battery')
     app.register_blueprint(api, url_prefix='/api')
+    app.register_blueprint(monitoring)
     
+    startup_timer.mark('app_created')
     return app
 
 app = create_app()
@@ -0,0 +1,19 @@
+import pytest
+
+from benchmarks.fake_firebase import FakeDatabase
+from benchmarks.synthetic_building import generate_building
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    """A small synthetic building in FakeDatabase, with FirebaseClient reading it
+    through an empty read cache as if Firebase were up"""
+    from app.firebase import firebase_client, firebase_status
+    from app.firebase.snapshot import PathCache
+
+    monkeypatch.setattr(firebase_status, 'state', 'ready')
+    monkeypatch.setattr(firebase_client, 'snapshot_cache', PathCache())
+    fake = FakeDatabase(generate_building(floors=3, rooms_per_floor=4, appliances_per_room=2,
+                                          people=20, notifications=50))
+    with fake.installed():
+        yield fake
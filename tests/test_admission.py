@@ -0,0 +1,105 @@
+import logging
+import threading
+import time
+
+from flask import Blueprint, Flask
+import pytest
+from werkzeug.middleware.proxy_fix import ProxyFix
+
+from app import admission
+from app.admission import ConcurrencyLimiter, RateLimiter, TokenBucket, init_admission
+
+
+def test_token_bucket_refills_at_its_rate():
+    bucket = TokenBucket(rate=2.0, burst=2)
+    now = bucket.updated
+    assert bucket.take(now) == 0 and bucket.take(now) == 0
+    assert bucket.take(now) == pytest.approx(0.5)
+    assert bucket.take(now + 0.5) == 0
+
+
+def test_rate_limiter_keys_on_client_and_endpoint_with_overrides():
+    limiter = RateLimiter(per_minute=60, burst=1, overrides={'api.stream': [0, 0]})
+    assert limiter.check('a', 'api.battery') == 0
+    assert limiter.check('a', 'api.battery') > 0
+    assert limiter.check('b', 'api.battery') == 0
+    assert limiter.check('a', 'api.grid') == 0
+    assert all(limiter.check('a', 'api.stream') == 0 for _ in range(5))
+
+
+def test_rate_limiter_keeps_only_recent_buckets():
+    limiter = RateLimiter(per_minute=60, burst=1, max_buckets=2)
+    for client in 'abc':
+        limiter.check(client, 'api.battery')
+    assert len(limiter) == 2
+    assert limiter.check('a', 'api.battery') == 0     # dropped, so a fresh bucket
+
+
+def test_concurrency_limiter_queues_then_sheds():
+    limiter = ConcurrencyLimiter(limit=1, queue_size=1, queue_timeout=1.0)
+    assert limiter.acquire()
+    result = []
+    waiter = threading.Thread(target=lambda: result.append(limiter.acquire()))
+    waiter.start()
+    while limiter.waiting == 0:
+        time.sleep(0.001)
+    assert not limiter.acquire()        # the queue is full
+    limiter.release()
+    waiter.join()
+    assert result == [True]
+    assert limiter.info()['active'] == 1
+
+
+def test_concurrency_limiter_wait_times_out():
+    limiter = ConcurrencyLimiter(limit=1, queue_size=1, queue_timeout=0.01)
+    limiter.acquire()
+    assert not limiter.acquire()
+    assert limiter.waiting == 0
+
+
+@pytest.fixture
+def make_app(monkeypatch):
+    monkeypatch.setattr(admission, 'rate_limiter', RateLimiter())
+    monkeypatch.setattr(admission, 'concurrency_limiter', ConcurrencyLimiter())
+
+    def make_app(proxies=0, **config):
+        app = Flask(__name__)
+        app.config.update(API_RATE_LIMIT=60, API_RATE_BURST=1, API_RATE_LIMITS={}, API_MAX_CONCURRENCY=0)
+        app.config.update(config)
+        api = Blueprint('api', __name__)
+        api.route('/battery')(lambda: 'ok')
+        app.register_blueprint(api, url_prefix='/api')
+        init_admission(app)
+        if proxies:
+            app.wsgi_app = ProxyFix(app.wsgi_app, x_for=proxies)
+        return app.test_client()
+
+    return make_app
+
+
+def test_forwarded_for_cannot_dodge_the_rate_limit(make_app):
+    client = make_app()
+    assert client.get('/api/battery', headers={'X-Forwarded-For': '1.1.1.1'}).status_code == 200
+    response = client.get('/api/battery', headers={'X-Forwarded-For': '2.2.2.2'})
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == '1'
+
+
+def test_trusted_proxy_addresses_are_limited_separately(make_app):
+    client = make_app(proxies=1)
+    assert client.get('/api/battery', headers={'X-Forwarded-For': '1.1.1.1'}).status_code == 200
+    assert client.get('/api/battery', headers={'X-Forwarded-For': '2.2.2.2'}).status_code == 200
+    # Only the entry the trusted proxy appended counts, not what the client prepended
+    assert client.get('/api/battery', headers={'X-Forwarded-For': '9.9.9.9, 1.1.1.1'}).status_code == 429
+
+
+def test_rate_limits_without_a_proxy_count_log_a_warning(make_app, caplog):
+    with caplog.at_level(logging.WARNING, logger=admission.logger.name):
+        make_app()
+    assert 'PROXY_FIX_X_FOR' in caplog.text
+
+    caplog.clear()
+    with caplog.at_level(logging.WARNING, logger=admission.logger.name):
+        make_app(proxies=1, PROXY_FIX_X_FOR=1)
+        make_app(API_RATE_LIMIT=0)
+    assert 'PROXY_FIX_X_FOR' not in caplog.text
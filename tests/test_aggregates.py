@@ -0,0 +1,126 @@
+from app.firebase.aggregates import BuildingAggregates, floors_loaded, people_loaded
+from app.firebase.firebase_client import FirebaseClient
+from app.firebase.invalidation import invalidator
+from app.firebase.listeners import TreeMirror
+
+import pytest
+
+
+def floor(status='optimal', consumption=0, rooms=None):
+    return {'status': status, 'consumption': consumption, 'rooms': rooms or {}}
+
+
+def test_replacing_a_floor_subtracts_its_old_contribution():
+    aggregates = BuildingAggregates()
+    aggregates.set_floor('f1', floor('optimal', 10, {'r1': {'consumption': 4, 'occupied': True}}))
+    aggregates.set_floor('f2', floor('critical', 5))
+
+    aggregates.set_floor('f1', floor('sub-optimal', 7, {'r1': {'consumption': 1, 'occupied': False}}))
+    totals = aggregates.snapshot()
+    assert totals['floor_status_counts'] == {'optimal': 0, 'sub-optimal': 1, 'critical': 1}
+    assert totals['total_consumption'] == 12
+    assert totals['room_consumption'] == 1
+    assert totals['occupied_rooms'] == 0
+
+    aggregates.set_floor('f1', None)
+    totals = aggregates.snapshot()
+    assert totals['floor_count'] == 1
+    assert totals['floor_status_counts']['sub-optimal'] == 0
+    assert totals['room_count'] == 0
+    assert totals['floor_room_consumption'] == {}
+
+
+def test_room_and_person_updates_move_between_totals():
+    aggregates = BuildingAggregates()
+    aggregates.set_floor('f1', floor(rooms={'r1': {'consumption': 3, 'occupancy': 2}}))
+    aggregates.set_room('f1', 'r2', {'consumption': 'junk', 'occupied': True})
+    aggregates.set_room('f1', 'r1', {'consumption': 5, 'occupancy': 0})
+    totals = aggregates.snapshot()
+    assert (totals['room_consumption'], totals['room_occupants'], totals['occupied_rooms']) == (5, 1, 1)
+
+    aggregates.set_person('p1', {'locations': {'current': 'Lab'}})
+    aggregates.set_person('p2', {'locations': {'current': 'Lab'}})
+    aggregates.set_person('p1', {'locations': {'current': 'Kitchen'}})
+    aggregates.set_person('p2', None)
+    assert aggregates.snapshot()['occupancy'] == {'rooms': {'Kitchen': 1}, 'total': 1}
+
+
+def test_incremental_updates_match_a_full_reload():
+    tree = {'f1': floor('optimal', 10, {'r1': {'consumption': 4, 'occupied': True}}),
+            'f2': floor('critical', 5, {'r1': {'consumption': 2}})}
+    mirror = TreeMirror('floors', '/floors')
+    aggregates = BuildingAggregates()
+    mirror.subscribe(aggregates.on_floors_change)
+    mirror.apply_event('put', '/', tree)
+    mirror.apply_event('patch', '/f1', {'status': 'critical', 'consumption': 11})
+    mirror.apply_event('put', '/f2/rooms/r1/consumption', 9)
+    mirror.apply_event('put', '/f2/rooms/r2', {'consumption': 1, 'occupied': True})
+
+    reloaded = BuildingAggregates()
+    reloaded.load_floors(mirror.get())
+    assert aggregates.snapshot() == reloaded.snapshot()
+    assert aggregates.snapshot()['floor_status_counts']['critical'] == 2
+
+
+@pytest.fixture
+def unloaded():
+    for loaded in (floors_loaded, people_loaded):
+        loaded.invalidate([loaded.path])
+    yield
+    for loaded in (floors_loaded, people_loaded):
+        loaded.invalidate([loaded.path])
+
+
+def test_building_totals_load_once_without_listeners(fake_db, unloaded):
+    floors_path = '/energy_dashboard/floors'
+    first = FirebaseClient.get_building_totals()
+    second = FirebaseClient.get_building_totals()
+    assert first == second
+    assert first['floor_count'] == 3
+    assert fake_db.stats()['reads_by_path'] == {floors_path: 1, '/people': 1}
+
+    # A write reported to the invalidator makes the next call reload the floors only
+    invalidator.changed([f"{floors_path}/floor1/status"])
+    FirebaseClient.get_building_totals()
+    assert fake_db.stats()['reads_by_path'] == {floors_path: 2, '/people': 1}
+
+
+def test_building_totals_include_rooms_without_listeners(fake_db, unloaded):
+    totals = FirebaseClient.get_building_totals()
+    assert totals['room_count'] == 12
+    assert set(totals['floor_room_consumption']) == set(fake_db.data['energy_dashboard']['floors'])
+    assert totals['room_consumption'] > 0
+
+
+def test_building_totals_use_data_the_caller_already_read(fake_db, unloaded):
+    FirebaseClient.get_building_totals()
+    floors = FirebaseClient.get_floors()
+    locations = FirebaseClient.get_people_by_location()
+    fake_db.reset_stats()
+    totals = FirebaseClient.get_building_totals(floors=floors, locations=locations)
+    assert fake_db.stats()['reads'] == 0
+    assert totals['occupancy']['total'] == sum(len(names) for names in locations.values())
+
+    # Fresher summaries than the loaded tree win, while the rooms are kept
+    for floor in floors:
+        floor['status'] = 'critical'
+    totals = FirebaseClient.get_building_totals(floors=floors[1:], locations=locations)
+    assert totals['floor_status_counts']['critical'] == len(floors) - 1
+    assert totals['floor_count'] == len(floors) - 1
+    assert totals['room_count'] == 12
+
+
+def test_loaded_state_expires_and_ignores_unrelated_paths():
+    from app.firebase.invalidation import LoadedState
+    import time
+
+    loads = []
+    loaded = LoadedState('/energy_dashboard/floors', max_age=0.05)
+    assert loaded.ensure(lambda: loads.append(1)) is False
+    loaded.invalidate(['/energy_dashboard/notifications/abc'])
+    assert loaded.ensure(lambda: loads.append(1)) is True
+    loaded.invalidate(['/energy_dashboard'])
+    assert loaded.ensure(lambda: loads.append(1)) is False
+    time.sleep(0.06)
+    assert loaded.ensure(lambda: loads.append(1)) is False
+    assert len(loads) == 3
@@ -0,0 +1,78 @@
+import time
+
+import pytest
+
+from app.firebase.appliance_commands import ApplianceCommandBatcher
+from benchmarks.fake_firebase import FakeDatabase
+
+BASE = '/energy_dashboard/floors'
+LIGHT = f"{BASE}/f1/rooms/r1/appliances/light/state"
+FAN = f"{BASE}/f1/rooms/r1/appliances/fan/state"
+
+
+@pytest.fixture
+def fake():
+    fake = FakeDatabase({})
+    with fake.installed():
+        yield fake
+
+
+@pytest.fixture
+def batcher():
+    # The background flusher never gets to run; tests flush explicitly
+    return ApplianceCommandBatcher(BASE, flush_interval=60, debounce=0.05, max_delay=10)
+
+
+def test_rapid_toggles_coalesce_into_one_write(fake, batcher):
+    first = batcher.submit(LIGHT, 'on')
+    second, fan = batcher.submit_many([(LIGHT, 'off'), (FAN, 'on')])
+    assert first['status'] == 'queued' and first['id'] != second['id']
+
+    assert batcher.flush(force=True) == 2
+    assert fake.stats()['writes'] == 1
+    assert fake._read(LIGHT) == 'off' and fake._read(FAN) == 'on'
+    assert batcher.status(first['id'])['status'] == 'coalesced'
+    assert batcher.status(first['id'])['applied_state'] == 'off'
+    assert batcher.status(second['id'])['status'] == 'applied'
+    assert batcher.status(fan['id'])['status'] == 'applied'
+
+
+def test_commands_wait_until_the_path_is_quiet(fake, batcher):
+    batcher.submit(LIGHT, 'on')
+    assert batcher.flush() == 0
+    time.sleep(0.06)
+    assert batcher.flush() == 1
+
+
+def test_a_busy_path_is_written_once_overdue(fake, batcher):
+    batcher.configure(debounce=10, max_delay=0.05)
+    batcher.submit(LIGHT, 'on')
+    time.sleep(0.06)
+    batcher.submit(LIGHT, 'off')
+    assert batcher.flush() == 1
+    assert fake._read(LIGHT) == 'off'
+
+
+def test_a_path_outside_the_base_fails_alone(fake, batcher):
+    bad = batcher.submit('/elsewhere/state', 'on')
+    good = batcher.submit(LIGHT, 'on')
+    batcher.flush(force=True)
+    assert batcher.status(bad['id'])['status'] == 'failed'
+    assert 'outside' in batcher.status(bad['id'])['error']
+    assert batcher.status(good['id'])['status'] == 'applied'
+
+
+def test_a_failed_write_fails_every_command(fake, batcher, monkeypatch):
+    def fail(self, value):
+        raise ConnectionError('offline')
+    monkeypatch.setattr(type(fake.reference('/')), 'update', fail)
+    acks = batcher.submit_many([(LIGHT, 'on'), (LIGHT, 'off')])
+    batcher.flush(force=True)
+    assert [batcher.status(ack['id'])['status'] for ack in acks] == ['failed', 'failed']
+
+
+def test_acks_expire_beyond_the_history():
+    batcher = ApplianceCommandBatcher(BASE, flush_interval=60, history=2)
+    acks = batcher.submit_many([(LIGHT, 'on'), (LIGHT, 'off'), (LIGHT, 'on')])
+    assert batcher.status(acks[0]['id']) is None
+    assert batcher.status(acks[2]['id'])['status'] == 'queued'
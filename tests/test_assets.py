@@ -0,0 +1,71 @@
+import gzip
+
+from flask import Flask, url_for
+import pytest
+
+from app import assets
+from app.assets import AssetManifest, build, init_assets, is_stale, load_manifest
+
+
+@pytest.fixture
+def static(tmp_path):
+    (tmp_path / 'css').mkdir()
+    (tmp_path / 'css' / 'src').mkdir()
+    (tmp_path / 'css' / 'style.css').write_text('body { color: red; }\n' * 50)
+    (tmp_path / 'css' / 'src' / 'input.css').write_text('/* build input */')
+    (tmp_path / 'logo.png').write_bytes(b'\x89PNG' + bytes(100))
+    return tmp_path
+
+
+def test_build_fingerprints_and_compresses_text_files(static):
+    manifest = build(str(static))
+    assert set(manifest['assets']) == {'css/style.css', 'logo.png'}
+    css = manifest['assets']['css/style.css']
+    assert css['path'].startswith('dist/css/style.') and css['path'].endswith('.css')
+    assert 'gzip' in css['encodings']
+    compressed = (static / (css['path'] + '.gz')).read_bytes()
+    assert gzip.decompress(compressed) == (static / 'css' / 'style.css').read_bytes()
+    assert manifest['assets']['logo.png']['encodings'] == []
+
+
+def test_changed_and_new_files_make_the_build_stale(static):
+    assert is_stale(str(static))
+    build(str(static))
+    assert not is_stale(str(static))
+
+    (static / 'css' / 'style.css').write_text('body { color: blue; }')
+    assert 'css/style.css' not in load_manifest(str(static))
+    assert is_stale(str(static))
+
+    build(str(static))
+    (static / 'new.js').write_text('console.log(1)')
+    assert is_stale(str(static))
+
+
+def test_unreadable_manifest_means_nothing_is_fingerprinted(static):
+    build(str(static))
+    (static / 'dist' / 'manifest.json').write_text('{not json')
+    assert load_manifest(str(static)) == {}
+    assert AssetManifest().load(str(static)) == 0
+
+
+def test_url_for_and_serving_use_the_manifest(static, monkeypatch):
+    monkeypatch.setattr(assets, 'asset_manifest', AssetManifest())
+    build(str(static))
+    app = Flask(__name__, static_folder=str(static), static_url_path='/static')
+    init_assets(app)
+    with app.test_request_context():
+        url = url_for('static', filename='css/style.css')
+        assert url.startswith('/static/dist/css/style.')
+        assert url_for('static', filename='missing.css') == '/static/missing.css'
+
+    response = app.test_client().get(url, headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.headers['Cache-Control'] == assets.IMMUTABLE
+    assert 'Accept-Encoding' in response.headers['Vary']
+    response.close()
+
+    plain = app.test_client().get(url)
+    assert 'Content-Encoding' not in plain.headers
+    assert plain.data == (static / 'css' / 'style.css').read_bytes()
+    plain.close()
@@ -0,0 +1,74 @@
+import asyncio
+import time
+
+from flask import Flask
+import pytest
+
+from app.asgi import stream_events
+from app.firebase.change_feed import ChangeFeed, change_feed
+from app.firebase.listeners import TreeMirror
+from app.routes.api_routes import api
+
+
+def test_changes_fan_out_to_every_subscription():
+    feed = ChangeFeed()
+    mirror = TreeMirror('floors', '/floors')
+    mirror.subscribe(feed.on_mirror_change)
+    first, second = feed.subscribe(), feed.subscribe()
+    mirror.apply_event('put', '/f1/status', 'critical')
+    expected = {'event': 'floors', 'path': 'f1/status', 'version': 1}
+    assert first.get(timeout=0) == second.get(timeout=0) == expected
+    second.close()
+    assert len(feed) == 1
+
+
+def test_a_slow_subscriber_gets_one_resync_event():
+    feed = ChangeFeed(maxsize=2)
+    subscription = feed.subscribe()
+    mirror = TreeMirror('people', '/people')
+    for i in range(3):
+        feed.on_mirror_change(mirror, (str(i),), None, {})
+    assert subscription.get(timeout=0) == {'event': 'resync'}
+    assert subscription.get(timeout=0) is None
+
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    app.register_blueprint(api, url_prefix='/api')
+    return app.test_client()
+
+
+def test_wsgi_stream_needs_a_threaded_server(client):
+    assert client.get('/api/stream').status_code == 503
+
+
+def test_wsgi_stream_under_a_threaded_server(client):
+    response = client.get('/api/stream', buffered=False, environ_overrides={'wsgi.multithread': True})
+    try:
+        assert response.status_code == 200
+        assert next(response.response) == b'retry: 5000\n\n'
+    finally:
+        response.close()
+
+
+def test_asgi_stream_stops_as_soon_as_the_client_leaves():
+    sent = []
+
+    async def run():
+        messages = asyncio.Queue()
+
+        async def send(message):
+            sent.append(message)
+
+        task = asyncio.create_task(stream_events({'type': 'http'}, messages.get, send))
+        await asyncio.sleep(0.05)
+        assert len(change_feed) == 1
+        await messages.put({'type': 'http.disconnect'})
+        await asyncio.wait_for(task, 1)
+
+    start = time.monotonic()
+    asyncio.run(run())
+    assert time.monotonic() - start < 1
+    assert len(change_feed) == 0
+    assert sent[0]['status'] == 200
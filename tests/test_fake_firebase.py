@@ -0,0 +1,44 @@
+from benchmarks.bench_routes import check_regressions, percentile
+from benchmarks.fake_firebase import FakeDatabase
+
+
+def test_queries_order_bound_and_limit_like_firebase():
+    fake = FakeDatabase({'items': {'10': {'n': 3}, '9': {'n': 1}, 'b': {'n': 2}, 'a': {'n': 5}}})
+    items = fake.reference('/items')
+    assert list(items.order_by_key().get()) == ['9', '10', 'a', 'b']
+    assert list(items.order_by_key().end_at('a').limit_to_last(2).get()) == ['10', 'a']
+    assert list(items.order_by_child('n').start_at(2).limit_to_first(2).get()) == ['b', '10']
+    assert items.child('missing').get() is None
+
+
+def test_reads_and_writes_are_counted_and_copied():
+    fake = FakeDatabase({'a': {'b': 1}})
+    value = fake.reference('/a').get()
+    value['b'] = 2
+    assert fake.reference('/a/b').get() == 1
+    fake.reference('/a').update({'c/d': 3})
+    stats = fake.stats()
+    assert (stats['reads'], stats['writes']) == (2, 1)
+    assert stats['bytes_down'] == len('{"b":1}') + 1
+    assert fake.data == {'a': {'b': 1, 'c': {'d': 3}}}
+
+
+def test_listeners_see_writes_below_and_above_them():
+    fake = FakeDatabase({'floors': {'f1': {'status': 'ok'}}})
+    events = []
+    fake.reference('/floors').listen(lambda event: events.append((event.event_type, event.path, event.data)))
+    fake.reference('/floors/f1/status').set('critical')
+    fake.reference('/').update({'floors': {'f2': {}}})
+    assert events == [('put', '/', {'f1': {'status': 'ok'}}),
+                      ('put', '/f1/status', 'critical'),
+                      ('put', '/', {'f2': {}})]
+
+
+def test_percentile_and_regression_check():
+    assert percentile([5, 1, 4, 2, 3], 50) == 3
+    assert percentile([], 95) == 0.0
+    baseline = {'/': {'p95_ms': 2.0, 'firebase_calls': 2, 'firebase_bytes': 1000}}
+    ok = {'route': '/', 'p95_ms': 2.5, 'firebase_calls': 2, 'firebase_bytes': 1050}
+    assert check_regressions([ok], baseline, tolerance=1.5, slack_ms=0.5) == []
+    slow = dict(ok, p95_ms=4.0, firebase_calls=3)
+    assert len(check_regressions([slow], baseline, tolerance=1.5, slack_ms=0.5)) == 2
@@ -0,0 +1,77 @@
+import os
+
+from flask import Flask
+import pytest
+
+from app import images
+from app.images import ImageVariants, serve_variant
+
+Image = pytest.importorskip('PIL.Image')
+if not images.ImageVariants().available:
+    pytest.skip('Pillow was built without WebP support', allow_module_level=True)
+
+
+@pytest.fixture
+def static(tmp_path):
+    (tmp_path / 'images').mkdir()
+    Image.new('RGB', (700, 350), 'orange').save(tmp_path / 'images' / 'plan.png')
+    Image.new('RGB', (50, 50), 'red').save(tmp_path / 'secret.png')
+    return tmp_path
+
+
+@pytest.fixture
+def variants(tmp_path):
+    return ImageVariants(cache_dir=str(tmp_path / 'cache'), widths=(320, 480, 640, 960))
+
+
+def test_widths_stop_at_the_source_width(static, variants):
+    source = str(static / 'images' / 'plan.png')
+    assert variants.widths_for(source) == [320, 480, 640, 700]
+    assert variants.bucket(source, 500) == 640
+    assert variants.bucket(source, 2000) == 700
+
+
+def test_variants_are_resized_webp_and_never_upscaled(static, variants):
+    source = str(static / 'images' / 'plan.png')
+    with Image.open(variants.variant(source, 300)) as image:
+        assert (image.format, image.size) == ('WEBP', (320, 160))
+    with Image.open(variants.variant(source, 1200)) as image:
+        assert image.size == (700, 350)
+    assert variants.info()['variants'] == 2
+
+
+def test_least_recently_served_variants_are_evicted(static, variants, tmp_path):
+    source = str(static / 'images' / 'plan.png')
+    sizes = {width: os.path.getsize(ImageVariants(cache_dir=str(tmp_path / 'sizes')).variant(source, width))
+             for width in (320, 480, 640)}
+    variants.max_bytes = sizes[320] + sizes[640]
+    small = variants.variant(source, 320)
+    medium = variants.variant(source, 480)
+    variants.variant(source, 320)           # served again, so 480 is now the oldest
+    large = variants.variant(source, 640)
+    assert [os.path.exists(path) for path in (small, medium, large)] == [True, False, True]
+    assert variants.info()['bytes'] == sizes[320] + sizes[640]
+
+
+def test_existing_variants_are_picked_up_from_disk(static, variants):
+    source = str(static / 'images' / 'plan.png')
+    path = variants.variant(source, 320)
+    again = ImageVariants(cache_dir=variants.cache_dir)
+    assert again.info()['variants'] == 1
+    assert again.variant(source, 320) == path
+
+
+def test_only_images_under_static_images_are_served(static, variants, monkeypatch):
+    monkeypatch.setattr(images, 'image_variants', variants)
+    app = Flask(__name__, static_folder=str(static))
+    app.add_url_rule('/img/<int:width>/<path:filename>', view_func=serve_variant)
+    client = app.test_client()
+
+    response = client.get('/img/480/plan.png')
+    assert response.status_code == 200
+    assert response.mimetype == 'image/webp'
+    response.close()
+    for filename in ('../secret.png', '%2e%2e/secret.png', 'missing.png'):
+        assert client.get(f'/img/480/{filename}').status_code == 404
+    with app.test_request_context():
+        assert images._source_path('../secret.png') is None
@@ -0,0 +1,13 @@
+from benchmarks import import_budget
+
+
+def test_import_run_defers_heavy_dependencies_and_fits_the_budget():
+    imports = import_budget.measure('run')
+    assert any(name == 'run' for name, _, _ in imports)
+    assert import_budget.check(imports) == []
+
+
+def test_check_reports_eager_imports_and_overruns():
+    imports = [('run', 100000, 700000), ('firebase_admin.db', 600000, 600000)]
+    failures = import_budget.check(imports, budget_ms=500)
+    assert failures == ['imported eagerly: firebase_admin.db', 'total 700.0 ms is over the 500 ms budget']
@@ -0,0 +1,86 @@
+import time
+
+import pytest
+
+from app.firebase.invalidation import FileBus, Invalidator, LoadedState, LocalBus, create_bus
+
+
+@pytest.fixture
+def pair():
+    first, second = Invalidator(batch_interval=0), Invalidator(batch_interval=0)
+    first_bus, second_bus = LocalBus('test-pair'), LocalBus('test-pair')
+    first.configure(first_bus)
+    second.configure(second_bus)
+    evicted = {first: [], second: []}
+    first.add_handler(evicted[first].extend)
+    second.add_handler(evicted[second].extend)
+    yield first, second, evicted
+    first_bus.close()
+    second_bus.close()
+
+
+def wait_for(condition, timeout=2):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_changes_are_evicted_locally_and_broadcast(pair):
+    first, second, evicted = pair
+    first.changed(['/floors/f1', ''])
+    assert evicted[first] == ['/floors/f1']
+    assert wait_for(lambda: evicted[second] == ['/floors/f1'])
+    # The sender skips its own message
+    assert evicted[first] == ['/floors/f1']
+
+
+def test_duplicate_and_reordered_versions_are_ignored(pair):
+    first, second, evicted = pair
+    second._on_message({'origin': 'other', 'version': 2, 'paths': ['/a']})
+    second._on_message({'origin': 'other', 'version': 2, 'paths': ['/b']})
+    second._on_message({'origin': 'other', 'version': 1, 'paths': ['/c']})
+    second._on_message({'origin': 'another', 'version': 1, 'paths': ['/d']})
+    assert evicted[second] == ['/a', '/d']
+
+
+def test_handlers_are_registered_once():
+    invalidator = Invalidator()
+    evicted = []
+    invalidator.add_handler(evicted.extend)
+    invalidator.add_handler(evicted.extend)
+    invalidator.changed(['/a'])
+    assert evicted == ['/a']
+
+
+def test_file_bus_delivers_new_lines(tmp_path):
+    path = str(tmp_path / 'bus.jsonl')
+    FileBus(path).send({'origin': 'old', 'version': 1, 'paths': ['/old']})
+    received = []
+    bus = FileBus(path, poll_interval=0.01)
+    bus.subscribe(received.append)
+    bus.start()
+    with open(path, 'a') as f:
+        f.write('not json\n')
+    bus.send({'origin': 'o', 'version': 1, 'paths': ['/new']})
+    assert wait_for(lambda: received)
+    assert [message['paths'] for message in received] == [['/new']]
+
+
+def test_create_bus_rejects_unknown_schemes():
+    assert isinstance(create_bus('local://test-create'), LocalBus)
+    with pytest.raises(ValueError):
+        create_bus('redis://localhost')
+
+
+def test_loaded_state_goes_stale_on_overlapping_changes():
+    loaded = LoadedState('/energy_dashboard/floors', max_age=0)
+    assert loaded.ensure(lambda: None) is False
+    assert loaded.ensure(lambda: None) is True
+    loaded.invalidate(['/energy_dashboard/people'])
+    assert loaded.current()
+    loaded.invalidate(['/energy_dashboard/floors/f1/rooms'])
+    assert not loaded.current()
+    loaded.ensure(lambda: None)
+    loaded.invalidate(['/'])
+    assert not loaded.current()
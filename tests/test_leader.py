@@ -0,0 +1,65 @@
+import os
+import threading
+
+import pytest
+
+import app.firebase as firebase
+from app.firebase import listeners, notification_rules
+from app.firebase.invalidation import invalidator
+from app.firebase.leader import LeaderElection
+from app.firebase.listeners import TreeMirror
+
+
+def test_only_one_candidate_holds_the_lock(tmp_path):
+    lock_path = str(tmp_path / 'leader.lock')
+    first, second = LeaderElection(), LeaderElection()
+    first.lock_path = second.lock_path = lock_path
+    assert first.try_acquire()
+    assert not second.try_acquire()
+    assert second.leader_pid() == os.getpid()
+    assert second.info()['is_leader'] is False
+    os.close(first._fd)
+    assert second.try_acquire()
+
+
+def test_campaign_calls_on_elected_once_it_wins(tmp_path):
+    elected = threading.Event()
+    election = LeaderElection(retry_interval=0.01)
+    election.start(str(tmp_path / 'leader.lock'), elected.set)
+    assert elected.wait(2)
+    assert election.is_leader
+
+
+def test_subscribing_twice_registers_once():
+    mirror = TreeMirror('battery', '/battery')
+    calls = []
+    callback = lambda *args: calls.append(args)
+    mirror.subscribe(callback)
+    mirror.subscribe(callback)
+    mirror.apply_event('put', '/', {'level': 50})
+    assert len(calls) == 1
+
+
+@pytest.fixture
+def fresh_listening_state(monkeypatch):
+    mirrors = {name: TreeMirror(name, mirror.path) for name, mirror in listeners.mirrors.items()}
+    monkeypatch.setattr(listeners, 'mirrors', mirrors)
+    monkeypatch.setattr(listeners, 'start_listeners', lambda: None)
+    monkeypatch.setattr(notification_rules, 'notification_engine', notification_rules.NotificationRuleEngine())
+    monkeypatch.setattr(firebase, 'snapshot_writer', None)
+    return mirrors
+
+
+def test_becoming_leader_again_does_not_duplicate_subscriptions(fresh_listening_state, tmp_path):
+    class App:
+        config = {'SHARED_SNAPSHOT_PATH': str(tmp_path / 'snapshot.shm'), 'SHARED_SNAPSHOT_SIZE': 4096}
+
+    firebase._start_listening(App)
+    writer = firebase.snapshot_writer
+    firebase._become_leader(App)
+
+    assert firebase.snapshot_writer is writer
+    assert len(notification_rules.notification_engine._sinks) == 1
+    for mirror in fresh_listening_state.values():
+        assert mirror._subscribers.count(invalidator.on_mirror_change) == 1
+        assert mirror._subscribers.count(writer._on_change) == 1
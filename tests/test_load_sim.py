@@ -0,0 +1,29 @@
+from flask import Flask
+
+from benchmarks.fake_firebase import FakeDatabase
+from benchmarks.load_sim import PAGES, Kiosk, Stats, run_fleet, start_server
+
+
+def test_kiosks_pick_known_pages_deterministically():
+    picks = [Kiosk('', Stats(), 0, 1, 1, 3, 4, seed=7).pick_page() for _ in range(2)]
+    assert picks[0] == picks[1]
+    page, params = picks[0]
+    assert page in PAGES
+    assert params['floor'] in ('floor1', 'floor2', 'floor3')
+
+
+def test_fleet_polls_and_reports():
+    app = Flask(__name__)
+    app.add_url_rule('/<path:anything>', 'any', lambda anything: 'ok')
+    app.add_url_rule('/', 'root', lambda: 'ok')
+    server, base_url = start_server(app)
+    try:
+        # 30 s poll timers compressed 600x: several polls per kiosk in half a second
+        result = run_fleet(base_url, FakeDatabase({}), clients=3, duration=0.5, speedup=600, dwell=600,
+                           floors=3, rooms_per_floor=4, seed=0)
+    finally:
+        server.shutdown()
+    assert result['clients'] == 3
+    assert result['errors'] == 0
+    assert result['requests'] == result['page_requests'] + result['api_requests'] >= 3
+    assert result['firebase_reads'] == 0
@@ -0,0 +1,51 @@
+import json
+import logging
+import queue
+
+from app.monitoring.logs import BackgroundQueueHandler, JsonFormatter, RateLimitFilter, TextFormatter
+
+
+def record(message='hello', lineno=10, args=None):
+    return logging.LogRecord('app.test', logging.WARNING, 'app/test.py', lineno, message, args, None)
+
+
+def test_rate_limit_is_per_call_site_and_reports_suppressed(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr('app.monitoring.logs.time.monotonic', lambda: now[0])
+    limiter = RateLimitFilter(limit=2, interval=10.0)
+
+    assert [limiter.filter(record()) for _ in range(4)] == [True, True, False, False]
+    assert limiter.filter(record(lineno=11))
+
+    now[0] += 10.0
+    first = record()
+    assert limiter.filter(first)
+    assert first.suppressed == 2
+
+
+def test_rate_limit_zero_lets_everything_through():
+    limiter = RateLimitFilter(limit=0)
+    assert all(limiter.filter(record()) for _ in range(100))
+
+
+def test_queue_handler_truncates_and_drops_when_full():
+    log_queue = queue.Queue(maxsize=1)
+    handler = BackgroundQueueHandler(log_queue, max_length=5)
+    handler.emit(record('%s', args=('abcdefgh',)))
+    handler.emit(record('second'))
+
+    queued = log_queue.get_nowait()
+    assert queued.msg == 'abcde... [3 chars truncated]'
+    assert queued.args is None
+    assert handler.dropped == 1
+
+
+def test_formatters_include_request_fields():
+    entry = record('done')
+    entry.request_id = 'abc'
+    entry.suppressed = 3
+    parsed = json.loads(JsonFormatter().format(entry))
+    assert parsed['message'] == 'done'
+    assert parsed['request_id'] == 'abc'
+    assert parsed['suppressed'] == 3
+    assert TextFormatter().format(entry).endswith('[request_id=abc suppressed=3]')
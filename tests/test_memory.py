@@ -0,0 +1,52 @@
+import sys
+import threading
+
+from app.firebase.snapshot import PathCache
+from app.monitoring.memory import MemoryTracker, deep_size
+
+
+def test_deep_size_follows_containers_and_counts_shared_objects_once():
+    shared = ['x' * 1000]
+    seen = set()
+    first = deep_size({'a': shared}, seen)
+    second = deep_size({'b': shared}, seen)
+    assert first > 1000
+    assert second < 1000
+
+
+def test_deep_size_skips_locks_and_threads():
+    lock, thread = threading.Lock(), threading.current_thread()
+    assert deep_size([lock, thread]) == sys.getsizeof([lock, thread]) + sys.getsizeof(lock)
+
+
+def test_growth_compares_latest_with_previous_and_oldest(monkeypatch):
+    tracker = MemoryTracker(interval=0, history=3)
+    sizes = iter([100, 150, 400])
+    monkeypatch.setattr(tracker, 'measure', lambda: {
+        'ts': 0.0, 'rss_bytes': None, 'gc_objects': 10, 'structures': {'room_index': next(sizes)}})
+    tracker.sample()
+    assert tracker.growth() is None
+    tracker.sample()
+    tracker.sample()
+    growth = tracker.growth()
+    assert growth['since_previous']['structures'] == {'room_index': 250}
+    assert growth['since_oldest']['structures'] == {'room_index': 300}
+    assert growth['since_oldest']['rss_bytes'] is None
+
+
+def test_measure_covers_the_retained_structures(fake_db):
+    structures = MemoryTracker().measure()['structures']
+    assert 'room_index' in structures
+    assert 'trace_store' in structures
+
+
+def test_each_cached_path_and_query_is_sized(monkeypatch):
+    cache = PathCache()
+    cache.put('/energy_dashboard/floors', {'f1': {'name': 'x' * 5000}})
+    cache.put('/energy_dashboard/notifications', {'n1': {}}, query='limit=10')
+    monkeypatch.setattr('app.firebase.snapshot.snapshot_cache', cache)
+    structures = MemoryTracker().measure()['structures']
+    assert structures['cache:/energy_dashboard/floors'] > 5000
+    assert 'cache:/energy_dashboard/notifications?limit=10' in structures
+    # The cache's own total no longer counts the entries again
+    assert structures['snapshot_cache'] < 5000
@@ -0,0 +1,68 @@
+from app.monitoring import metrics
+from app.monitoring.metrics import Counter, Histogram, PayloadSizer, path_label, payload_size
+from app.monitoring.usage import UsageLedger
+
+
+def test_path_label_collapses_ids():
+    assert path_label('/energy_dashboard/floors/f1/rooms/kitchen') == '/energy_dashboard/floors/{id}/rooms/{id}'
+    assert path_label('/energy_dashboard/battery') == '/energy_dashboard/battery'
+    assert path_label(None) == '/'
+
+
+def test_counter_and_histogram_render():
+    counter = Counter('test_reads_total', 'Reads', ('path',))
+    counter.inc(2, '/a')
+    histogram = Histogram('test_seconds', 'Latency', buckets=(0.1, 1.0))
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+    try:
+        assert 'test_reads_total{path="/a"} 2' in counter.render()
+        text = histogram.render()
+        assert 'test_seconds_bucket{le="0.1"} 1' in text
+        assert 'test_seconds_bucket{le="+Inf"} 2' in text
+        assert histogram.value() == (2, 0.55)
+    finally:
+        metrics.REGISTRY.remove(counter)
+        metrics.REGISTRY.remove(histogram)
+
+
+def test_sizer_measures_every_nth_payload_per_label():
+    sizer = PayloadSizer(every=3)
+    small, large = {'a': 1}, {'a': 'x' * 100}
+    sizes = [sizer.size('/p', small)] + [sizer.size('/p', large) for _ in range(3)]
+    # The first large payloads reuse the small measurement until the next sample
+    assert sizes == [payload_size(small)] * 3 + [payload_size(large)]
+    # Labels are sampled independently
+    assert sizer.size('/q', large) == payload_size(large)
+
+
+def test_sizer_measures_scalars_and_exact_mode():
+    sizer = PayloadSizer(every=100)
+    sizer.size('/p', {'a': 1})
+    assert sizer.size('/p', 'x' * 10) == payload_size('x' * 10)
+    assert sizer.size('/p', None) == 0
+
+    exact = PayloadSizer(every=1)
+    assert [exact.size('/p', {'a': 'x' * n}) for n in (1, 5)] == [payload_size({'a': 'x'}), payload_size({'a': 'xxxxx'})]
+
+
+class FakeRef:
+    path = '/energy_dashboard/floors'
+
+    def __init__(self, *payloads):
+        self.payloads = list(payloads)
+
+    def get(self):
+        return self.payloads.pop(0)
+
+
+def test_reads_are_measured_exactly_for_the_budget(monkeypatch):
+    usage = UsageLedger()
+    monkeypatch.setattr(metrics, 'usage_ledger', usage)
+    monkeypatch.setattr(metrics.payload_sizer, 'every', 16)
+    small, large = {'a': 1}, {'a': 'x' * 100}
+    ref = FakeRef(small, large)
+    metrics.timed_get(ref)
+    metrics.timed_get(ref)
+    assert usage.totals() == (2, payload_size(small) + payload_size(large))
+
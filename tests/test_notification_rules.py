@@ -0,0 +1,79 @@
+import json
+import time
+
+import pytest
+
+from app.config import Config
+from app.firebase.listeners import TreeMirror
+from app.firebase.notification_rules import NotificationRuleEngine, read_rules
+
+LOW_BATTERY = {"id": "low", "entity": "battery", "when": [{"field": "percentage", "op": "<", "value": 20}],
+               "message": "Battery at {percentage}%", "cooldown": 0}
+
+
+def engine_with(*rules):
+    engine = NotificationRuleEngine()
+    engine.load_rules(list(rules))
+    return engine
+
+
+def test_alerts_are_edge_triggered():
+    engine = engine_with(LOW_BATTERY)
+    assert len(engine.evaluate('battery', 'battery', {'percentage': 10})) == 1
+    # Still low: no repeat until the condition has cleared
+    assert engine.evaluate('battery', 'battery', {'percentage': 9}) == []
+    assert engine.evaluate('battery', 'battery', {'percentage': 50}) == []
+    assert len(engine.evaluate('battery', 'battery', {'percentage': '15'})) == 1
+
+
+def test_cooldown_suppresses_refiring():
+    engine = engine_with(dict(LOW_BATTERY, cooldown=0.05))
+    assert engine.evaluate('battery', 'battery', {'percentage': 10})
+    engine.evaluate('battery', 'battery', {'percentage': 50})
+    assert engine.evaluate('battery', 'battery', {'percentage': 10}) == []
+    engine.evaluate('battery', 'battery', {'percentage': 50})
+    time.sleep(0.06)
+    assert engine.evaluate('battery', 'battery', {'percentage': 10})
+
+
+def test_becomes_fires_only_on_the_transition():
+    engine = engine_with({"id": "crit", "entity": "floor", "cooldown": 0,
+                          "when": [{"field": "status", "op": "becomes", "value": "critical"}]})
+    engine.evaluate('floor', 'f1', {'status': 'optimal'})
+    assert engine.evaluate('floor', 'f1', {'status': 'critical', 'name': 'x'}, {'name'}) == []
+    assert len(engine.evaluate('floor', 'f1', {'status': 'CRITICAL'}, {'status'})) == 1
+    engine.evaluate('floor', 'f1', {'status': 'optimal'}, {'status'})
+    assert len(engine.evaluate('floor', 'f1', {'status': 'critical'}, {'status'})) == 1
+
+
+def test_initial_sync_primes_without_notifying():
+    engine = engine_with(LOW_BATTERY)
+    mirror = TreeMirror('battery', '/energy_dashboard/battery')
+    mirror.subscribe(engine.on_singleton_change)
+    mirror.apply_event('put', '/', {'percentage': 5})
+    assert engine.evaluate('battery', 'battery', {'percentage': 5}) == []
+
+
+def test_default_battery_rule_fires_on_raw_level_field():
+    engine = NotificationRuleEngine()
+    engine.load_rules(Config.NOTIFICATION_RULES)
+    mirror = TreeMirror('battery', '/energy_dashboard/battery')
+    mirror.subscribe(engine.on_singleton_change)
+    fired = []
+    engine.evaluate = lambda *args, _evaluate=engine.evaluate, **kwargs: fired.extend(_evaluate(*args, **kwargs))
+    mirror.apply_event('put', '/', {'level': 60})
+    mirror.apply_event('put', '/level', 12)
+    assert [notification['message'] for notification in fired] == ["Battery level is low (12%)"]
+
+
+def test_read_rules_reports_bad_files(tmp_path):
+    good = tmp_path / 'rules.json'
+    good.write_text(json.dumps([LOW_BATTERY]))
+    assert read_rules(str(good)) == [LOW_BATTERY]
+
+    for content in ('{not json', json.dumps({"id": "x"}), json.dumps([{"id": "x"}]),
+                    json.dumps([dict(LOW_BATTERY, when=[{"field": "a", "op": "~", "value": 1}])])):
+        bad = tmp_path / 'bad.json'
+        bad.write_text(content)
+        with pytest.raises(ValueError):
+            read_rules(str(bad))
@@ -0,0 +1,34 @@
+from app.firebase.firebase_client import FirebaseClient
+
+
+def test_pages_cover_every_notification_once_newest_first(fake_db):
+    seen, before, pages = [], None, 0
+    while True:
+        page, before = FirebaseClient.get_notifications(limit=20, before=before)
+        seen.extend(notification['id'] for notification in page)
+        pages += 1
+        if before is None:
+            break
+    assert pages == 3
+    assert seen == sorted(fake_db.data['energy_dashboard']['notifications'], reverse=True)
+
+
+def test_pages_read_a_bounded_number_of_items(fake_db):
+    FirebaseClient.get_notifications(limit=5)
+    fake_db.reset_stats()
+    page, before = FirebaseClient.get_notifications(limit=5, before='-N000000000040')
+    assert [notification['id'] for notification in page][0] == '-N000000000039'
+    assert fake_db.stats()['bytes_down'] < 2000
+
+
+def test_marking_read_keeps_the_unread_counter_in_step(fake_db):
+    notifications = fake_db.data['energy_dashboard']['notifications']
+    unread = FirebaseClient.get_unread_count()
+    key = next(key for key, notification in notifications.items() if not notification['read'])
+
+    assert FirebaseClient.mark_notification_read(key)
+    assert FirebaseClient.mark_notification_read(key)     # already read: counted once
+    assert FirebaseClient.get_unread_count() == unread - 1
+    assert FirebaseClient.mark_notification_read(key, read=False)
+    assert FirebaseClient.get_unread_count() == unread
+    assert not FirebaseClient.mark_notification_read('-missing')
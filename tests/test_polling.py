@@ -0,0 +1,69 @@
+from flask import Flask, jsonify
+import pytest
+
+from app import polling
+from app.admission import ConcurrencyLimiter
+from app.monitoring.usage import UsageLedger
+from app.polling import PollAdvisor, add_poll_headers
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr('app.polling.time.monotonic', lambda: now[0])
+    monkeypatch.setattr(polling, 'concurrency_limiter', ConcurrencyLimiter(limit=4))
+    monkeypatch.setattr(polling, 'usage_ledger', UsageLedger())
+    return now
+
+
+def test_unchanged_urls_get_the_default_then_half_their_quiet_time(clock):
+    advisor = PollAdvisor(default=30, minimum=5, maximum=300)
+    assert advisor.observe('/api/grid', b'a') == 30
+    clock[0] = 100
+    assert advisor.observe('/api/grid', b'a') == 50
+
+
+def test_interval_follows_the_average_time_between_changes(clock):
+    advisor = PollAdvisor(default=30, minimum=5, maximum=300, smoothing=0.5)
+    advisor.observe('/api/battery', b'1')
+    clock[0] = 20
+    assert advisor.observe('/api/battery', b'2') == 10
+    clock[0] = 60
+    assert advisor.observe('/api/battery', b'3') == 15      # mean of 20 s and 40 s gaps
+    clock[0] = 61
+    assert advisor.observe('/api/battery', b'3') == 15
+
+
+def test_interval_is_clamped_and_urls_are_bounded(clock):
+    advisor = PollAdvisor(default=30, minimum=10, maximum=60, max_urls=2)
+    for url in ('/a', '/b', '/c'):
+        advisor.observe(url, b'x')
+    assert len(advisor) == 2
+    clock[0] = 1000
+    assert advisor.observe('/c', b'x') == 60
+    assert advisor.observe('/a', b'x') == 30        # dropped, so seen afresh
+    clock[0] = 1001
+    assert advisor.observe('/a', b'y') == 10
+
+
+def test_load_stretches_the_interval(clock):
+    advisor = PollAdvisor(default=30, minimum=5, maximum=300)
+    polling.concurrency_limiter.active = 2
+    assert advisor.load_factor() == 2.5
+    polling.usage_ledger.configure(read_budget=1)
+    polling.usage_ledger.record('/floors', 1, 'x')
+    assert advisor.load_factor() == 5.0
+    assert advisor.observe('/api/floors', b'x') == 150
+
+
+def test_poll_headers_add_retry_after_when_busy(clock, monkeypatch):
+    monkeypatch.setattr(polling, 'poll_advisor', PollAdvisor(default=30, minimum=5))
+    app = Flask(__name__)
+    with app.test_request_context():
+        response = add_poll_headers(jsonify(ok=True), '/api/grid')
+        assert response.headers['X-Poll-Interval'] == '30'
+        assert 'Retry-After' not in response.headers
+
+        polling.concurrency_limiter.active = 3
+        response = add_poll_headers(jsonify(ok=True), '/api/grid')
+        assert response.headers['Retry-After'] == response.headers['X-Poll-Interval'] == '98'     # 30 s x 3.25
@@ -0,0 +1,78 @@
+import time
+
+import pytest
+
+from app.monitoring.profiler import ProfilingMiddleware, SamplingProfiler
+
+
+def slow_app(environ, start_response):
+    time.sleep(0.05)
+    start_response('200 OK', [('Content-Type', 'text/plain'), ('X-Request-ID', 'server-id')])
+    return [b'ok']
+
+
+def streaming_app(environ, start_response):
+    start_response('200 OK', [('Content-Type', 'text/event-stream')])
+
+    def events():
+        for _ in range(3):
+            time.sleep(0.02)
+            yield b'data: x\n\n'
+
+    return events()
+
+
+def call(app, **environ):
+    statuses = []
+    environ = dict({'REQUEST_METHOD': 'GET', 'PATH_INFO': '/slow'}, **environ)
+    result = app(environ, lambda status, headers, exc_info=None: statuses.append((status, headers)))
+    try:
+        body = b''.join(result)
+    finally:
+        if hasattr(result, 'close'):
+            result.close()
+    return body, dict(statuses[0][1])
+
+
+@pytest.fixture
+def profiler():
+    return SamplingProfiler(interval=0.001, history=5)
+
+
+def test_token_header_profiles_the_request(profiler):
+    app = ProfilingMiddleware(slow_app, profiler, token='secret')
+    body, headers = call(app, HTTP_X_PROFILE='secret')
+    assert body == b'ok'
+    # The profile shares the (server-generated) request id
+    assert headers['X-Profile-ID'] == 'server-id'
+    profile = profiler.get('server-id')
+    assert profile.status == 200
+    assert profile.samples > 0
+    assert 'test_profiler:slow_app' in profile.collapsed()
+    assert profile.summary()['categories']
+
+
+def test_requests_without_the_token_are_not_profiled(profiler):
+    app = ProfilingMiddleware(slow_app, profiler, token='secret')
+    _, headers = call(app, HTTP_X_PROFILE='guess')
+    assert 'X-Profile-ID' not in headers
+    assert profiler.recent() == []
+
+
+def test_history_is_bounded(profiler):
+    app = ProfilingMiddleware(slow_app, profiler, sample_rate=1.0)
+    for _ in range(7):
+        call(app)
+    assert len(profiler.recent()) == 5
+
+
+def test_streamed_bodies_are_profiled_until_closed(profiler):
+    app = ProfilingMiddleware(streaming_app, profiler, sample_rate=1.0)
+    result = app({'REQUEST_METHOD': 'GET', 'PATH_INFO': '/stream'}, lambda *args: None)
+    assert profiler.recent() == []
+    assert b''.join(result) == b'data: x\n\n' * 3
+    result.close()
+    profile = profiler.recent()[0]
+    assert profile.status == 200
+    assert profile.duration >= 0.06
+    assert 'test_profiler:events' in profile.collapsed()
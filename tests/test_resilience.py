@@ -0,0 +1,93 @@
+import threading
+
+import pytest
+
+from app.firebase.resilience import CircuitBreaker, CircuitOpenError, ReadGuard, ReadTimeout
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [50.0]
+    monkeypatch.setattr('app.firebase.resilience.time.monotonic', lambda: now[0])
+    return now
+
+
+class Ref:
+    def __init__(self, value=None, error=None, block=None):
+        self.path = '/energy_dashboard/battery'
+        self.value, self.error, self.block = value, error, block
+
+    def get(self, **kwargs):
+        if self.block is not None:
+            self.block.wait(5)
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+def test_breaker_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=10.0)
+    for _ in range(2):
+        breaker.record_failure()
+    breaker.record_success()
+    for _ in range(3):
+        breaker.before_call()
+        breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    assert breaker.to_dict()['retry_in_seconds'] == 10.0
+
+
+def test_half_open_lets_one_probe_through(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10.0)
+    breaker.record_failure()
+    clock[0] += 10.0
+    breaker.before_call()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()       # the probe is still out
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.before_call()
+
+
+def test_failed_probe_reopens(clock):
+    breaker = CircuitBreaker(failure_threshold=5, reset_timeout=10.0)
+    for _ in range(5):
+        breaker.record_failure()
+    clock[0] += 10.0
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.trips == 2        # a failed probe counts as another trip
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_guard_times_out_slow_reads_and_trips_the_breaker():
+    guard = ReadGuard(timeout=0.05)
+    guard.configure(failure_threshold=1, reset_timeout=60.0)
+    release = threading.Event()
+    try:
+        with pytest.raises(ReadTimeout):
+            guard.get(Ref(block=release))
+        with pytest.raises(CircuitOpenError):
+            guard.get(Ref(value=1))
+    finally:
+        release.set()
+
+
+def test_guard_passes_values_and_counts_errors():
+    guard = ReadGuard(timeout=1.0)
+    assert guard.get(Ref(value={'level': 80})) == {'level': 80}
+    with pytest.raises(ValueError):
+        guard.get(Ref(error=ValueError('bad')))
+    assert guard.breaker.failures == 1
+
+
+def test_timeout_for_uses_the_longest_matching_prefix():
+    guard = ReadGuard(timeout=2.0, path_timeouts={'/energy_dashboard': 3.0, '/energy_dashboard/floors/': 5.0})
+    assert guard.timeout_for('/energy_dashboard/floors/f1') == 5.0
+    assert guard.timeout_for('/energy_dashboard/battery') == 3.0
+    assert guard.timeout_for('/energy_dashboard_old') == 2.0
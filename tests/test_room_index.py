@@ -0,0 +1,79 @@
+import pytest
+
+from app.firebase.firebase_client import FirebaseClient
+from app.firebase.invalidation import invalidator
+from app.firebase.listeners import TreeMirror
+from app.firebase.room_index import RoomIndex, room_index_loaded
+
+BASE = '/energy_dashboard/floors'
+
+
+def room(name, *appliances):
+    return {'name': name, 'appliances': {f"a{i}": {'id': appliance, 'name': appliance}
+                                         for i, appliance in enumerate(appliances)}}
+
+
+@pytest.fixture
+def mirror():
+    index = RoomIndex(BASE)
+    mirror = TreeMirror('floors', BASE)
+    mirror.subscribe(index.on_floors_change)
+    mirror.apply_event('put', '/', {
+        'f1': {'rooms': {'kitchen': room('Kitchen 1', 'fridge'), 'lab': room('Lab', 'scope')}},
+        'f2': {'rooms': {'kitchen': room('Kitchen 2', 'fridge', 'kettle')}},
+    })
+    mirror.index = index
+    return mirror
+
+
+def test_duplicate_room_ids_are_told_apart_by_floor(mirror):
+    index = mirror.index
+    assert len(index) == 3
+    assert index.lookup('kitchen', 'f2')['record']['name'] == 'Kitchen 2'
+    assert index.lookup('kitchen', 'f1')['path'] == f"{BASE}/f1/rooms/kitchen"
+    assert index.lookup('kitchen')['floor_id'] in ('f1', 'f2')
+    assert index.lookup('kitchen', 'f3') is None
+
+    assert index.lookup_appliance('fridge', floor_id='f2') == f"{BASE}/f2/rooms/kitchen/appliances/a0"
+    assert index.lookup_appliance('kettle', room_id='kitchen', floor_id='f1') is None
+    assert sorted(path for path, _ in index.floor_appliances('f2')) == [
+        f"{BASE}/f2/rooms/kitchen/appliances/a0", f"{BASE}/f2/rooms/kitchen/appliances/a1"]
+
+
+def test_removing_one_duplicate_keeps_the_other(mirror):
+    index = mirror.index
+    mirror.apply_event('put', '/f1/rooms/kitchen', None)
+    assert index.lookup('kitchen')['floor_id'] == 'f2'
+    assert index.lookup_appliance('fridge') == f"{BASE}/f2/rooms/kitchen/appliances/a0"
+
+    mirror.apply_event('put', '/f2', None)
+    assert index.lookup('kitchen') is None
+    assert index.lookup_appliance('fridge') is None
+    assert len(index) == 1
+
+
+def test_appliance_changes_reindex_the_room(mirror):
+    index = mirror.index
+    mirror.apply_event('patch', '/f1/rooms/lab/appliances', {'a0': None, 'a9': {'id': 'laser'}})
+    assert index.lookup_appliance('scope') is None
+    assert index.lookup_appliance('laser') == f"{BASE}/f1/rooms/lab/appliances/a9"
+
+
+@pytest.fixture
+def unloaded():
+    room_index_loaded.invalidate([room_index_loaded.path])
+    yield
+    room_index_loaded.invalidate([room_index_loaded.path])
+
+
+def test_get_room_reads_the_floors_once_without_a_listener(fake_db, unloaded):
+    for _ in range(3):
+        detail = FirebaseClient.get_room('room2', 'floor3')
+    assert detail['room']['floor_id'] == 'floor3'
+    assert FirebaseClient.get_room('room99') is None
+    assert fake_db.stats()['reads_by_path'] == {BASE: 1}
+
+    fake_db.reference(f"{BASE}/floor3/rooms/room2/name").set('Renamed')
+    invalidator.changed([f"{BASE}/floor3/rooms/room2/name"])
+    assert FirebaseClient.get_room('room2', 'floor3')['room']['name'] == 'Renamed'
+    assert fake_db.stats()['reads_by_path'] == {BASE: 2}
@@ -0,0 +1,99 @@
+import json
+import struct
+import time
+
+import pytest
+
+from app.firebase.listeners import TreeMirror
+from app.firebase.shared_snapshot import (
+    _SEQ, _SEQ_OFFSET, SharedSnapshotReader, SharedSnapshotWriter, SnapshotTooLarge,
+)
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'snapshot.shm')
+
+
+def follow(path):
+    reader = SharedSnapshotReader()
+    reader.path = path
+    assert reader._open()
+    return reader
+
+
+def test_reader_sees_each_published_version_once(path):
+    writer = SharedSnapshotWriter(path, capacity=1024)
+    reader = follow(path)
+    assert reader.read() is None
+
+    writer.publish(b'{"a":1}')
+    seq, _, payload = reader.read()
+    assert (seq, payload) == (2, b'{"a":1}')
+    reader.seq = seq
+    assert reader.read() is None
+
+
+def test_reader_retries_while_the_sequence_is_odd(path):
+    writer = SharedSnapshotWriter(path, capacity=1024)
+    writer.publish(b'{}')
+    reader = follow(path)
+    # The writer is mid-update
+    _SEQ.pack_into(writer._map, _SEQ_OFFSET, writer.seq + 1)
+    assert reader.read(attempts=3) is None
+    assert reader.retries == 3
+    _SEQ.pack_into(writer._map, _SEQ_OFFSET, writer.seq)
+    assert reader.read()[2] == b'{}'
+
+
+def test_reader_retries_when_the_sequence_moves_during_the_copy(path, monkeypatch):
+    writer = SharedSnapshotWriter(path, capacity=1024)
+    writer.publish(b'{"v":1}')
+    reader = follow(path)
+    unpack_from = struct.unpack_from
+    racing = [True]
+
+    def unpack_racing(fmt, buffer, offset=0):
+        # A publish lands between the reader's first sequence check and its copy
+        if racing and fmt == '<Qd':
+            racing.pop()
+            writer.publish(b'{"v":2}')
+        return unpack_from(fmt, buffer, offset)
+
+    monkeypatch.setattr('app.firebase.shared_snapshot.struct.unpack_from', unpack_racing)
+    seq, _, payload = reader.read()
+    assert (seq, payload) == (4, b'{"v":2}')
+    assert reader.retries == 1
+
+
+def test_writer_rejects_oversized_payloads_and_resumes_the_sequence(path):
+    writer = SharedSnapshotWriter(path, capacity=8)
+    with pytest.raises(SnapshotTooLarge):
+        writer.publish(b'x' * 9)
+    writer.publish(b'{}')
+    assert SharedSnapshotWriter(path, capacity=8).seq == writer.seq
+
+
+def test_mirrors_follow_the_writer_until_detached(path):
+    source = TreeMirror('floors', '/energy_dashboard/floors')
+    source.apply_event('put', '/', {'f1': {'status': 'optimal'}})
+    writer = SharedSnapshotWriter(path, capacity=4096)
+    writer.track(source)
+    writer.publish(writer._encode())
+
+    follower = TreeMirror('floors', '/energy_dashboard/floors')
+    reader = SharedSnapshotReader()
+    reader.attach(path, [follower], poll_interval=0.01)
+    deadline = time.time() + 2
+    while not follower.ready and time.time() < deadline:
+        time.sleep(0.01)
+    assert follower.get(('f1', 'status')) == 'optimal'
+
+    thread = reader._thread
+    reader.detach()
+    assert not thread.is_alive()
+    source.apply_event('put', '/f1/status', 'critical')
+    writer.publish(writer._encode())
+    time.sleep(0.05)
+    assert follower.get(('f1', 'status')) == 'optimal'
+    assert json.loads(writer._encode())['/energy_dashboard/floors']['value']['f1']['status'] == 'critical'
@@ -0,0 +1,95 @@
+import pytest
+
+from app.firebase.snapshot import PathCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr('app.firebase.snapshot.time.time', lambda: now[0])
+    return now
+
+
+def failing_read():
+    raise ConnectionError("offline")
+
+
+def test_fresh_entries_answer_reads_until_the_ttl(clock):
+    cache = PathCache(ttl=5.0)
+    reads = []
+    read = lambda: reads.append(1) or {'level': 80}
+    assert cache.fetch('/battery', read) == {'level': 80}
+    assert cache.fetch('/battery', read) == {'level': 80}
+    assert len(reads) == 1
+    clock[0] += 5.0
+    cache.fetch('/battery', read)
+    assert len(reads) == 2
+
+
+def test_invalidation_covers_ancestors_descendants_and_queries(clock):
+    cache = PathCache(ttl=60.0)
+    cache.put('/floors/f1', {'rooms': {}})
+    cache.put('/floors', {'f1': {}}, query='orderBy=status')
+    cache.put('/people', {})
+
+    cache.invalidate(['/floors/f1/rooms/kitchen'])
+    assert cache.get('/floors/f1', fresh=True) is None
+    assert cache.get('/floors', fresh=True, query='orderBy=status') is None
+    assert cache.get('/people', fresh=True) is not None
+    # Invalidated entries are still the fallback
+    assert cache.fetch('/floors/f1', failing_read) == {'rooms': {}}
+
+
+def test_paths_are_served_from_the_nearest_ancestor(clock):
+    cache = PathCache()
+    cache.put('/floors', {'f1': {'rooms': {'kitchen': {'name': 'Kitchen'}}}, 'f2': [10, 20]})
+    assert cache.get('/floors/f1/rooms/kitchen/name') == ('Kitchen', 1000.0)
+    assert cache.get('/floors/f2/1')[0] == 20
+    assert cache.get('/floors/f3') is None
+    assert cache.get('/people') is None
+
+
+def test_values_are_copies():
+    cache = PathCache()
+    cache.put('/floors', {'f1': {}})
+    cache.get('/floors')[0]['f2'] = {}
+    assert cache.get('/floors')[0] == {'f1': {}}
+
+
+def test_failed_reads_without_a_cached_value_raise():
+    with pytest.raises(ConnectionError):
+        PathCache().fetch('/battery', failing_read)
+
+
+def test_save_and_load_round_trip(tmp_path):
+    path = str(tmp_path / 'snapshot.bin')
+    cache = PathCache()
+    cache.configure(file=path)
+    cache.put('/floors', {'f1': {'status': 'optimal'}})
+    cache.put('/floors', {'f1': {}}, query='limit=1')
+    assert cache.save()
+    assert not cache.save()         # nothing changed
+
+    restored = PathCache()
+    restored.configure(file=path)
+    assert restored.load() == 2
+    assert restored.get('/floors/f1/status')[0] == 'optimal'
+    assert restored.get('/floors', query='limit=1')[0] == {'f1': {}}
+    # Loaded entries are a fallback, never fresh
+    assert restored.get('/floors', fresh=True) is None
+
+
+def test_corrupt_snapshot_is_ignored(tmp_path):
+    path = tmp_path / 'snapshot.bin'
+    cache = PathCache()
+    cache.configure(file=str(path))
+    cache.put('/floors', {'f1': {}})
+    cache.save()
+    data = bytearray(path.read_bytes())
+    data[-1] ^= 0xFF
+    path.write_bytes(bytes(data))
+
+    restored = PathCache()
+    restored.configure(file=str(path))
+    assert restored.load() == 0
+    assert restored.get('/floors') is None
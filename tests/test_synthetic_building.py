@@ -0,0 +1,30 @@
+from benchmarks.synthetic_building import generate_building, main
+
+
+def test_sizes_follow_the_arguments():
+    tree = generate_building(floors=5, rooms_per_floor=3, appliances_per_room=4, people=7, notifications=11)
+    floors = tree['energy_dashboard']['floors']
+    assert len(floors) == 5
+    assert all(len(floor['rooms']) == 3 for floor in floors.values())
+    assert all(len(room['appliances']) == 4 for floor in floors.values() for room in floor['rooms'].values())
+    assert len(tree['people']) == 7
+    assert len(tree['energy_dashboard']['notifications']) == 11
+
+
+def test_totals_are_consistent():
+    tree = generate_building(floors=2, rooms_per_floor=6, notifications=30, seed=3)
+    for floor in tree['energy_dashboard']['floors'].values():
+        for room in floor['rooms'].values():
+            assert room['consumption'] == sum(a['consumption'] for a in room['appliances'].values())
+    notifications = tree['energy_dashboard']['notifications']
+    unread = sum(1 for notification in notifications.values() if not notification['read'])
+    assert tree['energy_dashboard']['notifications_meta']['unread_count'] == unread
+    assert list(notifications) == sorted(notifications)
+
+
+def test_same_seed_same_building(tmp_path):
+    assert generate_building(seed=1) == generate_building(seed=1)
+    assert generate_building(seed=1) != generate_building(seed=2)
+    out = tmp_path / 'building.json'
+    assert main(['--floors', '1', '--out', str(out)]) == 0
+    assert out.stat().st_size > 0
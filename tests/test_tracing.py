@@ -0,0 +1,61 @@
+from flask import Flask
+import pytest
+
+from app.monitoring import init_monitoring, tracing
+from app.monitoring.tracing import RequestTrace, TraceStore
+
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    app.config.update(METRICS_ENABLED=False, TRACING_ENABLED=True)
+    init_monitoring(app)
+
+    @app.route('/ping')
+    def ping():
+        tracing.record_read('/energy_dashboard/battery', 0.002, 10)
+        return 'pong'
+
+    return app.test_client()
+
+
+def test_request_id_is_generated_by_the_server(client):
+    response = client.get('/ping', headers={'X-Request-ID': 'kiosk-7'})
+    request_id = response.headers['X-Request-ID']
+    assert request_id != 'kiosk-7'
+    trace = tracing.trace_store.get(request_id)
+    assert trace.client_request_id == 'kiosk-7'
+    assert trace.to_dict()['firebase_reads'] == 1
+    assert tracing.trace_store.get('kiosk-7') is None
+
+
+def test_client_cannot_overwrite_another_trace(client):
+    first = client.get('/ping').headers['X-Request-ID']
+    client.get('/ping', headers={'X-Request-ID': first})
+    assert tracing.trace_store.get(first).client_request_id is None
+
+
+def test_unsafe_client_ids_are_dropped():
+    assert tracing.client_request_id('abc-123.x') == 'abc-123.x'
+    assert tracing.client_request_id('bad id\r\n') is None
+    assert tracing.client_request_id('x' * 65) is None
+    assert tracing.client_request_id(None) is None
+
+
+def test_trace_store_keeps_the_most_recent():
+    store = TraceStore(size=2)
+    for request_id in ('a', 'b', 'c'):
+        store.add(RequestTrace(request_id, 'GET', '/'))
+    assert store.get('a') is None
+    assert [trace.request_id for trace in store.recent()] == ['c', 'b']
+
+
+def test_server_timing_lists_slowest_paths_first():
+    trace = RequestTrace('r', 'GET', '/')
+    trace.add_call('/fast', 0.001, 5, None)
+    trace.add_call('/slow', 0.010, 7, None)
+    trace.add_call('/slow', 0.010, 7, None)
+    trace.finish('index', 200)
+    header = trace.server_timing()
+    assert 'firebase;dur=21.00;desc="3 reads, 19 B"' in header
+    assert header.index('/slow x2') < header.index('/fast x1')
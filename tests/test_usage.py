@@ -0,0 +1,60 @@
+from app.firebase.snapshot import PathCache
+from app.monitoring.usage import UsageLedger
+
+
+def ledger(**budget):
+    usage = UsageLedger()
+    usage.evaluate_interval = 3600
+    usage.configure(**budget)
+    return usage
+
+
+def test_reads_are_broken_down_by_path_and_endpoint():
+    usage = ledger()
+    usage.record('/floors', 100, 'main.index')
+    usage.record('/floors', 50, 'api.get_floors')
+    usage.record('/people', 10, 'main.index')
+    assert usage.totals() == (3, 160)
+    day = usage.report()[0]
+    assert day['paths'][0] == {'key': '/floors', 'reads': 2, 'bytes': 150}
+    assert day['endpoints'][0] == {'key': 'main.index', 'reads': 2, 'bytes': 110}
+    usage.record('/grid', 1)       # outside a request: 'background'
+    assert usage.report()[0]['endpoints'][-1]['key'] == 'background'
+
+
+def test_no_overrides_below_the_soft_limit():
+    usage = ledger(byte_budget=1000)
+    usage.record('/floors', 700, 'x')
+    assert usage.evaluate() == {}
+
+
+def test_heaviest_paths_get_a_ttl_that_doubles_with_pressure():
+    usage = ledger(byte_budget=1000, budget_ttl=60, max_ttl=200)
+    applied = []
+    usage.add_pressure_handler(applied.append)
+    usage.record('/floors', 400, 'x')
+    usage.record('/people', 300, 'x')
+    usage.record('/grid', 105, 'x')
+    # 80.5% used: the paths covering 80% of bytes get the base ttl
+    assert usage.evaluate() == {'/floors': 60, '/people': 60}
+
+    usage.record('/floors', 120, 'x')
+    assert usage.evaluate() == {'/floors': 120, '/people': 120}
+
+    usage.record('/floors', 100, 'x')
+    assert usage.evaluate() == {'/floors': 200, '/people': 200}     # capped at max_ttl
+    assert [set(ttls.values()) for ttls in applied] == [{60}, {120}, {200}]
+    usage.evaluate()
+    assert len(applied) == 3                                # unchanged, not re-sent
+
+
+def test_read_budget_counts_too_and_feeds_the_path_cache():
+    usage = ledger(read_budget=10, budget_ttl=30)
+    cache = PathCache(ttl=5)
+    usage.add_pressure_handler(cache.set_ttl_overrides)
+    for _ in range(9):
+        usage.record('/energy_dashboard/floors', 1, 'x')
+    usage.evaluate()
+    assert usage.pressure() == 0.9
+    assert cache.ttl_for('/energy_dashboard/floors') == 60
+    assert cache.ttl_for('/energy_dashboard/people') == 5